@@ -92,6 +92,7 @@ const THRESHOLDS = {
 // Global variables
 let allMatchesData = [];
 let availableTeams = new Set();
+let teamSearch = null;
 let isLoading = false;
 
 
@@ -113,7 +114,10 @@ const results = document.getElementById('results');
 
 // Initialize
 document.addEventListener('DOMContentLoaded', function () {
-  loadAllMatchData();
+  // today-matches.html only borrows the analysis helpers and loads match data when it needs it
+  if (!form) return;
+  ensureMatchData();
+  loadTeamSearch();
   setupEventListeners();
 });
 
@@ -124,6 +128,23 @@ function setupEventListeners() {
   setupAutocomplete(team2Input);
 }
 
+// Ranked team index from team_search.py; autocomplete scans availableTeams without it
+async function loadTeamSearch() {
+  try {
+    teamSearch = await TeamSearch.load();
+  } catch (error) {
+    console.warn('Team search index not available:', error);
+  }
+}
+
+// Load the league files once, however many callers ask for them
+let matchDataLoaded = null;
+
+function ensureMatchData() {
+  matchDataLoaded = matchDataLoaded || loadAllMatchData();
+  return matchDataLoaded;
+}
+
 // Load all match data from JSON files
 async function loadAllMatchData() {
   try {
@@ -131,21 +152,13 @@ async function loadAllMatchData() {
     availableTeams.clear();
     console.log('Loading match data from JSON files...');
 
-    for (const [leagueId, leagueInfo] of Object.entries(JSON_FILES)) {
+    for (const [leagueId, leagueInfo, matches] of await fetchLeagueData(Object.entries(JSON_FILES))) {
+      if (!matches) continue;
       try {
-        console.log(`Loading ${leagueInfo.name}...`);
-        const response = await fetch(leagueInfo.file);
-
-        if (!response.ok) {
-          console.warn(`Could not load ${leagueInfo.file}: ${response.status}`);
-          continue;
-        }
-
-        const matches = await response.json();
-
         matches.forEach(match => {
           if (match.match_status === 'Finished') {
             const stats = match.statistics || [];
+            const statsht = match.statistics_1half || [];
 
             const matchData = {
               date: new Date(match.match_date),
@@ -167,6 +180,18 @@ async function loadAllMatchData() {
               af: getStatValue(stats, 'Fouls', 'away'),
               hsog: getStatValue(stats, 'Shots On Goal', 'home'),
               asog: getStatValue(stats, 'Shots On Goal', 'away'),
+              // First half, from statistics_1half
+              hasHalfStats: statsht.length > 0,
+              hsht: getStatValue(statsht, 'Shots Total', 'home'),
+              asht: getStatValue(statsht, 'Shots Total', 'away'),
+              hcht: getStatValue(statsht, 'Corners', 'home'),
+              acht: getStatValue(statsht, 'Corners', 'away'),
+              hyht: getStatValue(statsht, 'Yellow Cards', 'home'),
+              ayht: getStatValue(statsht, 'Yellow Cards', 'away'),
+              hfht: getStatValue(statsht, 'Fouls', 'home'),
+              afht: getStatValue(statsht, 'Fouls', 'away'),
+              hsoght: getStatValue(statsht, 'Shots On Goal', 'home'),
+              asoght: getStatValue(statsht, 'Shots On Goal', 'away'),
               league: leagueInfo.name
             };
 
@@ -252,6 +277,11 @@ function setupAutocomplete(inputElement) {
 }
 
 function getMatchingTeams(searchTerm) {
+  if (teamSearch) {
+    // Offer the name the loaded files use, which may be one of the team's aliases
+    const pageName = team => [team.name, ...team.aliases].find(name => availableTeams.has(name));
+    return teamSearch.search(searchTerm, 10, pageName).map(pageName);
+  }
   const search = searchTerm.toLowerCase();
   return Array.from(availableTeams)
     .filter(team => team.toLowerCase().includes(search))
@@ -265,32 +295,34 @@ function getTeamLastMatches(teamName, numMatches = 5) {
     match.homeTeam === teamName || match.awayTeam === teamName
   );
 
-  return teamMatches.slice(-numMatches).map(match => {
-    const isHome = match.homeTeam === teamName;
-    return {
-      date: match.date,
-      dateString: match.dateString,
-      opponent: isHome ? match.awayTeam : match.homeTeam,
-      location: isHome ? 'Home' : 'Away',
-      teamGoals: isHome ? match.fthg : match.ftag,
-      oppGoals: isHome ? match.ftag : match.fthg,
-      teamShots: isHome ? match.hs : match.as,
-      oppShots: isHome ? match.as : match.hs,
-      teamCorners: isHome ? match.hc : match.ac,
-      oppCorners: isHome ? match.ac : match.hc,
-      teamCards: isHome ? match.hy : match.ay,
-      oppCards: isHome ? match.ay : match.hy,
-      // NEW FIELDS:
-      teamFouls: isHome ? match.hf : match.af,
-      oppFouls: isHome ? match.af : match.hf,
-      teamShotsOnGoal: isHome ? match.hsog : match.asog,
-      oppShotsOnGoal: isHome ? match.asog : match.hsog,
-      teamHalfGoals: isHome ? match.hthg : match.htag,
-      oppHalfGoals: isHome ? match.htag : match.hthg,
-      league: match.league,
-      originalMatch: match
-    };
-  });
+  return teamMatches.slice(-numMatches).map(match => teamMatchView(match, match.homeTeam === teamName));
+}
+
+// One match from a team's point of view (also used by today-matches.js for slate history)
+function teamMatchView(match, isHome) {
+  return {
+    date: match.date,
+    dateString: match.dateString,
+    opponent: isHome ? match.awayTeam : match.homeTeam,
+    location: isHome ? 'Home' : 'Away',
+    teamGoals: isHome ? match.fthg : match.ftag,
+    oppGoals: isHome ? match.ftag : match.fthg,
+    teamShots: isHome ? match.hs : match.as,
+    oppShots: isHome ? match.as : match.hs,
+    teamCorners: isHome ? match.hc : match.ac,
+    oppCorners: isHome ? match.ac : match.hc,
+    teamCards: isHome ? match.hy : match.ay,
+    oppCards: isHome ? match.ay : match.hy,
+    // NEW FIELDS:
+    teamFouls: isHome ? match.hf : match.af,
+    oppFouls: isHome ? match.af : match.hf,
+    teamShotsOnGoal: isHome ? match.hsog : match.asog,
+    oppShotsOnGoal: isHome ? match.asog : match.hsog,
+    teamHalfGoals: isHome ? match.hthg : match.htag,
+    oppHalfGoals: isHome ? match.htag : match.hthg,
+    league: match.league,
+    originalMatch: match
+  };
 }
 
 
@@ -360,6 +392,10 @@ function calculateStatistics(matches) {
   const totalMatches = matches.length;
 
   // Build totals including fouls, SOG, and half-time stats
+  // (real statistics_1half values; only matches without that block fall back to half the full-time total)
+  const halfTotal = (m, home, away, fullHome, fullAway) => m.hasHalfStats
+    ? m[home] + m[away]
+    : Math.floor((m[fullHome] + m[fullAway]) / 2);
   const matchTotals = matches.map(m => ({
     totalGoals: m.originalMatch.fthg + m.originalMatch.ftag,
     totalShots: m.originalMatch.hs + m.originalMatch.as,
@@ -368,11 +404,11 @@ function calculateStatistics(matches) {
     totalFouls: m.originalMatch.hf + m.originalMatch.af,
     totalShotsOnGoal: m.originalMatch.hsog + m.originalMatch.asog,
     totalGoalsht: m.originalMatch.hthg + m.originalMatch.htag,
-    totalCornersht: Math.floor((m.originalMatch.hc + m.originalMatch.ac) / 2),
-    totalFoulsht: Math.floor((m.originalMatch.hf + m.originalMatch.af) / 2),
-    totalCardsht: Math.floor((m.originalMatch.hy + m.originalMatch.ay) / 2),
-    totalShotsht: Math.floor((m.originalMatch.hs + m.originalMatch.as) / 2),
-    totalShotsOnGoalht: Math.floor((m.originalMatch.hsog + m.originalMatch.asog) / 2)
+    totalCornersht: halfTotal(m.originalMatch, 'hcht', 'acht', 'hc', 'ac'),
+    totalFoulsht: halfTotal(m.originalMatch, 'hfht', 'afht', 'hf', 'af'),
+    totalCardsht: halfTotal(m.originalMatch, 'hyht', 'ayht', 'hy', 'ay'),
+    totalShotsht: halfTotal(m.originalMatch, 'hsht', 'asht', 'hs', 'as'),
+    totalShotsOnGoalht: halfTotal(m.originalMatch, 'hsoght', 'asoght', 'hsog', 'asog')
   }));
 
   // Map category names to matchTotals keys
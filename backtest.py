@@ -0,0 +1,189 @@
+import os
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from match_store import STORE_DIR, load_store, read_manifest, window_partitions
+from team_index import TeamIndex, success_rate
+from fixture_scanner import DIRECTIONS, THRESHOLDS, select_fixtures, stacked_hit_prefix
+
+LAST_MATCHES = (3, 5, 7, 10)
+MIN_SUCCESS_RATES = tuple(range(50, 101, 5))
+
+RESULT_COLUMNS = ['category', 'threshold', 'direction', 'last_matches', 'min_success_rate', 'bets', 'wins',
+                  'win_rate']
+
+
+def history_indexes(store, index, categories, require_stats=True):
+    """{category: TeamIndex} the team windows are taken from: with require_stats, each category's index only
+    holds the matches that recorded it (categories sharing a stats_mask share an index), else `index`"""
+    if not require_stats:
+        return {category: index for category in categories}
+    by_mask = {}
+    indexes = {}
+    for category in categories:
+        mask = store.stats_mask(category)
+        if id(mask) not in by_mask:
+            by_mask[id(mask)] = index if mask.all() else TeamIndex(store, index.leagues, index.registry, mask)
+        indexes[category] = by_mask[id(mask)]
+    return indexes
+
+
+def rate_histograms(store, index, fixtures, last_values, thresholds, require_stats=True):
+    """(last_values, lines, directions, [bets, wins], 101) counts of fixtures per combined success rate
+
+    With require_stats, stat lines only score fixtures that recorded the category, over windows of matches
+    that recorded it too: leagues leave unused types out of the statistics block and those read as 0,
+    which would make every such under bet a win and fill the windows with zeros.
+    """
+    lines = [(category, threshold) for category, values in thresholds.items() for threshold in values]
+    hist = np.zeros((len(last_values), len(lines), len(DIRECTIONS), 2, 101), dtype=np.int64)
+    dates = store['date'][fixtures]
+    home_ids = store['home_id'][fixtures]
+    away_ids = store['away_id'][fixtures]
+    indexes = history_indexes(store, index, thresholds, require_stats)
+
+    # The bet outcome of every fixture and line, from the fixture's own final stats
+    outcome_over = np.vstack([store.totals(category)[fixtures] > threshold for category, threshold in lines]) \
+        if len(lines) else np.zeros((0, len(fixtures)), dtype=bool)
+
+    for i, last_matches in enumerate(last_values):
+        row = 0
+        for category, values in thresholds.items():
+            index = indexes[category]
+            # Strictly-before-date windows: the same history getTeamLastMatches() would have had on the day
+            home_start, home_end = index.windows(home_ids, last_matches, dates)
+            away_start, away_end = index.windows(away_ids, last_matches, dates)
+            home_n, away_n = home_end - home_start, away_end - away_start
+            scored = (home_n >= min(3, last_matches)) & (away_n >= min(3, last_matches))
+            if require_stats:
+                scored &= store.stats_mask(category)[fixtures]
+            total_n = (home_n + away_n)[scored]
+            prefix = stacked_hit_prefix(index, category, values)
+            over = (prefix[:, home_end[scored]] - prefix[:, home_start[scored]]
+                    + prefix[:, away_end[scored]] - prefix[:, away_start[scored]])
+            for j, direction in enumerate(DIRECTIONS):
+                hits = over if direction == 'over' else total_n - over
+                rates = success_rate(hits, np.broadcast_to(total_n, hits.shape))
+                won = outcome_over[row:row + len(values), scored]
+                won = won if direction == 'over' else ~won
+                for k in range(len(values)):
+                    hist[i, row + k, j, 0] = np.bincount(rates[k], minlength=101)
+                    hist[i, row + k, j, 1] = np.bincount(rates[k][won[k]], minlength=101)
+            row += len(values)
+    return hist
+
+
+def backtest_leagues(store_dir, leagues, last_values, thresholds, date_from, date_to, require_stats=True):
+    """Worker: histograms for the finished fixtures of some leagues, with history from every league"""
+    partitions = None
+    if date_from is not None:
+        # Partitions that hold neither the fixtures nor their teams' last matches before them are not read
+        manifest = read_manifest(store_dir)
+        last_date = date_to or max((meta['last_date'] for meta in manifest['partitions'].values()
+                                    if meta['last_date']), default=date_from)
+        partitions = window_partitions(manifest, date_from, last_date, max(last_values), leagues, store_dir)
+    store = load_store(store_dir, partitions=partitions)
+    index = TeamIndex(store)
+    dates = store['date'][store.finished_mask()]
+    date_from = date_from or (str(dates.min()) if len(dates) else '1970-01-01')
+    date_to = date_to or (str(dates.max()) if len(dates) else '1970-01-01')
+    fixtures = select_fixtures(store, date_from, date_to, leagues, include_finished=True)
+    fixtures = fixtures[store.finished_mask()[fixtures]]
+    return rate_histograms(store, index, fixtures, last_values, thresholds, require_stats), len(fixtures)
+
+
+def sweep_table(hist, last_values, thresholds, min_success_rates=MIN_SUCCESS_RATES):
+    """Bets, wins and win rate for every line, direction, N and min-success-rate cutoff"""
+    # Bets at cutoff c = fixtures whose rate is >= c, i.e. a reversed cumulative sum of the histogram
+    at_least = np.flip(np.cumsum(np.flip(hist, axis=-1), axis=-1), axis=-1)
+    cutoffs = np.asarray(min_success_rates)
+    counts = at_least[..., cutoffs]  # (last, lines, directions, 2, cutoffs)
+
+    lines = [(category, threshold) for category, values in thresholds.items() for threshold in values]
+    grid = np.stack(np.meshgrid(np.arange(len(last_values)), np.arange(len(lines)), np.arange(len(DIRECTIONS)),
+                                np.arange(len(cutoffs)), indexing='ij'), axis=-1).reshape(-1, 4)
+    bets = counts[:, :, :, 0, :].reshape(-1)
+    wins = counts[:, :, :, 1, :].reshape(-1)
+    table = pd.DataFrame({
+        'category': [lines[l][0] for l in grid[:, 1]],
+        'threshold': [lines[l][1] for l in grid[:, 1]],
+        'direction': np.asarray(DIRECTIONS)[grid[:, 2]],
+        'last_matches': np.asarray(last_values)[grid[:, 0]],
+        'min_success_rate': cutoffs[grid[:, 3]],
+        'bets': bets,
+        'wins': wins,
+        'win_rate': success_rate(wins, bets),
+    })
+    return table[RESULT_COLUMNS]
+
+
+def run_backtest(store_dir=STORE_DIR, date_from=None, date_to=None, last_values=LAST_MATCHES, thresholds=None,
+                 leagues=None, min_success_rates=MIN_SUCCESS_RATES, workers=None, require_stats=True):
+    """Walk-forward find_bets backtest over every finished match, with leagues split across processes"""
+    thresholds = thresholds or THRESHOLDS
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No compiled store in '{store_dir}' - run match_store.py first")
+    league_ids = sorted({meta['league_id'] for meta in manifest['partitions'].values()})
+    if leagues is not None:
+        league_ids = [l for l in league_ids if l in {int(x) for x in leagues}]
+
+    # Round-robin by size so every worker gets a similar number of matches
+    rows = {}
+    for meta in manifest['partitions'].values():
+        rows[meta['league_id']] = rows.get(meta['league_id'], 0) + meta['finished']
+    workers = workers or os.cpu_count() or 1
+    chunks = [[] for _ in range(min(workers, len(league_ids)) or 1)]
+    for i, league_id in enumerate(sorted(league_ids, key=lambda l: -rows.get(l, 0))):
+        chunks[i % len(chunks)].append(league_id)
+
+    hist = np.zeros((len(last_values), sum(len(v) for v in thresholds.values()), len(DIRECTIONS), 2, 101),
+                    dtype=np.int64)
+    fixtures = 0
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(backtest_leagues, store_dir, chunk, tuple(last_values), thresholds, date_from, date_to,
+                               require_stats)
+                   for chunk in chunks if chunk]
+        for future in futures:
+            chunk_hist, chunk_fixtures = future.result()
+            hist += chunk_hist
+            fixtures += chunk_fixtures
+    return sweep_table(hist, last_values, thresholds, min_success_rates), fixtures
+
+
+def main():
+    """Replay every finished match date and score the find_bets signal"""
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the find_bets success-rate signal')
+    parser.add_argument('--from', dest='date_from', help='first fixture date (YYYY-MM-DD, default: all)')
+    parser.add_argument('--to', dest='date_to', help='last fixture date (YYYY-MM-DD, default: all)')
+    parser.add_argument('--last', default=','.join(map(str, LAST_MATCHES)), help='comma separated N values')
+    parser.add_argument('--leagues', help='comma separated league ids (default: all)')
+    parser.add_argument('--min-bets', type=int, default=30, help='hide sweeps with fewer bets')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--include-missing-stats', action='store_true',
+                        help='also score stat lines on fixtures without statistics (their totals read as 0)')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--output', help='write the full sweep to this CSV file')
+    args = parser.parse_args()
+
+    print("⏪ FIND BETS BACKTEST")
+    print("="*40)
+    started = time.perf_counter()
+    table, fixtures = run_backtest(args.store_dir, args.date_from, args.date_to,
+                                   [int(n) for n in args.last.split(',')],
+                                   leagues=args.leagues.split(',') if args.leagues else None, workers=args.workers,
+                                   require_stats=not args.include_missing_stats)
+    print(f"✅ {fixtures} finished fixtures replayed, {len(table)} sweeps in {time.perf_counter() - started:.1f}s")
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"💾 Saved to {args.output}")
+    best = table[table['bets'] >= args.min_bets].sort_values(['win_rate', 'bets'], ascending=False)
+    print(best.head(30).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import contextlib
+import multiprocessing
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from synthetic_data import generate_dataset, generate_name_csvs, league_team_names
+
+BENCH_FILE = 'bench_results.json'
+
+
+def measure(fn, repeat, items=1):
+    """Run fn repeat times; returns latencies in seconds and the number of items handled per call"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies, items
+
+
+def quiet(fn):
+    """Call fn with its progress printing suppressed"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+# Each benchmark: (workdir, repeat) -> [(case name, latencies, items per call)]
+
+def bench_ingest(workdir, repeat):
+    from match_store import INGEST_FIELDS, compile_store, load_store
+    from league_reader import iter_matches
+    leagues_dir = os.path.join(workdir, 'leagues')
+    store_dir = os.path.join(workdir, 'bench_compiled')
+    files = [os.path.join(leagues_dir, f) for f in sorted(os.listdir(leagues_dir))]
+
+    def parse():
+        for path in files:
+            with open(path, encoding='utf-8') as f:
+                json.load(f)
+
+    def stream():
+        for path in files:
+            for _ in iter_matches(path, INGEST_FIELDS):
+                pass
+
+    compile_latencies, _ = measure(quiet(lambda: compile_store(leagues_dir, store_dir)), repeat)
+    matches = len(load_store(store_dir))
+    load_latencies, _ = measure(lambda: load_store(store_dir), repeat * 5)
+    return [('json_parse', measure(parse, repeat)[0], matches),
+            ('stream_parse', measure(stream, repeat)[0], matches),
+            ('compile_store', compile_latencies, matches),
+            ('load_store', load_latencies, matches)]
+
+
+def bench_last_n(workdir, repeat):
+    from match_store import load_store
+    from team_index import TeamIndex
+    store = load_store(os.path.join(workdir, 'compiled'))
+    index = TeamIndex(store)
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(store), size=1000)
+    teams = store['home_id'][picks]
+    dates = store['date'][picks]
+    queries = list(zip(teams.tolist(), dates.astype(str).tolist()))
+
+    single = []
+    for team, day in queries * repeat:
+        started = time.perf_counter()
+        index.last_n(team, 5, day)
+        single.append(time.perf_counter() - started)
+    batch, _ = measure(lambda: index.windows(teams, 5, dates), repeat * 10)
+    build, _ = measure(lambda: TeamIndex(store), repeat)
+    return [('last_n', single, 1), ('windows_batch', batch, len(picks)), ('team_index_build', build, len(store))]
+
+
+def bench_scoring(workdir, repeat):
+    from match_store import load_store
+    from team_index import TeamIndex
+    from fixture_scanner import scan_fixtures
+    from builder_engine import BuilderEngine
+    from secondary_index import SecondaryIndex
+    from head_to_head import PairIndex
+    from totals_model import fit_model, price_fixtures
+    from team_ratings import TeamRatings
+    store = load_store(os.path.join(workdir, 'compiled'))
+    index = TeamIndex(store)
+    upcoming = store['date'][store.upcoming_mask()]
+    day = str(upcoming.min()) if len(upcoming) else str(store['date'].max())
+    fixtures = int(((store['date'] == np.datetime64(day)) & store.upcoming_mask()).sum())
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(store), size=1000)
+    single = []
+    for pos in picks.tolist() * repeat:
+        started = time.perf_counter()
+        index.hit_rate(int(store['home_id'][pos]), 5, store['date'][pos], 'corners', 8.5, 'over')
+        single.append(time.perf_counter() - started)
+
+    referees = SecondaryIndex(store, 'referee', require_stats=True)
+    pairs = PairIndex(store)
+    engine = BuilderEngine(store, index)
+    legs = [('goals', 2.5, 'over'), ('corners', 8.5, 'over'), ('cards', 3.5, 'under')]
+    model = fit_model(store, day)
+    ratings = TeamRatings()
+    ratings.update(store)
+    return [
+        ('single_criterion_hit_rate', single, 1),
+        ('scan_fixtures_day', measure(lambda: scan_fixtures(store, day, index=index), repeat)[0], fixtures),
+        ('scan_fixtures_referee_blend', measure(lambda: scan_fixtures(store, day, index=index, referee_weight=0.5,
+                                                                      referee_index=referees), repeat)[0], fixtures),
+        ('scan_fixtures_h2h', measure(lambda: scan_fixtures(store, day, index=index, h2h_matches=5, h2h_index=pairs),
+                                      repeat)[0], fixtures),
+        ('totals_model_fit', measure(lambda: fit_model(store, day), repeat)[0], len(store)),
+        ('totals_model_price_day', measure(lambda: price_fixtures(store, model, day), repeat)[0], fixtures),
+        ('team_ratings_build', measure(lambda: TeamRatings().update(store), repeat)[0], len(store)),
+        ('scan_fixtures_ratings', measure(lambda: scan_fixtures(store, day, index=index, ratings=ratings), repeat)[0],
+         fixtures),
+        ('builder_engine_build', measure(lambda: BuilderEngine(store, index), repeat)[0], len(store)),
+        ('multi_criteria_evaluate', measure(lambda: engine.evaluate(legs, day), repeat * 5)[0], fixtures),
+        ('multi_criteria_search', measure(lambda: engine.search(day, min_success_rate=80), repeat)[0], fixtures),
+    ]
+
+
+def bench_fuzzy(workdir, repeat):
+    from team_matcher import TeamMatcher
+    from team_name_analyzer import compare_team_names, generate_mapping_suggestions
+    from match_store import load_store
+    from team_registry import build_registry
+    from team_search import build_search_index
+    names_dir = os.path.join(workdir, 'names')
+    fixture_teams = set(pd.read_csv(os.path.join(names_dir, 'recommended_mappings.csv'))['Fixture Team'])
+    league_teams = set(league_team_names(os.path.join(workdir, 'leagues')))
+    fixture_teams |= set(list(league_teams)[:len(league_teams) // 2])
+
+    matcher = TeamMatcher(sorted(league_teams))
+    queries = sorted(fixture_teams)
+    single = []
+    for name in queries * repeat:
+        started = time.perf_counter()
+        matcher.best_match(name)
+        single.append(time.perf_counter() - started)
+
+    def analyze():
+        _, fixture_only, league_only, _ = compare_team_names(fixture_teams, league_teams)
+        generate_mapping_suggestions(fixture_only, league_only)
+
+    # Autocomplete: every prefix of a name, as typed one keystroke at a time
+    store = load_store(os.path.join(workdir, 'compiled'))
+    registry = build_registry(store)
+    search = build_search_index(store, registry)
+    keystrokes = []
+    for name in queries[:200] * repeat:
+        for end in range(2, len(name) + 1):
+            started = time.perf_counter()
+            search.search(name[:end])
+            keystrokes.append(time.perf_counter() - started)
+
+    return [('best_match', single, 1),
+            ('matcher_build', measure(lambda: TeamMatcher(sorted(league_teams)), repeat)[0], len(league_teams)),
+            ('analyze_names', measure(quiet(analyze), repeat)[0], len(fixture_teams)),
+            ('search_index_build', measure(lambda: build_search_index(store, registry), repeat)[0], len(registry)),
+            ('autocomplete_keystroke', keystrokes, 1)]
+
+
+def bench_csv_rewrite(workdir, repeat):
+    from update_fixture_names import bulk_update_fixture_files, load_team_mappings, update_fixture_file
+    names_dir = os.path.join(workdir, 'names')
+    mappings = quiet(lambda: load_team_mappings(os.path.join(names_dir, 'recommended_mappings.csv')))()
+    source = os.path.join(names_dir, 'fixtures')
+    files = sorted(os.listdir(source))
+    rows = sum(len(pd.read_csv(os.path.join(source, f))) for f in files)
+
+    # Every run rewrites a fresh copy, so each one does the same amount of work
+    single, bulk = [], []
+    for _ in range(repeat):
+        target = os.path.join(workdir, 'fixtures_copy')
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target)
+        for filename in files:
+            started = time.perf_counter()
+            update_fixture_file(os.path.join(target, filename), mappings)
+            single.append(time.perf_counter() - started)
+        shutil.rmtree(target)
+        shutil.copytree(source, target)
+        started = time.perf_counter()
+        quiet(lambda: bulk_update_fixture_files(target, mappings))()
+        bulk.append(time.perf_counter() - started)
+    return [('update_fixture_file', single, rows // len(files)), ('bulk_update', bulk, rows)]
+
+
+BENCHMARKS = {
+    'ingest': bench_ingest,
+    'last_n': bench_last_n,
+    'scoring': bench_scoring,
+    'fuzzy': bench_fuzzy,
+    'csv_rewrite': bench_csv_rewrite,
+}
+
+
+def summarize(group, name, latencies, items):
+    latencies = np.asarray(latencies)
+    return {
+        'benchmark': f'{group}.{name}',
+        'calls': int(len(latencies)),
+        'items_per_call': int(items),
+        'total_s': round(float(latencies.sum()), 6),
+        'throughput_per_s': round(float(len(latencies) * items / latencies.sum()), 2) if latencies.sum() else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 4),
+    }
+
+
+def run_group(group, workdir, repeat, queue):
+    """Child process body: run one benchmark group and report its results and peak RSS"""
+    try:
+        cases = BENCHMARKS[group](workdir, repeat)
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        queue.put([dict(summarize(group, *case), peak_rss_mb=round(peak, 1)) for case in cases])
+    except Exception as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'})
+
+
+def prepare_workdir(workdir, scale, seasons, seed):
+    """Synthetic league files, their compiled store and the name-tool CSVs"""
+    from match_store import compile_store
+    leagues_dir = os.path.join(workdir, 'leagues')
+    written = generate_dataset(leagues_dir, leagues=max(int(96 * scale), 1), seasons=seasons, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        compile_store(leagues_dir, os.path.join(workdir, 'compiled'))
+    generate_name_csvs(os.path.join(workdir, 'names'), league_team_names(leagues_dir), seed=seed)
+    return written
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(groups=None, scale=1.0, seasons=1, repeat=3, seed=0, workdir=None):
+    """Run benchmark groups, each in its own process so peak RSS is per group"""
+    groups = groups or list(BENCHMARKS)
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='bench_')
+    try:
+        started = time.perf_counter()
+        written = prepare_workdir(workdir, scale, seasons, seed)
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'cpus': os.cpu_count(),
+                'scale': scale,
+                'seasons': seasons,
+                'seed': seed,
+                'repeat': repeat,
+                'league_files': len(written),
+                'matches': int(sum(written.values())),
+                'generate_s': round(time.perf_counter() - started, 3),
+            },
+            'results': [],
+            'errors': {},
+        }
+        context = multiprocessing.get_context('spawn')
+        for group in groups:
+            queue = context.Queue()
+            process = context.Process(target=run_group, args=(group, workdir, repeat, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            if isinstance(result, dict):
+                report['errors'][group] = result['error']
+            else:
+                report['results'].extend(result)
+        return report
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    """Benchmark the analysis hot paths on synthetic data and write a JSON report"""
+    parser = argparse.ArgumentParser(description='Benchmark ingest, lookup, scoring, fuzzy matching and CSV rewrites')
+    parser.add_argument('--only', help=f"comma separated groups ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--scale', type=float, default=1.0, help='multiple of the 96 leagues we track today')
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='keep the generated data here instead of a temp folder')
+    parser.add_argument('--output', default=BENCH_FILE)
+    args = parser.parse_args()
+
+    groups = args.only.split(',') if args.only else None
+    unknown = set(groups or []) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark groups: {', '.join(sorted(unknown))}")
+
+    print("⏱️  BENCHMARKS")
+    print("="*40)
+    report = run_benchmarks(groups, args.scale, args.seasons, args.repeat, args.seed, args.workdir)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    meta = report['meta']
+    print(f"📦 {meta['league_files']} league files, {meta['matches']} matches (scale {meta['scale']})")
+    for row in report['results']:
+        print(f"  {row['benchmark']:<38} p50 {row['p50_ms']:>10.3f} ms  p99 {row['p99_ms']:>10.3f} ms  "
+              f"{row['throughput_per_s']:>12,.0f}/s  {row['peak_rss_mb']:>7.1f} MB")
+    for group, error in report['errors'].items():
+        print(f"  ❌ {group}: {error}")
+    print(f"💾 Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
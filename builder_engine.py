@@ -0,0 +1,298 @@
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+
+from match_store import FULL_TIME_CATEGORIES, load_store
+from team_index import TeamIndex, success_rate
+from fixture_scanner import HALF_THRESHOLDS, select_fixtures
+from head_to_head import PairIndex, pair_keys
+
+# Same lines as THRESHOLDS in find_builders.js (its goalsht etc. are the *_ht categories), plus second halves
+THRESHOLDS = {
+    'goals': [0.5, 1.5, 2.5, 3.5, 4.5, 5.5],
+    'shots': [18.5, 19.5, 20.5, 21.5, 22.5, 23.5, 24.5, 25.5, 26.5, 27.5, 28.5, 29.5, 30.5, 31.5],
+    'fouls': [18.5, 19.5, 20.5, 21.5, 22.5, 23.5, 24.5, 25.5, 26.5, 27.5, 28.5, 29.5, 30.5, 31.5],
+    'shotsOnGoal': [5.5, 6.5, 7.5, 8.5, 9.5, 10.5, 11.5, 12.5, 13.5],
+    'corners': [0.5, 5.5, 6.5, 7.5, 8.5, 9.5, 10.5, 11.5, 12.5, 13.5],
+    'cards': [0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+    **HALF_THRESHOLDS,
+}
+
+MAX_WINDOW = 64
+# A busy day has millions of passing builders, so search() keeps each fixture's best ones by default
+TOP_BUILDERS = 20
+POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words):
+    """Number of set bits in each uint64 word"""
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    return POPCOUNT8[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def leg_text(leg):
+    category, threshold, direction = leg
+    return f'{category} {direction} {threshold}'
+
+
+class BuilderEngine:
+    """Bet-builder legs as bitsets over the match store, so any conjunction is an AND plus a popcount"""
+
+    def __init__(self, store, index=None, thresholds=None, pairs=None):
+        self.store = store
+        self.index = index or TeamIndex(store)
+        self.pairs = pairs
+        self.thresholds = thresholds or THRESHOLDS
+        self.legs = [(category, threshold, direction)
+                     for category, lines in self.thresholds.items()
+                     for threshold in lines
+                     for direction in ('over', 'under')]
+        self.leg_ids = {leg: i for i, leg in enumerate(self.legs)}
+        self.leg_categories = np.array([list(self.thresholds).index(leg[0]) for leg in self.legs])
+
+        # One packed bit per store row and leg; under is <= threshold, the rule analyzeTeamMatchesMultiCriteria uses
+        bits = np.empty((len(self.legs), len(store)), dtype=bool)
+        for i, (category, threshold, direction) in enumerate(self.legs):
+            totals = store.totals(category)
+            bits[i] = totals > threshold if direction == 'over' else totals <= threshold
+        self.bits = np.packbits(bits, axis=1)
+
+    def leg_id(self, category, threshold, direction):
+        return self.leg_ids[(category, float(threshold), direction)]
+
+    def window_words(self, index, team_ids, dates, last_matches, legs=None):
+        """(legs x teams) uint64 words with bit j set when the j-th match of the team's window meets the leg"""
+        if last_matches > MAX_WINDOW:
+            raise ValueError(f'last_matches must be at most {MAX_WINDOW}')
+        legs = np.arange(len(self.legs)) if legs is None else np.asarray(legs)
+        starts, ends = index.windows(team_ids, last_matches, dates)
+        offsets = starts[:, None] + np.arange(last_matches)
+        valid = offsets < ends[:, None]
+        positions = index.positions[np.minimum(offsets, max(len(index.positions) - 1, 0))] if len(index.positions) \
+            else np.zeros(offsets.shape, dtype=np.int64)
+
+        met = (self.bits[legs[:, None, None], positions >> 3] >> (7 - (positions & 7)).astype(np.uint8)) & 1
+        met = met.astype(bool) & valid
+        weights = np.left_shift(np.uint64(1), np.arange(last_matches, dtype=np.uint64))
+        words = np.bitwise_or.reduce(np.where(met, weights, np.uint64(0)), axis=-1) if last_matches \
+            else np.zeros(met.shape[:2], dtype=np.uint64)
+        return words, ends - starts
+
+    def h2h_words(self, fixtures, h2h_matches, legs=None):
+        """window_words() over the last h2h_matches meetings of each fixture's teams, in any competition"""
+        if self.pairs is None:
+            self.pairs = PairIndex(self.store)
+        keys = pair_keys(self.store['home_id'][fixtures], self.store['away_id'][fixtures])
+        return self.window_words(self.pairs, keys, self.store['date'][fixtures], h2h_matches, legs)
+
+    def prepare(self, date_from, date_to, last_matches, leagues, legs=None):
+        """Fixtures with enough history and their home/away window words"""
+        index = self.index.for_leagues(leagues)
+        fixtures = select_fixtures(self.store, date_from, date_to, leagues)
+        dates = self.store['date'][fixtures]
+        home_words, home_n = self.window_words(index, self.store['home_id'][fixtures], dates, last_matches, legs)
+        away_words, away_n = self.window_words(index, self.store['away_id'][fixtures], dates, last_matches, legs)
+
+        # Same "not enough data" rule as analyzeFixtureMultiCriteria
+        min_matches = min(3, last_matches)
+        enough = (home_n >= min_matches) & (away_n >= min_matches)
+        return (fixtures[enough], home_words[:, enough], home_n[enough],
+                away_words[:, enough], away_n[enough])
+
+    def fixture_table(self, fixtures, columns):
+        """Prepend fixture identity columns to per-fixture results"""
+        store = self.store
+        league_names = {meta['league_id']: meta['league_name'] for meta in store.partitions.values()}
+        strings = np.asarray(store.strings, dtype=object)
+        table = pd.DataFrame({
+            'date': store['date'][fixtures],
+            'league_id': store['league_id'][fixtures],
+            'match_id': store['match_id'][fixtures],
+            'home_team': strings[store['home_name'][fixtures]],
+            'away_team': strings[store['away_name'][fixtures]],
+        })
+        table.insert(2, 'league', table['league_id'].map(league_names))
+        for name, values in columns.items():
+            table[name] = values
+        return table
+
+    def evaluate(self, legs, date_from, date_to=None, last_matches=5, leagues=None, min_success_rate=0,
+                 h2h_matches=None):
+        """Score every fixture in a date range against one conjunction of legs (and, with h2h_matches,
+        over the teams' last meetings)"""
+        leg_ids = [self.leg_id(*leg) for leg in legs]
+        fixtures, home_words, home_n, away_words, away_n = self.prepare(
+            date_from, date_to, last_matches, leagues, leg_ids)
+
+        home_hits = popcount(np.bitwise_and.reduce(home_words, axis=0))
+        away_hits = popcount(np.bitwise_and.reduce(away_words, axis=0))
+        table = self.fixture_table(fixtures, {
+            'criteria': ', '.join(leg_text(leg) for leg in legs),
+            'home_hits': home_hits, 'home_matches': home_n,
+            'away_hits': away_hits, 'away_matches': away_n,
+            'home_rate': success_rate(home_hits, home_n),
+            'away_rate': success_rate(away_hits, away_n),
+            'combined_rate': success_rate(home_hits + away_hits, home_n + away_n),
+        })
+        if h2h_matches is not None:
+            h2h_words, h2h_n = self.h2h_words(fixtures, h2h_matches, leg_ids)
+            h2h_hits = popcount(np.bitwise_and.reduce(h2h_words, axis=0))
+            table['h2h_hits'], table['h2h_matches'] = h2h_hits, h2h_n
+            table['h2h_rate'] = success_rate(h2h_hits, h2h_n)
+        table = table[table['combined_rate'] >= min_success_rate]
+        return table.sort_values('combined_rate', ascending=False, kind='stable').reset_index(drop=True)
+
+    def search(self, date_from, date_to=None, last_matches=5, leagues=None, min_success_rate=80, max_legs=3,
+               categories=None, h2h_matches=None, top=TOP_BUILDERS, min_legs=2):
+        """The 2- and 3-leg builders (distinct categories) whose combined rate reaches min_success_rate
+
+        Only legs of the given categories are combined (default: the full-time ones); the half categories
+        are opt-in because every one added multiplies the number of combinations. Each fixture keeps its
+        `top` builders by combined rate, more legs first on ties (None keeps all), with at least min_legs
+        legs. With h2h_matches, kept builders are also scored over the teams' last meetings.
+        """
+        categories = set(categories or FULL_TIME_CATEGORIES)
+        unknown = categories - set(self.thresholds)
+        if unknown:
+            raise KeyError(f"unknown categories: {', '.join(sorted(unknown))}")
+        if not 2 <= min_legs <= max_legs <= 3:
+            raise ValueError('need 2 <= min_legs <= max_legs <= 3')
+        if top is not None and top < 1:
+            raise ValueError('top must be at least 1')
+        allowed = np.array([i for i, leg in enumerate(self.legs) if leg[0] in categories], dtype=np.int64)
+        fixtures, home_words, home_n, away_words, away_n = self.prepare(date_from, date_to, last_matches, leagues)
+        total_n = home_n + away_n
+        # rate >= min implies hits * 100 >= (min - 0.5) * total; success_rate()'s float steps can still round
+        # an exact half down (23/40 is 57), so what passes is checked against the real rate at the end
+        needed = (min_success_rate - 0.5) * total_n / 100
+
+        found = []
+
+        def collect(legs, fixture_ids, home_hits, away_hits):
+            found.append((legs, fixture_ids, home_hits, away_hits))
+
+        # A conjunction can only lose bits, so combinations extending a failing one are never evaluated
+        passing = {}
+        for i in allowed.tolist():
+            hits = popcount(home_words[i]) + popcount(away_words[i])
+            passing[i] = np.flatnonzero(hits >= needed)
+
+        for i, j in itertools.combinations(allowed.tolist(), 2):
+            if self.leg_categories[i] == self.leg_categories[j]:
+                continue
+            candidates = np.intersect1d(passing[i], passing[j], assume_unique=True)
+            if not len(candidates):
+                continue
+            home_pair = home_words[i, candidates] & home_words[j, candidates]
+            away_pair = away_words[i, candidates] & away_words[j, candidates]
+            home_hits = popcount(home_pair)
+            away_hits = popcount(away_pair)
+            ok = home_hits + away_hits >= needed[candidates]
+            if not ok.any():
+                continue
+            if min_legs <= 2:
+                collect((i, j), candidates[ok], home_hits[ok], away_hits[ok])
+
+            if max_legs < 3:
+                continue
+            candidates, home_pair, away_pair = candidates[ok], home_pair[ok], away_pair[ok]
+            third = allowed[allowed > j]
+            third = third[(self.leg_categories[third] != self.leg_categories[i])
+                          & (self.leg_categories[third] != self.leg_categories[j])]
+            if not len(third):
+                continue
+            home_hits = popcount(home_words[third[:, None], candidates] & home_pair)
+            away_hits = popcount(away_words[third[:, None], candidates] & away_pair)
+            ok = home_hits + away_hits >= needed[candidates]
+            for row in np.flatnonzero(ok.any(axis=1)):
+                collect((i, j, third[row]), candidates[ok[row]], home_hits[row, ok[row]], away_hits[row, ok[row]])
+
+        if not found:
+            return self.fixture_table(fixtures[:0], {'criteria': [], 'legs': [], 'combined_rate': []})
+
+        positions = np.concatenate([f[1] for f in found])
+        home_hits = np.concatenate([f[2] for f in found])
+        away_hits = np.concatenate([f[3] for f in found])
+        groups = np.concatenate([np.full(len(f[1]), g) for g, f in enumerate(found)])
+        n_legs = np.concatenate([np.full(len(f[1]), len(f[0])) for f in found])
+        rates = success_rate(home_hits + away_hits, total_n[positions])
+        keep = rates >= min_success_rate
+        positions, home_hits, away_hits, groups, n_legs, rates = (
+            a[keep] for a in (positions, home_hits, away_hits, groups, n_legs, rates))
+        if top is not None:
+            # Best first within each fixture (ties in the order found), then the first `top` of each
+            order = np.lexsort((np.arange(len(positions)), -n_legs, -rates, positions))
+            fixture_starts = np.flatnonzero(np.append(True, positions[order][1:] != positions[order][:-1]))
+            rank = np.arange(len(order)) - np.repeat(fixture_starts, np.diff(np.append(fixture_starts, len(order))))
+            keep = np.sort(order[rank < top])
+            positions, home_hits, away_hits = positions[keep], home_hits[keep], away_hits[keep]
+            groups, n_legs = groups[keep], n_legs[keep]
+        texts = np.array([', '.join(leg_text(self.legs[l]) for l in f[0]) for f in found], dtype=object)
+        table = self.fixture_table(fixtures[positions], {
+            'criteria': texts[groups], 'legs': n_legs,
+            'home_hits': home_hits, 'home_matches': home_n[positions],
+            'away_hits': away_hits, 'away_matches': away_n[positions],
+            'home_rate': success_rate(home_hits, home_n[positions]),
+            'away_rate': success_rate(away_hits, away_n[positions]),
+            'combined_rate': success_rate(home_hits + away_hits, total_n[positions]),
+        })
+        if h2h_matches is not None:
+            h2h_words, h2h_n = self.h2h_words(fixtures, h2h_matches)
+            leg_ids = np.array([list(f[0]) + [f[0][-1]] * (3 - len(f[0])) for f in found])[groups].T
+            h2h_hits = popcount(np.bitwise_and.reduce(h2h_words[leg_ids, positions], axis=0))
+            table['h2h_hits'], table['h2h_matches'] = h2h_hits, h2h_n[positions]
+            table['h2h_rate'] = success_rate(h2h_hits, h2h_n[positions])
+        return table.sort_values(['date', 'match_id', 'combined_rate', 'legs'], ascending=[True, True, False, False],
+                                 kind='stable').reset_index(drop=True)
+
+
+def parse_leg(text):
+    """'corners:over:8.5' -> ('corners', 8.5, 'over')"""
+    category, direction, threshold = text.split(':')
+    return category, float(threshold), direction
+
+
+def main():
+    """Evaluate a bet builder, or search every 2-3 leg builder, for a range of fixture dates"""
+    parser = argparse.ArgumentParser(description='Bet builder engine over the compiled match store')
+    parser.add_argument('date_from', help='first fixture date (YYYY-MM-DD)')
+    parser.add_argument('date_to', nargs='?', help='last fixture date (defaults to date_from)')
+    parser.add_argument('--leg', action='append', default=[], help='category:over|under:threshold (repeatable)')
+    parser.add_argument('--search', action='store_true', help='enumerate every 2- and 3-leg combination')
+    parser.add_argument('--max-legs', type=int, default=3, choices=(2, 3))
+    parser.add_argument('--min-legs', type=int, default=2, choices=(2, 3), help='(search) fewest legs reported')
+    parser.add_argument('--top', type=int, default=TOP_BUILDERS,
+                        help='(search) builders kept per fixture, best combined rate first (0: all)')
+    parser.add_argument('--categories', help='(search) comma separated categories to combine, e.g. '
+                                             'goals,corners,corners_ht (default: the full-time ones)')
+    parser.add_argument('--last', type=int, default=5, help='number of previous matches per team')
+    parser.add_argument('--min-success-rate', type=int, default=70)
+    parser.add_argument('--h2h', type=int, help='also score builders over the teams\' last H2H meetings')
+    parser.add_argument('--leagues', help='comma separated league ids (default: all)')
+    parser.add_argument('--output', help='write the table to this CSV file')
+    args = parser.parse_args()
+
+    if not args.search and not args.leg:
+        parser.error('give at least one --leg or use --search')
+
+    leagues = args.leagues.split(',') if args.leagues else None
+    engine = BuilderEngine(load_store())
+    if args.search:
+        table = engine.search(args.date_from, args.date_to, args.last, leagues, args.min_success_rate, args.max_legs,
+                              args.categories.split(',') if args.categories else None, args.h2h, args.top or None,
+                              args.min_legs)
+    else:
+        table = engine.evaluate([parse_leg(l) for l in args.leg], args.date_from, args.date_to, args.last,
+                                leagues, args.min_success_rate, args.h2h)
+
+    print(f"🧱 {len(table)} builders at {args.min_success_rate}%+ combined success rate")
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"💾 Saved to {args.output}")
+    else:
+        print(table.head(30).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+// League data from the bundles publish_bundles.py writes: stripped records under content-hashed names,
+// so every page load only revalidates the small manifest and unchanged leagues come from the browser cache.
+// Leagues without a bundle (or without a published manifest at all) are read from their raw file.
+
+const BUNDLES_DIR = 'compiled/bundles/';
+const BUNDLES_MANIFEST = BUNDLES_DIR + 'manifest.json';
+
+let bundleManifest;
+
+async function loadBundleManifest() {
+  if (bundleManifest === undefined) {
+    try {
+      // The manifest is the one file that changes in place, so it must not be served stale
+      const response = await fetch(BUNDLES_MANIFEST, { cache: 'no-cache' });
+      bundleManifest = response.ok ? await response.json() : null;
+    } catch (error) {
+      bundleManifest = null;
+    }
+  }
+  return bundleManifest;
+}
+
+function leagueDataFile(manifest, file) {
+  const bundle = manifest && manifest.files[file.split('/').pop()];
+  return bundle ? BUNDLES_DIR + bundle.file : file;
+}
+
+// Fetch [leagueId, leagueInfo] entries (JSON_FILES style) all at once; resolves to [leagueId, leagueInfo,
+// matches] in the same order, with matches null for leagues that could not be loaded
+async function fetchLeagueData(leagues) {
+  const manifest = await loadBundleManifest();
+  return Promise.all(leagues.map(async ([leagueId, leagueInfo]) => {
+    const file = leagueDataFile(manifest, leagueInfo.file);
+    try {
+      const response = await fetch(file);
+      if (!response.ok) {
+        console.warn(`Could not load ${file}: ${response.status}`);
+        return [leagueId, leagueInfo, null];
+      }
+      return [leagueId, leagueInfo, await response.json()];
+    } catch (error) {
+      console.warn(`Failed to load ${file}:`, error);
+      return [leagueId, leagueInfo, null];
+    }
+  }));
+}
@@ -1,17 +1,95 @@
-
 import os
+import argparse
 import pandas as pd
-from datetime import datetime
-
-def filter_csv_files():
+from concurrent.futures import ProcessPoolExecutor
+import instrumentation
+from instrumentation import count, span, timed_iter
+from seasons import current_season, season_start
+
+# Date formats the files use, in order of preference for values that match several
+DATE_FORMATS = ['%d%m%Y', '%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y']
+CHUNK_ROWS = 100_000
+
+def parse_dates(values, formats=DATE_FORMATS):
+    """Vectorized per-value format fallback: each format only sees the values earlier ones could not parse"""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    pending = values.notna() & (values != '')
+    for fmt in formats:
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(values[pending], format=fmt, errors='coerce')
+        parsed[attempt.index] = attempt
+        pending &= parsed.isna()
+    return parsed
+
+def detect_date_formats(file_path, sample_rows=1000):
+    """Formats that parse anything in the first rows of the Date column, best first, with the rest as fallback"""
+    sample = pd.read_csv(file_path, usecols=['Date'], dtype=str, keep_default_na=False, nrows=sample_rows)['Date']
+    # Formats the sample uses keep their DATE_FORMATS order; the others only see values those could not read
+    hits = [parse_dates(sample, [fmt]).notna().sum() for fmt in DATE_FORMATS]
+    return [fmt for fmt, n in zip(DATE_FORMATS, hits) if n] + [fmt for fmt, n in zip(DATE_FORMATS, hits) if not n]
+
+def filter_file(file_path, output_path, cutoff_date, chunksize=CHUNK_ROWS):
+    """Stream one CSV in chunks, keeping rows dated on or after the cutoff; returns per-file counts"""
+    stats = {'file': os.path.basename(file_path), 'rows': 0, 'dated': 0, 'kept': 0, 'error': None}
+    try:
+        header = pd.read_csv(file_path, nrows=0).columns
+        if 'Date' not in header:
+            stats['error'] = "No 'Date' column found"
+            return stats
+
+        with span('detect_date_formats', file=stats['file']):
+            formats = detect_date_formats(file_path)
+        cutoff = pd.Timestamp(cutoff_date)
+        tmp_path = f"{output_path}.tmp"
+        wrote_header = False
+        # Every column is read as text, so chunks agree on types and kept rows are written back unchanged
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+            reader = pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+            for chunk in timed_iter('read_csv', reader, file=stats['file']):
+                with span('parse_dates', file=stats['file']):
+                    dates = parse_dates(chunk['Date'], formats)
+                stats['rows'] += len(chunk)
+                stats['dated'] += int(dates.notna().sum())
+                kept = chunk[dates >= cutoff]
+                stats['kept'] += len(kept)
+                count('rows_read', len(chunk))
+                count('rows_filtered', len(chunk) - len(kept))
+                if len(kept) or not wrote_header:
+                    with span('write_csv', file=stats['file']):
+                        kept.to_csv(out, index=False, header=not wrote_header)
+                    wrote_header = True
+
+        if not stats['dated']:
+            os.remove(tmp_path)
+            stats['error'] = 'Could not parse any dates'
+            return stats
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        if os.path.exists(f"{output_path}.tmp"):
+            os.remove(f"{output_path}.tmp")
+        stats['error'] = str(e)
+    return stats
+
+def traced_filter_file(file_path, output_path, cutoff_date, chunksize=CHUNK_ROWS):
+    with span('filter_file', file=os.path.basename(file_path)):
+        return filter_file(file_path, output_path, cutoff_date, chunksize)
+
+def _filter_file_task(task):
+    traced, *args = task
+    return instrumentation.worker_call(traced, traced_filter_file, *args)
+
+def filter_csv_files(input_dir='other', output_dir=None, cutoff_date=None, suffix=None, chunksize=CHUNK_ROWS,
+                     workers=None, season=None):
     """
-    Filter all CSV files in leagues/other/ directory to show only matches from 20/08/2025 onwards.
-    Creates new files with '2025' suffix in leagues/other2025/ directory.
+    Filter all CSV files in input_dir to show only matches from cutoff_date onwards.
+    Creates new files with the suffix appended to the name in output_dir.
+    Output folder, cutoff and suffix default to leagues/other<season>, the season's start and <season>.
     """
-
-    # Define the input and output directories
-    input_dir = 'other'
-    output_dir = 'leagues/other2025'
+    season = season or current_season()
+    output_dir = output_dir or f'leagues/other{season}'
+    cutoff_date = cutoff_date or season_start(season)
+    suffix = str(season) if suffix is None else suffix
 
     # Check if input directory exists
     if not os.path.exists(input_dir):
@@ -22,11 +100,8 @@ def filter_csv_files():
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory created/verified: {output_dir}")
 
-    # Define the cutoff date (20/08/2025)
-    cutoff_date = datetime(2025, 8, 20)
-
     # Get all CSV files in the input directory
-    csv_files = [f for f in os.listdir(input_dir) if f.endswith('.csv')]
+    csv_files = sorted(f for f in os.listdir(input_dir) if f.endswith('.csv'))
 
     if not csv_files:
         print(f"No CSV files found in {input_dir}")
@@ -36,78 +111,47 @@ def filter_csv_files():
     for file in csv_files:
         print(f"  - {file}")
 
-    # Process each CSV file
-    processed_files = 0
-    for filename in csv_files:
-        try:
-            # Read the CSV file
-            file_path = os.path.join(input_dir, filename)
-            print(f"\nProcessing {filename}...")
-
-            # Read CSV with pandas
-            df = pd.read_csv(file_path)
-
-            # Print column names to understand the structure
-            print(f"Columns in {filename}: {list(df.columns)}")
-
-            # Check if there's a Date column
-            if 'Date' not in df.columns:
-                print(f"No 'Date' column found in {filename}, skipping...")
-                continue
+    tasks = [(instrumentation.TRACER.enabled, os.path.join(input_dir, filename),
+              os.path.join(output_dir, f"{filename.replace('.csv', '')}{suffix}.csv"),
+              cutoff_date, chunksize)
+             for filename in csv_files]
 
-            # Convert Date column to datetime
-            # Handle different date formats that might exist
-            original_count = len(df)
-
-            # Try to parse dates - assuming format might be DD/MM/YYYY or similar
-            def parse_date(date_str):
-                try:
-                    # Try different date formats
-                    for fmt in ['%d%m%Y', '%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y']:
-                        try:
-                            return datetime.strptime(str(date_str), fmt)
-                        except ValueError:
-                            continue
-                    return None
-                except:
-                    return None
-
-            # Apply date parsing
-            df['parsed_date'] = df['Date'].apply(parse_date)
-
-            # Remove rows where date parsing failed
-            df_with_dates = df[df['parsed_date'].notna()].copy()
-
-            if len(df_with_dates) == 0:
-                print(f"Could not parse any dates in {filename}, skipping...")
+    # Files are independent, so they are filtered concurrently and reported in order
+    processed_files = 0
+    cutoff_text = cutoff_date.strftime('%d/%m/%Y')
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (_, _, output_path, _, _), output in zip(tasks, pool.map(_filter_file_task, tasks)):
+            stats = instrumentation.worker_result(output)
+            print(f"\nProcessing {stats['file']}...")
+            if stats['error']:
+                print(f"Error processing {stats['file']}: {stats['error']}, skipping...")
                 continue
-
-            # Filter for dates from 20/08/2025 onwards
-            filtered_df = df_with_dates[df_with_dates['parsed_date'] >= cutoff_date].copy()
-
-            # Drop the helper column
-            filtered_df = filtered_df.drop('parsed_date', axis=1)
-
-            print(f"Original rows: {original_count}")
-            print(f"Rows with valid dates: {len(df_with_dates)}")
-            print(f"Rows from 20/08/2025 onwards: {len(filtered_df)}")
-
-            # Create output filename in the new directory
-            base_name = filename.replace('.csv', '')
-            output_filename = f"{base_name}2025.csv"
-            output_path = os.path.join(output_dir, output_filename)
-
-            # Save the filtered data
-            filtered_df.to_csv(output_path, index=False)
-            print(f"Saved filtered data to {output_dir}/{output_filename}")
+            print(f"Original rows: {stats['rows']}")
+            print(f"Rows with valid dates: {stats['dated']}")
+            print(f"Rows from {cutoff_text} onwards: {stats['kept']}")
+            print(f"Saved filtered data to {output_path}")
             processed_files += 1
 
-        except Exception as e:
-            print(f"Error processing {filename}: {str(e)}")
-
     print(f"\nProcessing complete!")
     print(f"Successfully processed {processed_files} out of {len(csv_files)} files")
     print(f"Filtered files saved in: {output_dir}/")
 
+def main():
+    parser = argparse.ArgumentParser(description='Keep only matches from a cutoff date onwards in every CSV file')
+    parser.add_argument('--input-dir', default='other')
+    parser.add_argument('--season', type=int, help='season to keep, by its first year (default: the current one)')
+    parser.add_argument('--output-dir', help='default: leagues/other<season>')
+    parser.add_argument('--cutoff', help='first date to keep (YYYY-MM-DD, default: the season start)')
+    parser.add_argument('--suffix', help='appended to each output file name (default: the season)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='rows read per chunk')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumentation.profiling(args, 'filter_csv_files'):
+        filter_csv_files(args.input_dir, args.output_dir,
+                         datetime.strptime(args.cutoff, '%Y-%m-%d') if args.cutoff else None,
+                         args.suffix, args.chunksize, args.workers, args.season)
+
 if __name__ == "__main__":
-    filter_csv_files()
+    main()
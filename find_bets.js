@@ -173,7 +173,6 @@ const results = document.getElementById('results');
 document.addEventListener('DOMContentLoaded', function () {
   setDefaultDate();
   initializeLeagueSelection();
-  loadAllData();
   setupEventListeners();
 });
 
@@ -294,6 +293,14 @@ function updateThresholdOptions() {
   }
 }
 
+// The league files are only read for dates without a slate, and then only once
+let allDataLoaded = null;
+
+function ensureAllData() {
+  allDataLoaded = allDataLoaded || loadAllData();
+  return allDataLoaded;
+}
+
 // Load all data from JSON files
 async function loadAllData() {
   try {
@@ -302,19 +309,10 @@ async function loadAllData() {
     allMatchesData = [];
     allFixturesData = [];
 
-    for (const [leagueId, leagueInfo] of Object.entries(JSON_FILES)) {
-      if (!selectedLeagues.has(leagueId)) continue;
+    // Every league, since the selection can change after loading
+    for (const [leagueId, leagueInfo, matches] of await fetchLeagueData(Object.entries(JSON_FILES))) {
+      if (!matches) continue;
       try {
-        console.log(`Loading ${leagueInfo.name}...`);
-        const response = await fetch(leagueInfo.file);
-
-        if (!response.ok) {
-          console.warn(`Could not load ${leagueInfo.file}: ${response.status}`);
-          continue;
-        }
-
-        const matches = await response.json();
-
         matches.forEach(match => {
           const matchDate = new Date(match.match_date);
 
@@ -408,21 +406,28 @@ async function handleFormSubmit(e) {
     return;
   }
 
-  if (allMatchesData.length === 0) {
-    showError('No historical match data available. Please wait for data to load.');
-    return;
-  }
+  let slate = await loadSlate(fixtureDate);
+  if (slate && !slateCovers(slate, lastMatches)) slate = null;
+  if (!slate) {
+    await ensureAllData();
 
-  if (allFixturesData.length === 0) {
-    showError('No fixture data available.');
-    return;
+    if (allMatchesData.length === 0) {
+      showError('No historical match data available. Please wait for data to load.');
+      return;
+    }
+
+    if (allFixturesData.length === 0) {
+      showError('No fixture data available.');
+      return;
+    }
   }
 
   setLoading(true);
   hideError();
 
   try {
-    const opportunities = analyzeFixturesForDate(fixtureDate, lastMatches, category, threshold, overUnder, minSuccessRate);
+    const opportunities = analyzeFixturesForDate(fixtureDate, lastMatches, category, threshold, overUnder,
+      minSuccessRate, slate);
     renderResults(opportunities, fixtureDate, lastMatches, category, threshold, overUnder, minSuccessRate);
   } catch (error) {
     console.error('Analysis error:', error);
@@ -432,14 +437,58 @@ async function handleFormSubmit(e) {
   }
 }
 
+// Slate history is each team's last N matches in any league. It answers a league-restricted search when the
+// selected leagues still leave enough of it, or when it is the team's whole history.
+function slateCovers(slate, lastMatches) {
+  if (lastMatches > slate.lastMatches) return false;
+  return slate.fixtures.filter(fixture => selectedLeagues.has(fixture.leagueId)).every(fixture =>
+    [fixture.homeTeamId, fixture.awayTeamId].every(teamId => {
+      const history = slate.history[teamId] || [];
+      return history.length < slate.lastMatches ||
+        history.filter(match => selectedLeagues.has(match.leagueId)).length >= lastMatches;
+    }));
+}
+
+// A slate row in the matchData shape loadAllData() builds
+function slateMatchData(row, status) {
+  const value = field => row[field] || 0;
+  return {
+    date: new Date(row.dateString),
+    homeTeam: row.homeTeam,
+    awayTeam: row.awayTeam,
+    homeScore: value('fthg'),
+    awayScore: value('ftag'),
+    status: status,
+    league: row.league,
+    leagueId: row.leagueId,
+    totalGoals: value('fthg') + value('ftag'),
+    totalShots: value('hs') + value('as'),
+    totalCorners: value('hc') + value('ac'),
+    totalCards: value('hy') + value('hr') + value('ay') + value('ar'),
+    matchId: row.matchId
+  };
+}
+
+// The day's upcoming fixtures from a slate, each carrying both teams' history
+function slateFixtures(slate) {
+  const history = teamId => (slate.history[teamId] || []).map(row => slateMatchData(row, 'Finished'));
+  return slate.fixtures
+    .filter(row => row.match_status === 'Not Started')
+    .map(row => ({
+      ...slateMatchData(row, row.match_status),
+      homeHistory: history(row.homeTeamId),
+      awayHistory: history(row.awayTeamId)
+    }));
+}
+
 // Analyze fixtures for a specific date
-function analyzeFixturesForDate(fixtureDate, lastMatches, category, threshold, overUnder, minSuccessRate) {
+function analyzeFixturesForDate(fixtureDate, lastMatches, category, threshold, overUnder, minSuccessRate, slate) {
   const targetDate = new Date(fixtureDate);
   const opportunities = [];
 
   console.log(`🔍 Looking for fixtures on ${fixtureDate}...`);
 
-  const fixturesOnDate = allFixturesData.filter(fixture => {
+  const fixturesOnDate = (slate ? slateFixtures(slate) : allFixturesData).filter(fixture => {
            return fixture.date.toDateString() === targetDate.toDateString() &&
                selectedLeagues.has(fixture.leagueId); 
   });
@@ -475,8 +524,11 @@ function analyzeFixturesForDate(fixtureDate, lastMatches, category, threshold, o
 
 // Analyze a single fixture
 function analyzeFixture(fixture, lastMatches, category, threshold, overUnder) {
-  const homeTeamMatches = getTeamLastMatches(fixture.homeTeam, lastMatches, fixture.date);
-  const awayTeamMatches = getTeamLastMatches(fixture.awayTeam, lastMatches, fixture.date);
+  const lastOf = (history, teamName) => history
+    ? history.filter(match => selectedLeagues.has(match.leagueId)).slice(-lastMatches)
+    : getTeamLastMatches(teamName, lastMatches, fixture.date);
+  const homeTeamMatches = lastOf(fixture.homeHistory, fixture.homeTeam);
+  const awayTeamMatches = lastOf(fixture.awayHistory, fixture.awayTeam);
 
   if (homeTeamMatches.length < Math.min(3, lastMatches) || awayTeamMatches.length < Math.min(3, lastMatches)) {
     console.log(`⚠️ Not enough data for ${fixture.homeTeam} (${homeTeamMatches.length}) vs ${fixture.awayTeam} (${awayTeamMatches.length})`);
@@ -393,18 +393,11 @@ async function loadAllData() {
     allMatchesData = [];
     allFixturesData = [];
 
-    for (const [leagueId, leagueInfo] of Object.entries(JSON_FILES)) {
-      if (!selectedLeagues.has(leagueId)) continue;
+    const leagues = Object.entries(JSON_FILES).filter(([leagueId]) => selectedLeagues.has(leagueId));
+    for (const [leagueId, leagueInfo, matches] of await fetchLeagueData(leagues)) {
+      if (!matches) continue;
 
       try {
-        console.log(`Loading ${leagueInfo.name}...`);
-        const response = await fetch(leagueInfo.file);
-        if (!response.ok) {
-          console.warn(`Could not load ${leagueInfo.file}: ${response.status}`);
-          continue;
-        }
-
-        const matches = await response.json();
         matches.forEach(match => {
           const matchDate = new Date(match.match_date);
 
@@ -458,7 +451,7 @@ async function loadAllData() {
 
             homeScoreHalfTime: parseInt(match.match_hometeam_halftime_score) || 0,
             awayScoreHalfTime: parseInt(match.match_awayteam_halftime_score) || 0,
-            totalGoalsht: (parseInt(match.match_match_hometeam_halftime_score) || 0) + (parseInt(match.match_awayteam_halftime_score) || 0),
+            totalGoalsht: (parseInt(match.match_hometeam_halftime_score) || 0) + (parseInt(match.match_awayteam_halftime_score) || 0),
             totalCornersht: cornersHomeht + cornersAwayht,
             totalShotsht: shotsHomeht + shotsAwayht,
             totalFoulsht: foulsHomeht + foulsAwayht,
@@ -0,0 +1,288 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+from match_store import (FIRST_HALF, SECOND_HALF, STATUS_FINISHED, STORE_DIR, load_store, read_manifest,
+                         window_partitions)
+from team_index import TeamIndex, success_rate
+from secondary_index import REFEREE_CATEGORIES, REFEREE_MATCHES, SecondaryIndex, fixture_codes
+from head_to_head import PairIndex
+from team_ratings import OPPOSITION_COLUMNS, RATING_COLUMNS, fixture_ratings, opposition_ratings, update_ratings
+
+# Same lines as THRESHOLDS in find_bets.js
+THRESHOLDS = {
+    'goals': [1.5, 2.5, 3.5, 4.5, 5.5],
+    'shots': [18.5, 19.5, 20.5, 21.5, 22.5, 23.5, 24.5, 25.5, 26.5, 27.5, 28.5, 29.5, 30.5, 31.5],
+    'corners': [5.5, 6.5, 7.5, 8.5, 9.5, 10.5, 11.5, 12.5, 13.5],
+    'cards': [1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+}
+
+# First-half lines of the *ht THRESHOLDS in app.js; second halves are scored on the same lines
+HALF_LINES = {
+    'goals': [0.5, 1.5, 2.5, 3.5],
+    'corners': [0.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+    'fouls': [8.5, 9.5, 10.5, 11.5, 12.5, 13.5, 14.5],
+    'cards': [0.5, 1.5, 2.5],
+    'shots': [8.5, 9.5, 10.5, 11.5, 12.5, 13.5, 14.5],
+    'shotsOnGoal': [2.5, 3.5, 4.5, 5.5, 6.5],
+}
+HALF_THRESHOLDS = {f'{category}{half}': lines
+                   for half in (FIRST_HALF, SECOND_HALF) for category, lines in HALF_LINES.items()}
+
+DIRECTIONS = ('over', 'under')
+
+RESULT_COLUMNS = ['date', 'league_id', 'league', 'match_id', 'home_team', 'away_team', 'category', 'threshold',
+                  'direction', 'home_hits', 'home_matches', 'away_hits', 'away_matches', 'combined_hits',
+                  'combined_matches', 'home_rate', 'away_rate', 'combined_rate']
+# Added when the referee's own record is blended in (REFEREE_CATEGORIES only; others keep combined_rate)
+REFEREE_COLUMNS = ['referee', 'referee_hits', 'referee_matches', 'referee_rate', 'blended_rate']
+# Added when the teams' last meetings are scored too
+H2H_COLUMNS = ['h2h_hits', 'h2h_matches', 'h2h_rate']
+
+
+def select_fixtures(store, date_from, date_to=None, leagues=None, include_finished=False):
+    """Store positions of fixtures dated within [date_from, date_to] in the selected leagues"""
+    date_to = date_to or date_from
+    dates = store['date']
+    mask = (dates >= np.datetime64(date_from, 'D')) & (dates <= np.datetime64(date_to, 'D'))
+    mask &= store.league_mask(leagues)
+    if include_finished:
+        mask &= store.upcoming_mask() | (store['status'] == STATUS_FINISHED)
+    else:
+        mask &= store.upcoming_mask()
+    return np.flatnonzero(mask)
+
+
+def pick_thresholds(categories, *threshold_sets):
+    """{category: lines} for some categories, taken from the first threshold set that has them"""
+    picked = {}
+    for category in categories:
+        lines = next((thresholds[category] for thresholds in threshold_sets if category in thresholds), None)
+        if lines is None:
+            raise KeyError(f'unknown category {category!r}')
+        picked[category] = lines
+    return picked
+
+
+def stacked_hit_prefix(index, category, thresholds):
+    """(thresholds x entries+1) array of over-threshold prefix counts"""
+    return np.vstack([index.hit_prefix(category, t) for t in thresholds])
+
+
+def blend_rates(combined_rate, referee_rate, referee_matches, weight, min_matches):
+    """Weighted mix of the teams' and the referee's rates, rounded like success_rate(); teams only without
+    enough referee matches"""
+    blended = np.floor((1 - weight) * combined_rate + weight * referee_rate + 0.5).astype(np.int64)
+    return np.where(referee_matches >= min_matches, blended, combined_rate)
+
+
+def scan_fixtures(store, date_from, date_to=None, last_matches=5, leagues=None, thresholds=None,
+                  min_success_rate=0, index=None, include_finished=False, referee_weight=None,
+                  referee_matches=REFEREE_MATCHES, referee_index=None, referees=None, h2h_matches=None,
+                  h2h_index=None, min_h2h_rate=0, ratings=None, max_rating_gap=None):
+    """Score every fixture in a date range against every category, threshold and direction at once
+
+    With a referee_weight, card and foul lines also get the referee's record over their last referee_matches
+    games and a blended_rate mixing it in, which then drives filtering and sorting. Fixtures rarely have a
+    referee before kick-off, so referees={match_id: name} can supply announced appointments.
+
+    With h2h_matches, every line also gets its record over the two teams' last h2h_matches meetings in any
+    competition; min_h2h_rate then drops lines whose meetings do not back them up.
+
+    With TeamRatings, every line also gets both teams' ratings going into the fixture and the average rating
+    of the opponents in their last-N samples; max_rating_gap then drops fixtures between mismatched teams.
+    """
+    thresholds = thresholds or THRESHOLDS
+    index = (index or TeamIndex(store)).for_leagues(leagues)
+    fixtures = select_fixtures(store, date_from, date_to, leagues, include_finished)
+
+    home_start, home_end = index.windows(store['home_id'][fixtures], last_matches, store['date'][fixtures])
+    away_start, away_end = index.windows(store['away_id'][fixtures], last_matches, store['date'][fixtures])
+    home_n = home_end - home_start
+    away_n = away_end - away_start
+
+    # Same "not enough data" rule as analyzeFixture
+    min_matches = min(3, last_matches)
+    enough = (home_n >= min_matches) & (away_n >= min_matches)
+    fixtures, home_start, home_end, away_start, away_end = (
+        a[enough] for a in (fixtures, home_start, home_end, away_start, away_end))
+    home_n, away_n = home_n[enough], away_n[enough]
+
+    blend = referee_weight is not None
+    if blend:
+        if referee_index is None:
+            # Referees also officiate cup and European games, so their record is taken from every league
+            referee_index = SecondaryIndex(store, 'referee', require_stats=True)
+        referee_codes = fixture_codes(referee_index, store, fixtures, referees)
+        referee_start, referee_end = referee_index.windows(referee_codes, referee_matches, store['date'][fixtures])
+        referee_n = referee_end - referee_start
+
+    h2h = h2h_matches is not None
+    if h2h:
+        h2h_index = h2h_index if h2h_index is not None else PairIndex(store)
+        h2h_start, h2h_end = h2h_index.fixture_windows(store, fixtures, h2h_matches)
+        h2h_n = h2h_end - h2h_start
+
+    rated = ratings is not None
+    if rated:
+        home_rating, away_rating = fixture_ratings(ratings, store, fixtures)
+        home_opposition = opposition_ratings(ratings, index, home_start, home_end)
+        away_opposition = opposition_ratings(ratings, index, away_start, away_end)
+
+    frames = []
+    for category, lines in thresholds.items():
+        prefix = stacked_hit_prefix(index, category, lines)
+        home_over = prefix[:, home_end] - prefix[:, home_start]
+        away_over = prefix[:, away_end] - prefix[:, away_start]
+        if blend and category in REFEREE_CATEGORIES:
+            referee_prefix = stacked_hit_prefix(referee_index, category, lines)
+            referee_over = referee_prefix[:, referee_end] - referee_prefix[:, referee_start]
+            category_referee_n = referee_n
+        elif blend:
+            referee_over = np.zeros((len(lines), len(fixtures)), dtype=np.int64)
+            category_referee_n = np.zeros(len(fixtures), dtype=np.int64)
+        if h2h:
+            h2h_prefix = stacked_hit_prefix(h2h_index, category, lines)
+            h2h_over = h2h_prefix[:, h2h_end] - h2h_prefix[:, h2h_start]
+
+        for direction in DIRECTIONS:
+            home_hits = home_over if direction == 'over' else home_n - home_over
+            away_hits = away_over if direction == 'over' else away_n - away_over
+            combined_hits = home_hits + away_hits
+            combined_n = np.broadcast_to(home_n + away_n, combined_hits.shape)
+            frame = {
+                'position': np.tile(fixtures, len(lines)),
+                'category': category,
+                'threshold': np.repeat(lines, len(fixtures)),
+                'direction': direction,
+                'home_hits': home_hits.ravel(),
+                'home_matches': np.broadcast_to(home_n, home_hits.shape).ravel(),
+                'away_hits': away_hits.ravel(),
+                'away_matches': np.broadcast_to(away_n, away_hits.shape).ravel(),
+                'combined_hits': combined_hits.ravel(),
+                'combined_matches': combined_n.ravel(),
+            }
+            if blend:
+                referee_hits = referee_over if direction == 'over' else category_referee_n - referee_over
+                frame['referee_code'] = np.tile(referee_codes, len(lines))
+                frame['referee_hits'] = referee_hits.ravel()
+                frame['referee_matches'] = np.broadcast_to(category_referee_n, referee_hits.shape).ravel()
+            if h2h:
+                h2h_hits = h2h_over if direction == 'over' else h2h_n - h2h_over
+                frame['h2h_hits'] = h2h_hits.ravel()
+                frame['h2h_matches'] = np.broadcast_to(h2h_n, h2h_hits.shape).ravel()
+            if rated:
+                frame['home_rating'] = np.tile(home_rating, len(lines))
+                frame['away_rating'] = np.tile(away_rating, len(lines))
+                frame['home_opposition'] = np.tile(home_opposition, len(lines))
+                frame['away_opposition'] = np.tile(away_opposition, len(lines))
+            frames.append(pd.DataFrame(frame))
+
+    columns = (RESULT_COLUMNS + (REFEREE_COLUMNS if blend else []) + (H2H_COLUMNS if h2h else [])
+               + (RATING_COLUMNS + OPPOSITION_COLUMNS if rated else []))
+    if not frames or not len(fixtures):
+        return pd.DataFrame(columns=columns)
+
+    table = pd.concat(frames, ignore_index=True)
+    table['home_rate'] = success_rate(table['home_hits'].to_numpy(), table['home_matches'].to_numpy())
+    table['away_rate'] = success_rate(table['away_hits'].to_numpy(), table['away_matches'].to_numpy())
+    table['combined_rate'] = success_rate(table['combined_hits'].to_numpy(), table['combined_matches'].to_numpy())
+    rate_column = 'combined_rate'
+    if blend:
+        table['referee_rate'] = success_rate(table['referee_hits'].to_numpy(), table['referee_matches'].to_numpy())
+        table['blended_rate'] = blend_rates(table['combined_rate'].to_numpy(), table['referee_rate'].to_numpy(),
+                                            table['referee_matches'].to_numpy(), referee_weight,
+                                            min(3, referee_matches))
+        codes = table.pop('referee_code').to_numpy()
+        labels = np.asarray(referee_index.labels, dtype=object)
+        table.insert(table.columns.get_loc('referee_hits'), 'referee',
+                     np.where(codes >= 0, labels[np.maximum(codes, 0)], ''))
+        rate_column = 'blended_rate'
+    if h2h:
+        table['h2h_rate'] = success_rate(table['h2h_hits'].to_numpy(), table['h2h_matches'].to_numpy())
+    if rated:
+        table['rating_gap'] = table['home_rating'] - table['away_rating']
+        for column in RATING_COLUMNS + OPPOSITION_COLUMNS:
+            table[column] = table[column].round(1)
+    if min_success_rate:
+        table = table[table[rate_column] >= min_success_rate]
+    if h2h and min_h2h_rate:
+        table = table[table['h2h_rate'] >= min_h2h_rate]
+    if rated and max_rating_gap is not None:
+        table = table[table['rating_gap'].abs() <= max_rating_gap]
+
+    positions = table['position'].to_numpy()
+    league_names = {meta['league_id']: meta['league_name'] for meta in store.partitions.values()}
+    strings = np.asarray(store.strings, dtype=object)
+    table.insert(0, 'date', store['date'][positions])
+    table.insert(1, 'league_id', store['league_id'][positions])
+    table.insert(2, 'league', table['league_id'].map(league_names))
+    table.insert(3, 'match_id', store['match_id'][positions])
+    table.insert(4, 'home_team', strings[store['home_name'][positions]])
+    table.insert(5, 'away_team', strings[store['away_name'][positions]])
+    table = table[columns]
+    return table.sort_values([rate_column, 'date', 'match_id'], ascending=[False, True, True],
+                             kind='stable').reset_index(drop=True)
+
+
+def main():
+    """Scan a fixture date range across every THRESHOLDS line"""
+    parser = argparse.ArgumentParser(description='Batch find_bets analysis for a range of fixture dates')
+    parser.add_argument('date_from', help='first fixture date (YYYY-MM-DD)')
+    parser.add_argument('date_to', nargs='?', help='last fixture date (defaults to date_from)')
+    parser.add_argument('--last', type=int, default=5, help='number of previous matches per team')
+    parser.add_argument('--min-success-rate', type=int, default=80)
+    parser.add_argument('--leagues', help='comma separated league ids (default: all)')
+    parser.add_argument('--categories', help='comma separated categories, e.g. corners,goals_ht,cards_2h '
+                                             '(default: the find_bets.js ones)')
+    parser.add_argument('--referee-weight', type=float,
+                        help='blend the referee\'s card/foul record into those lines with this weight (0-1)')
+    parser.add_argument('--referee-matches', type=int, default=REFEREE_MATCHES,
+                        help='previous games per referee for --referee-weight')
+    parser.add_argument('--referees', help='CSV of match_id,referee appointments for fixtures without one')
+    parser.add_argument('--h2h', type=int, help='also score every line over the teams\' last H2H meetings')
+    parser.add_argument('--min-h2h-rate', type=int, default=0, help='(with --h2h) minimum head-to-head rate')
+    parser.add_argument('--ratings', action='store_true', help='add the teams\' Elo ratings and their samples\' '
+                                                               'opposition ratings')
+    parser.add_argument('--max-rating-gap', type=float, help='(implies --ratings) skip fixtures whose teams\' '
+                                                             'ratings differ by more than this')
+    parser.add_argument('--output', help='write the table to this CSV file')
+    args = parser.parse_args()
+    if args.referee_weight is not None and not 0 <= args.referee_weight <= 1:
+        parser.error('--referee-weight must be between 0 and 1')
+
+    leagues = args.leagues.split(',') if args.leagues else None
+    try:
+        thresholds = pick_thresholds(args.categories.split(','), THRESHOLDS, HALF_THRESHOLDS) \
+            if args.categories else None
+    except KeyError as e:
+        parser.error(e.args[0])
+    referees = None
+    if args.referees:
+        appointments = pd.read_csv(args.referees, dtype={'referee': str})
+        referees = dict(zip(appointments['match_id'].astype(int), appointments['referee'].fillna('')))
+    # Only the partitions holding the fixtures and their teams' last matches are read; referee records and
+    # head-to-head meetings can go back any number of seasons, so those read every partition
+    partitions = None
+    manifest = read_manifest()
+    if args.referee_weight is None and args.h2h is None and manifest is not None:
+        partitions = window_partitions(manifest, args.date_from, args.date_to, args.last, leagues, STORE_DIR,
+                                       index_leagues=leagues)
+    store = load_store(partitions=partitions)
+    ratings = update_ratings()[0] if args.ratings or args.max_rating_gap is not None else None
+    table = scan_fixtures(store, args.date_from, args.date_to, args.last, leagues, thresholds,
+                          min_success_rate=args.min_success_rate, referee_weight=args.referee_weight,
+                          referee_matches=args.referee_matches, referees=referees, h2h_matches=args.h2h,
+                          min_h2h_rate=args.min_h2h_rate, ratings=ratings, max_rating_gap=args.max_rating_gap)
+
+    print(f"🔍 {table['match_id'].nunique()} fixtures with {len(table)} bets at {args.min_success_rate}%+ "
+          f"{'blended' if args.referee_weight is not None else 'combined'} success rate")
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"💾 Saved to {args.output}")
+    else:
+        print(table.head(30).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
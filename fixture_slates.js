@@ -0,0 +1,64 @@
+// Per-date slates from slate_shards.py: one day's fixtures plus the recent finished matches of every team
+// playing, so the today/find-bets pages only fetch that day instead of every league file.
+// Pages fall back to the full league data for dates without a slate (or when no slates are published).
+
+const SLATES_DIR = 'compiled/slates/';
+const SLATES_INDEX = SLATES_DIR + 'index.json';
+const SLATES_VERSION = 2;
+
+let slateIndex;
+
+async function loadSlateIndex() {
+  if (slateIndex === undefined) {
+    try {
+      const response = await fetch(SLATES_INDEX, { cache: 'no-cache' });
+      const index = response.ok ? await response.json() : null;
+      slateIndex = index && index.version === SLATES_VERSION ? index : null;
+    } catch (error) {
+      slateIndex = null;
+    }
+  }
+  return slateIndex;
+}
+
+function slateRows(columns, rows) {
+  return rows.map(row => Object.fromEntries(columns.map((column, i) => [column, row[i]])));
+}
+
+// Resolves to {date, lastMatches, fixtures, matches, history} for a YYYY-MM-DD date, or null without a slate.
+// Rows become matchData-style objects with team and league names filled in; history maps a team id to its
+// matches oldest first.
+async function loadSlate(date) {
+  const index = await loadSlateIndex();
+  const entry = index && index.dates[date];
+  if (!entry) return null;
+  let slate;
+  try {
+    // Slates are rewritten in place when the store changes
+    const response = await fetch(SLATES_DIR + entry.file, { cache: 'no-cache' });
+    if (!response.ok) {
+      console.warn(`Could not load slate ${entry.file}: ${response.status}`);
+      return null;
+    }
+    slate = await response.json();
+  } catch (error) {
+    console.warn(`Failed to load slate ${entry.file}:`, error);
+    return null;
+  }
+
+  const name = (rows, leagues) => rows.forEach(row => {
+    row.leagueId = String(row.leagueId);
+    row.league = (JSON_FILES[row.leagueId] || {}).name || leagues[row.leagueId] || '';
+    row.homeTeam = slate.teams[row.homeTeamId];
+    row.awayTeam = slate.teams[row.awayTeamId];
+  });
+  const fixtures = slateRows(slate.fixture_columns, slate.fixtures);
+  const matches = slateRows(slate.match_columns, slate.matches);
+  name(fixtures, slate.leagues);
+  name(matches, {});
+  const history = {};
+  Object.entries(slate.history).forEach(([teamId, rows]) => {
+    history[teamId] = rows.map(i => matches[i]);
+  });
+  return { date: slate.date, lastMatches: slate.last_matches, fixtures, matches, history };
+}
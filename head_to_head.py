@@ -0,0 +1,101 @@
+import argparse
+import numpy as np
+
+from match_store import CATEGORIES, load_store
+from team_index import EntryIndex, success_rate
+from team_registry import load_registry
+
+# Meetings scored per fixture by default
+H2H_MATCHES = 5
+
+
+def pair_keys(home_ids, away_ids):
+    """Unordered team pair keys, (smaller id << 32) | larger id, so both venues of a meeting share one key"""
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+    return (np.minimum(home_ids, away_ids) << 32) | np.maximum(home_ids, away_ids)
+
+
+class PairIndex(EntryIndex):
+    """Finished meetings of every pair of teams in date order, over every league and cup, with prefix sums
+    of the category totals, so the last k meetings before a fixture and their hit counts are two lookups"""
+
+    def __init__(self, store, leagues=None, registry=None):
+        self.registry = registry
+        self.leagues = frozenset(int(l) for l in leagues) if leagues is not None else None
+        positions = np.flatnonzero(store.finished_mask() & store.league_mask(self.leagues))
+        super().__init__(store, pair_keys(store['home_id'][positions], store['away_id'][positions]), positions)
+
+    def team_id(self, team):
+        """API team id for an id or, with a registry, any known name or alias"""
+        if isinstance(team, str) and self.registry is not None:
+            team_id = self.registry.resolve(team)
+            if team_id is None:
+                raise KeyError(f'Unknown team {team!r}')
+            return team_id
+        return int(team)
+
+    def pair_key(self, team_a, team_b):
+        return int(pair_keys(self.team_id(team_a), self.team_id(team_b)))
+
+    def window(self, team_a, team_b, n=None, before_date=None):
+        """(start, end) entry range of two teams' last n meetings (all if n is None) strictly before a date"""
+        return self.key_window(self.pair_key(team_a, team_b), n, before_date)
+
+    def last_n(self, team_a, team_b, n=None, before_date=None):
+        """Store positions of two teams' last n meetings before a date (oldest first)"""
+        start, end = self.window(team_a, team_b, n, before_date)
+        return self.positions[start:end]
+
+    def hit_rate(self, team_a, team_b, n, before_date, category, threshold, over_under='over'):
+        """(successCount, totalMatches, successRate %) over two teams' last n meetings before a date"""
+        start, end = self.window(team_a, team_b, n, before_date)
+        hits = int(self.hit_count(category, threshold, start, end, over_under))
+        total = end - start
+        return hits, total, success_rate(hits, total)
+
+    def fixture_windows(self, store, fixtures, n):
+        """(starts, ends) entry ranges of the last n meetings before each fixture"""
+        keys = pair_keys(store['home_id'][fixtures], store['away_id'][fixtures])
+        return self.windows(keys, n, store['date'][fixtures])
+
+
+def build_pair_index(store=None, leagues=None, registry=None):
+    """Load the compiled store (if not given) and index it by team pair"""
+    return PairIndex(store if store is not None else load_store(), leagues, registry)
+
+
+def main():
+    """List two teams' last meetings and how often a line went over in them"""
+    parser = argparse.ArgumentParser(description='Head-to-head meetings of two teams across every competition')
+    parser.add_argument('team_a', help='team id, name or alias')
+    parser.add_argument('team_b', help='team id, name or alias')
+    parser.add_argument('--last', type=int, default=H2H_MATCHES, help='number of meetings')
+    parser.add_argument('--before', help='only meetings before this date (YYYY-MM-DD)')
+    parser.add_argument('--category', default='goals', choices=sorted(CATEGORIES))
+    parser.add_argument('--threshold', type=float, default=2.5)
+    args = parser.parse_args()
+    if args.last < 1:
+        parser.error('--last must be at least 1')
+
+    store = load_store()
+    index = PairIndex(store, registry=load_registry())
+    teams = [int(team) if team.isdigit() else team for team in (args.team_a, args.team_b)]
+    try:
+        positions = index.last_n(*teams, args.last, args.before)
+        hits, total, rate = index.hit_rate(*teams, args.last, args.before, args.category, args.threshold)
+    except KeyError as e:
+        parser.error(e.args[0])
+
+    print(f"🤝 HEAD TO HEAD: {store.team_name(index.team_id(teams[0]))} - {store.team_name(index.team_id(teams[1]))}")
+    print("="*40)
+    totals = store.totals(args.category)
+    for pos in positions.tolist():
+        record = store.record(pos)
+        print(f"  {record['date']}  {record['homeTeam']} {record['homeScore']}-{record['awayScore']} "
+              f"{record['awayTeam']}  ({record['league']})  {args.category}: {totals[pos]}")
+    print(f"📈 Over {args.threshold}: {hits}/{total} ({rate}%)")
+
+
+if __name__ == "__main__":
+    main()
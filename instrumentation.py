@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import bisect
+import cProfile
+import resource
+import threading
+import contextlib
+from datetime import datetime
+
+SAMPLE_INTERVAL = 0.05
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes"""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemorySampler(threading.Thread):
+    """Background thread that records (time, RSS) every interval, so spans can report their peak"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.times = []
+        self.values = []
+        self.stopped = threading.Event()
+
+    def sample(self):
+        self.times.append(time.perf_counter())
+        self.values.append(current_rss())
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def peak_between(self, start, end):
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+        return max(self.values[lo:hi], default=0)
+
+
+class Tracer:
+    """Timed spans, counters and RSS samples for one run; a disabled tracer does close to nothing"""
+
+    def __init__(self, enabled=False, sample_interval=SAMPLE_INTERVAL):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now()
+        self.events = []
+        self.counters = {}
+        self.worker_peaks = {}
+        self.sampler = None
+        self.local = threading.local()
+
+    def start(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now()
+        if self.sample_interval and self.sampler is None:
+            self.sampler = MemorySampler(self.sample_interval)
+            self.sampler.start()
+        return self
+
+    def stop(self):
+        if self.sampler is not None and self.sampler.is_alive():
+            self.sampler.stop()
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def _span(self, name, args):
+        stack = self.stack()
+        event = {'name': name, 'args': dict(args), 'counters': {}, 'depth': len(stack)}
+        rss_start = current_rss()
+        stack.append(event)
+        started = time.perf_counter()
+        try:
+            yield event
+        finally:
+            ended = time.perf_counter()
+            stack.pop()
+            rss_end = current_rss()
+            peak = self.sampler.peak_between(started, ended) if self.sampler is not None else 0
+            # Without a sampler (worker processes) a span's peak is at least that of its nested spans
+            peak = max(peak, rss_start, rss_end, event.pop('child_peak', 0))
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1].get('child_peak', 0), peak)
+            event.update({
+                'start': started - self.origin,
+                'duration': ended - started,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'rss_start': rss_start,
+                'rss_end': rss_end,
+                'rss_peak': peak,
+            })
+            self.events.append(event)
+
+    def span(self, name, **args):
+        """Context manager timing one stage; args (file names, sizes) are kept with the span"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name, args)
+
+    def count(self, name, n=1):
+        """Add n to a run-wide counter and to the innermost open span's counters"""
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+        stack = self.stack()
+        if stack:
+            stack[-1]['counters'][name] = stack[-1]['counters'].get(name, 0) + n
+
+    def timed_iter(self, name, iterable, **args):
+        """Yield from an iterable with every next() call in its own span (e.g. chunked read_csv)"""
+        iterator = iter(iterable)
+        i = 0
+        while True:
+            with self.span(name, chunk=i, **args):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+            i += 1
+
+    def payload(self):
+        """What a worker process sends back to the parent tracer"""
+        return {'events': self.events, 'counters': self.counters, 'pid': os.getpid(), 'peak_rss': peak_rss()}
+
+    def merge(self, payload):
+        """Fold a worker's spans and counters into this tracer"""
+        if payload is None:
+            return
+        offset = payload.get('origin', self.origin) - self.origin
+        for event in payload['events']:
+            self.events.append(dict(event, start=event['start'] + offset))
+        for name, n in payload['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        self.worker_peaks[payload['pid']] = max(self.worker_peaks.get(payload['pid'], 0), payload['peak_rss'])
+
+    def summary(self):
+        """Per-stage totals: calls, total/max seconds, peak RSS and summed counters"""
+        stages = {}
+        for event in self.events:
+            stage = stages.setdefault(event['name'], {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'peak_rss_mb': 0.0,
+                                                      'counters': {}})
+            stage['calls'] += 1
+            stage['total_s'] += event['duration']
+            stage['max_s'] = max(stage['max_s'], event['duration'])
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], event['rss_peak'] / 2**20)
+            for name, n in event['counters'].items():
+                stage['counters'][name] = stage['counters'].get(name, 0) + n
+        for stage in stages.values():
+            stage['total_s'] = round(stage['total_s'], 6)
+            stage['max_s'] = round(stage['max_s'], 6)
+            stage['peak_rss_mb'] = round(stage['peak_rss_mb'], 1)
+        return dict(sorted(stages.items(), key=lambda item: -item[1]['total_s']))
+
+    def trace(self, tool=None):
+        """JSON-ready trace: Chrome trace events (chrome://tracing, Perfetto) plus the stage summary"""
+        trace_events = [{
+            'name': event['name'],
+            'ph': 'X',
+            'ts': round(event['start'] * 1e6, 1),
+            'dur': round(event['duration'] * 1e6, 1),
+            'pid': event['pid'],
+            'tid': event['tid'],
+            'args': dict(event['args'], **event['counters'], rss_peak_mb=round(event['rss_peak'] / 2**20, 1)),
+        } for event in sorted(self.events, key=lambda e: e['start'])]
+        return {
+            'tool': tool,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'wall_s': round(time.perf_counter() - self.origin, 6),
+            'peak_rss_mb': round(peak_rss() / 2**20, 1),
+            'worker_peak_rss_mb': {str(pid): round(peak / 2**20, 1) for pid, peak in self.worker_peaks.items()},
+            'counters': self.counters,
+            'stages': self.summary(),
+            'traceEvents': trace_events,
+            'displayTimeUnit': 'ms',
+        }
+
+
+TRACER = Tracer()
+
+
+def span(name, **args):
+    return TRACER.span(name, **args)
+
+
+def count(name, n=1):
+    TRACER.count(name, n)
+
+
+def timed_iter(name, iterable, **args):
+    if not TRACER.enabled:
+        return iterable
+    return TRACER.timed_iter(name, iterable, **args)
+
+
+def worker_call(traced, fn, *args):
+    """Run fn in a worker process; when the parent is tracing, returns (result, spans to merge)"""
+    global TRACER
+    if not traced:
+        return fn(*args), None
+    # A forked worker inherits the parent's tracer, so every task starts a fresh one
+    TRACER = Tracer(enabled=True, sample_interval=0)
+    result = fn(*args)
+    payload = TRACER.payload()
+    payload['origin'] = TRACER.origin
+    TRACER = Tracer()
+    return result, payload
+
+
+def worker_result(output):
+    """Parent side of worker_call(): merge the worker's spans and return its result"""
+    result, payload = output
+    TRACER.merge(payload)
+    return result
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', nargs='?', const='', metavar='TRACE.json',
+                        help='record stage timings, counters and memory to a JSON trace')
+    parser.add_argument('--cprofile', metavar='FILE.prof', help='with --profile, also dump cProfile stats')
+
+
+def print_summary(tracer, top=15):
+    print(f"\n⏱️  PROFILE ({time.perf_counter() - tracer.origin:.2f}s, peak RSS {peak_rss() / 2**20:.0f} MB)")
+    for name, stage in list(tracer.summary().items())[:top]:
+        print(f"  {name:<28} {stage['calls']:>6} calls {stage['total_s']:>9.3f}s  max {stage['max_s']:.3f}s  "
+              f"{stage['peak_rss_mb']:>7.1f} MB")
+    for name, n in sorted(tracer.counters.items()):
+        print(f"  • {name}: {n:,}")
+
+
+@contextlib.contextmanager
+def profiling(args, tool):
+    """Trace (and optionally cProfile) the body when the tool was started with --profile"""
+    if getattr(args, 'profile', None) is None:
+        yield None
+        return
+
+    trace_path = args.profile or f"{tool}_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    tracer = TRACER.start()
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with tracer.span(tool):
+            yield tracer
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+        tracer.stop()
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(tracer.trace(tool), f, indent=1)
+        print_summary(tracer)
+        print(f"💾 Trace saved to {trace_path}" + (f", cProfile stats to {args.cprofile}" if profiler else ''))
@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+
+from match_store import LEAGUES_DIR, LEAGUE_FILE_PATTERN, STATUS_FINISHED, STORE_DIR, status_code, write_json
+from seasons import current_season
+
+try:
+    import aiohttp
+except ImportError:  # urllib in worker threads is used instead
+    aiohttp = None
+
+DEFAULT_BASE_URL = 'https://apiv3.apifootball.com/'
+API_KEY_ENV = 'APIFOOTBALL_KEY'
+SYNC_STATE_FILE = os.path.join(STORE_DIR, 'download_state.json')
+
+# Long ranges are split so requests stay small and run in parallel
+WINDOW_DAYS = 31
+# Finished matches still get late stat corrections for a couple of days
+REFRESH_LOOKBACK_DAYS = 3
+# Unfinished past matches older than this are taken as postponed/abandoned and not re-requested
+UNSETTLED_MAX_DAYS = 14
+FIXTURE_LOOKAHEAD_DAYS = 21
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (OSError, asyncio.TimeoutError, json.JSONDecodeError) + ((aiohttp.ClientError,) if aiohttp else ())
+
+
+class DownloadError(Exception):
+    pass
+
+
+class HostLimiter:
+    """At most `concurrency` requests in flight and `rate` request starts per second for one host"""
+
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self.lock:
+                now = time.monotonic()
+                wait = self.next_start - now
+                self.next_start = max(now, self.next_start) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class LeagueDownloader:
+    """Pooled, rate-limited API-Football client; use as `async with LeagueDownloader(...) as client`"""
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, concurrency=8, rate=5.0, retries=4, backoff=1.0,
+                 timeout=60):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiters = {}
+        self.session = None
+        self.requests = 0
+
+    async def __aenter__(self):
+        if aiohttp is not None:
+            connector = aiohttp.TCPConnector(limit_per_host=self.concurrency, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.session is not None:
+            await self.session.close()
+
+    def limiter(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.concurrency, self.rate)
+        return self.limiters[host]
+
+    async def get_json(self, params):
+        """GET base_url?params with retries and exponential backoff; returns decoded JSON"""
+        url = f'{self.base_url}?{urllib.parse.urlencode({**params, "APIkey": self.api_key})}'
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                async with self.limiter(url):
+                    self.requests += 1
+                    status, retry_after, body = await self.request(url)
+                if status == 200:
+                    return json.loads(body)
+                if status not in RETRY_STATUSES:
+                    raise DownloadError(f'HTTP {status} for {params}')
+                error = DownloadError(f'HTTP {status} for {params}')
+            except RETRY_EXCEPTIONS as e:
+                error = DownloadError(f'{type(e).__name__}: {e} for {params}')
+
+            if attempt == self.retries:
+                raise error
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            await asyncio.sleep(max(delay, retry_after or 0))
+
+    async def request(self, url):
+        """(status, Retry-After seconds or None, body bytes)"""
+        if self.session is not None:
+            async with self.session.get(url) as response:
+                return response.status, retry_after_seconds(response.headers), await response.read()
+        return await asyncio.to_thread(self.request_blocking, url)
+
+    def request_blocking(self, url):
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return response.status, None, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, retry_after_seconds(e.headers), e.read()
+
+    async def get_events(self, league_id, date_from, date_to):
+        """Every match of a league between two dates (inclusive)"""
+        data = await self.get_json({'action': 'get_events', 'from': str(date_from), 'to': str(date_to),
+                                    'league_id': league_id})
+        # The API answers "no matches" with an error object rather than an empty list
+        if isinstance(data, dict):
+            if data.get('error') == 404:
+                return []
+            raise DownloadError(f"API error for league {league_id}: {data.get('message', data)}")
+        return data
+
+
+def retry_after_seconds(headers):
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def split_window(date_from, date_to, days=WINDOW_DAYS):
+    """[(from, to)] chunks of at most `days` days covering the inclusive range"""
+    chunks = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=days - 1), date_to)
+        chunks.append((start, end))
+        start = end + timedelta(days=1)
+    return chunks
+
+
+def season_window(year):
+    """Dates a league_<id>_<year>.json file covers: the calendar year plus the spring of the next"""
+    return date(year, 1, 1), date(year + 1, 6, 30)
+
+
+def sync_window(matches, year, today, last_sync=None, full=False):
+    """Date range worth requesting: from the last sync (or the oldest recent unsettled match) to the lookahead"""
+    season_start, season_end = season_window(year)
+    if full or not matches:
+        return season_start, season_end
+
+    recent = today - timedelta(days=UNSETTLED_MAX_DAYS)
+    unsettled = [date.fromisoformat(m['match_date']) for m in matches
+                 if status_code(m.get('match_status')) != STATUS_FINISHED]
+    start = min([d for d in unsettled if recent <= d <= today] + [last_sync or today, today])
+    start = max(season_start, start - timedelta(days=REFRESH_LOOKBACK_DAYS))
+    # Fixtures further out are picked up as the lookahead reaches them (or with full=True)
+    end = min(season_end, today + timedelta(days=FIXTURE_LOOKAHEAD_DAYS))
+    return start, max(start, end)
+
+
+def merge_matches(existing, fresh):
+    """Existing matches updated with fresh ones by match_id, in date order"""
+    merged = {m['match_id']: m for m in existing}
+    merged.update((m['match_id'], m) for m in fresh)
+    # Stable sort on the date only, so an unchanged file keeps its exact order and is not rewritten
+    return sorted(merged.values(), key=lambda m: m.get('match_date', ''))
+
+
+def read_league_file(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_league_file(path, matches):
+    """Atomically write a league file in the same layout as the API dumps"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(matches, indent=2, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+
+def read_sync_state(path=SYNC_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def sync_league(client, league_id, year, leagues_dir=LEAGUES_DIR, state=None, today=None, full=False):
+    """Fetch the changed date window of one league and merge it into its file; returns a summary dict"""
+    today = today or date.today()
+    key = f'{league_id}_{year}'
+    path = os.path.join(leagues_dir, f'league_{key}.json')
+    existing = await asyncio.to_thread(read_league_file, path)
+    last_sync = (state or {}).get(key, {}).get('synced_at')
+    last_sync = datetime.fromisoformat(last_sync).date() if last_sync else None
+
+    date_from, date_to = sync_window(existing, year, today, last_sync, full)
+    chunks = await asyncio.gather(*(client.get_events(league_id, start, end)
+                                    for start, end in split_window(date_from, date_to)))
+    fresh = [m for chunk in chunks for m in chunk]
+
+    merged = merge_matches(existing, fresh)
+    changed = merged != existing
+    if changed:
+        await asyncio.to_thread(write_league_file, path, merged)
+    return {'key': key, 'from': str(date_from), 'to': str(date_to), 'fetched': len(fresh),
+            'matches': len(merged), 'added': len(merged) - len(existing), 'changed': changed}
+
+
+async def sync_leagues(leagues, api_key, base_url=DEFAULT_BASE_URL, leagues_dir=LEAGUES_DIR,
+                       state_path=SYNC_STATE_FILE, concurrency=8, rate=5.0, full=False, today=None):
+    """Sync many (league_id, year) pairs concurrently; returns (summaries, failures)"""
+    state = read_sync_state(state_path)
+    os.makedirs(leagues_dir, exist_ok=True)
+    async with LeagueDownloader(api_key, base_url, concurrency, rate) as client:
+        results = await asyncio.gather(*(sync_league(client, league_id, year, leagues_dir, state, today, full)
+                                         for league_id, year in leagues), return_exceptions=True)
+
+    summaries, failures = [], []
+    synced_at = datetime.now().isoformat(timespec='seconds')
+    for (league_id, year), result in zip(leagues, results):
+        if isinstance(result, Exception):
+            failures.append((f'{league_id}_{year}', result))
+            continue
+        summaries.append(result)
+        state[result['key']] = {'synced_at': synced_at, 'from': result['from'], 'to': result['to']}
+
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    write_json(state_path, state)
+    return summaries, failures
+
+
+def local_leagues(leagues_dir=LEAGUES_DIR):
+    """(league_id, year) of every league file already on disk"""
+    found = []
+    for filename in sorted(os.listdir(leagues_dir)) if os.path.isdir(leagues_dir) else []:
+        match = LEAGUE_FILE_PATTERN.match(filename)
+        if match:
+            found.append((int(match.group(1)), int(match.group(2))))
+    return found
+
+
+def default_season(league_id, leagues_dir=LEAGUES_DIR, today=None):
+    """Season year for a league id given without --year: its newest file on disk, else the season under way
+
+    Aug-May seasons are named after their first year, so the calendar year would start a second,
+    overlapping file every January.
+    """
+    years = [year for league, year in local_leagues(leagues_dir) if league == league_id]
+    if years:
+        return max(years)
+    return current_season(today)
+
+
+def main():
+    """Refresh league JSON files from API-Football"""
+    parser = argparse.ArgumentParser(description='Concurrently download and merge API-Football league files')
+    parser.add_argument('leagues', nargs='*', type=int, help='league ids (default: every league file on disk)')
+    parser.add_argument('--year', type=int,
+                        help='season year for the given league ids (default: the newest file on disk, '
+                             'else the season under way)')
+    parser.add_argument('--leagues-dir', default=LEAGUES_DIR)
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help='API endpoint (e.g. a local stub server)')
+    parser.add_argument('--api-key', default=os.environ.get(API_KEY_ENV), help=f'defaults to ${API_KEY_ENV}')
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight per host')
+    parser.add_argument('--rate', type=float, default=5.0, help='request starts per second per host')
+    parser.add_argument('--full', action='store_true', help='download whole seasons instead of changed windows')
+    parser.add_argument('--compile', action='store_true',
+                        help='update the compiled match store and team ratings afterwards')
+    parser.add_argument('--publish', action='store_true', help='republish the pages\' data bundles afterwards')
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error(f'give --api-key or set ${API_KEY_ENV}')
+    leagues = [(league_id, args.year or default_season(league_id, args.leagues_dir)) for league_id in args.leagues] \
+        or local_leagues(args.leagues_dir)
+    if not leagues:
+        parser.error('no league ids given and no league files found')
+
+    print("🌐 LEAGUE DOWNLOADER")
+    print("="*40)
+    started = time.perf_counter()
+    summaries, failures = asyncio.run(sync_leagues(leagues, args.api_key, args.base_url, args.leagues_dir,
+                                                   concurrency=args.concurrency, rate=args.rate, full=args.full))
+    for summary in summaries:
+        mark = '✅' if summary['changed'] else '➖'
+        print(f"  {mark} {summary['key']}: {summary['fetched']} fetched for {summary['from']}..{summary['to']}, "
+              f"{summary['added']} new, {summary['matches']} total")
+    for key, error in failures:
+        print(f"  ❌ {key}: {error}")
+    changed = sum(1 for summary in summaries if summary['changed'])
+    print(f"\n📊 {len(summaries)} leagues synced ({changed} changed), {len(failures)} failed "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    if args.compile and changed:
+        from match_store import update_store
+        from team_ratings import update_ratings
+        update_store(args.leagues_dir)
+        update_ratings()
+    if args.publish and changed:
+        from publish_bundles import publish_bundles
+        publish_bundles(args.leagues_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import re
+import sys
+import json
+import argparse
+
+# Characters read per refill; a record that does not fit grows the read geometrically
+CHUNK_CHARS = 1 << 16
+
+WHITESPACE = re.compile(r'\s*')
+SEPARATOR = re.compile(r'\s*(?:,\s*)?')
+
+
+def iter_records(f, chunk_chars=CHUNK_CHARS):
+    """Yield the elements of a top-level JSON array one at a time from a text file
+
+    Only the current record and one chunk are held in memory: each record is decoded by the C
+    decoder as soon as the buffer holds all of it, and the consumed text is dropped.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def refill(size):
+        nonlocal buffer, pos, eof
+        chunk = f.read(size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer) or eof:
+            break
+        refill(chunk_chars)
+    if pos == len(buffer) or buffer[pos] != '[':
+        raise ValueError('expected a JSON array of match records')
+    pos += 1
+
+    while True:
+        pos = SEPARATOR.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('unexpected end of file inside the match array')
+            refill(chunk_chars)
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The record runs past the buffer: read at least as much again and retry from its start
+            refill(max(chunk_chars, len(buffer) - pos))
+            continue
+        pos = end
+        yield record
+
+
+def project(record, fields):
+    """Only the requested top-level fields of a record (missing ones are left out)"""
+    return {field: record[field] for field in fields if field in record}
+
+
+def iter_matches(path, fields=None, chunk_chars=CHUNK_CHARS):
+    """Stream the match records of a league_<id>_<year>.json file, optionally projected to some fields
+
+    Unrequested fields (goalscorer, badge URLs, ...) are dropped as each record is decoded, so they
+    never pile up; peak memory is one record plus one chunk however large the file is.
+    """
+    fields = tuple(fields) if fields is not None else None
+    with open(path, encoding='utf-8') as f:
+        for record in iter_records(f, chunk_chars):
+            yield project(record, fields) if fields is not None else record
+
+
+def filter_matches(matches, date_from=None, date_to=None, statuses=None):
+    """Matches dated within [date_from, date_to] ('YYYY-MM-DD' strings) with one of the given statuses"""
+    for match in matches:
+        date = match.get('match_date', '')
+        if date_from and date < date_from:
+            continue
+        if date_to and date > date_to:
+            continue
+        if statuses is not None and match.get('match_status', '') not in statuses:
+            continue
+        yield match
+
+
+def write_array(out, records):
+    """Stream records out as a JSON array, one record per line; returns the number written"""
+    n = 0
+    out.write('[')
+    for record in records:
+        out.write(',\n' if n else '\n')
+        out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        n += 1
+    out.write('\n]\n' if n else ']\n')
+    return n
+
+
+def main():
+    """Filter and project a league file without loading it whole"""
+    parser = argparse.ArgumentParser(description='Stream, filter and project the match records of a league file')
+    parser.add_argument('path', help='league_<id>_<year>.json file')
+    parser.add_argument('--fields', help='comma separated top-level fields to keep (default: all)')
+    parser.add_argument('--from', dest='date_from', help='first match date to keep (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', help='last match date to keep (YYYY-MM-DD)')
+    parser.add_argument('--status', action='append', help="match_status to keep, e.g. Finished (repeatable)")
+    parser.add_argument('--output', help='write the records here instead of stdout')
+    args = parser.parse_args()
+
+    matches = iter_matches(args.path, args.fields.split(',') if args.fields else None)
+    matches = filter_matches(matches, args.date_from, args.date_to, set(args.status) if args.status else None)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            n = write_array(out, matches)
+        print(f"✅ {n} matches written to {args.output}", file=sys.stderr)
+    else:
+        write_array(sys.stdout, matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -98,6 +98,10 @@ const JSON_FILES = {
 // Global variables
 let leaguesData = [];
 let isLoading = true;
+let teamSearch = null;
+// Lowercased team name -> [{card, item}] of its team items, so a search only touches the matching ones
+let teamItemsByName = new Map();
+let highlightedItems = [];
 
 // DOM elements
 const loadingElement = document.getElementById('loading-leagues');
@@ -109,6 +113,7 @@ const noResults = document.getElementById('no-results');
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function () {
   loadAllLeagues();
+  TeamSearch.load().then(index => teamSearch = index).catch(() => {});
   setupEventListeners();
 });
 
@@ -126,18 +131,9 @@ async function loadAllLeagues() {
     
     console.log('Loading leagues data from JSON files...');
 
-    for (const [leagueId, leagueInfo] of Object.entries(JSON_FILES)) {
+    for (const [leagueId, leagueInfo, matches] of await fetchLeagueData(Object.entries(JSON_FILES))) {
+      if (!matches) continue;
       try {
-        console.log(`Loading ${leagueInfo.name}...`);
-        const response = await fetch(leagueInfo.file);
-        
-        if (!response.ok) {
-          console.warn(`Could not load ${leagueInfo.file}: ${response.status}`);
-          continue;
-        }
-
-        const matches = await response.json();
-        
         // Extract unique team names from matches
         const teams = new Set();
         matches.forEach(match => {
@@ -181,6 +177,8 @@ async function loadAllLeagues() {
 // Display leagues
 function displayLeagues(leagues) {
   leaguesListElement.innerHTML = '';
+  teamItemsByName = new Map();
+  highlightedItems = [];
   leaguesListElement.classList.remove('hidden');
 
   if (leagues.length === 0) {
@@ -205,7 +203,6 @@ function createLeagueCard(league, index) {
   card.className = 'league-card';
   card.dataset.leagueName = league.name.toLowerCase();
   card.dataset.leagueId = league.id;
-  card.dataset.teams = league.teams.map(t => t.toLowerCase()).join('|');
 
   // Determine background color based on index
   const bgColorIndex = (index % 8) + 1;
@@ -269,6 +266,8 @@ function createLeagueCard(league, index) {
     teamItem.appendChild(teamIcon);
     teamItem.appendChild(teamName);
     teamsList.appendChild(teamItem);
+    if (!teamItemsByName.has(teamItem.dataset.teamName)) teamItemsByName.set(teamItem.dataset.teamName, []);
+    teamItemsByName.get(teamItem.dataset.teamName).push({ card, item: teamItem });
   });
 
   teamsContainer.appendChild(teamsList);
@@ -282,6 +281,69 @@ function createLeagueCard(league, index) {
 // Toggle league expansion
 function toggleLeague(card) {
   card.classList.toggle('expanded');
+  if (card.classList.contains('expanded')) showLeagueCube(card);
+}
+
+const CUBE_WINDOWS = [['season', 'Season'], ['last10', 'Last 10'], ['last5', 'Last 5']];
+const DEFAULT_CUBE_LINE = { category: 'goals', threshold: 2.5 };
+
+// Over rates of the league and its teams from the league's cube, added the first time a card opens
+async function showLeagueCube(card) {
+  if (card.dataset.cube) return;
+  card.dataset.cube = 'loading';
+  const shard = await loadLeagueCube(card.dataset.leagueId);
+  if (!shard) return;
+  card.dataset.cube = 'shown';
+
+  const lines = cubeLines(shard);
+  const panel = document.createElement('div');
+  panel.className = 'league-stats';
+  const select = document.createElement('select');
+  select.className = 'league-stats-line';
+  lines.forEach(line => select.add(new Option(`${line.category} over ${line.threshold}`, line.leg)));
+  const initial = lines.find(line => line.category === DEFAULT_CUBE_LINE.category &&
+    line.threshold === DEFAULT_CUBE_LINE.threshold);
+  select.value = String((initial || lines[0]).leg);
+  const table = document.createElement('table');
+  table.className = 'league-stats-table';
+  select.addEventListener('change', () => renderCubeTable(table, shard, Number(select.value)));
+  renderCubeTable(table, shard, Number(select.value));
+
+  panel.appendChild(select);
+  panel.appendChild(table);
+  card.querySelector('.teams-container').prepend(panel);
+}
+
+function cubeCell(counts, leg) {
+  const cell = document.createElement('td');
+  cell.textContent = counts && counts.matches
+    ? `${counts.over_rate[leg]}% (${counts.over[leg]}/${counts.matches})` : '-';
+  return cell;
+}
+
+function renderCubeTable(table, shard, leg) {
+  table.innerHTML = '';
+  const head = table.insertRow();
+  ['', ...CUBE_WINDOWS.map(([, label]) => label)].forEach(label => {
+    const th = document.createElement('th');
+    th.textContent = label;
+    head.appendChild(th);
+  });
+
+  // Teams with the highest season rate on the line first
+  const seasonRate = windows => (windows.season ? windows.season.over_rate[leg] : -1);
+  const teams = Object.entries(shard.teams)
+    .map(([teamId, venues]) => [shard.team_names[teamId] || teamId, venues.all || {}])
+    .sort((a, b) => seasonRate(b[1]) - seasonRate(a[1]));
+  const rows = [['League', shard.league], ...teams];
+  rows.forEach(([name, windows], i) => {
+    const row = table.insertRow();
+    if (i === 0) row.className = 'league-stats-total';
+    const label = document.createElement('td');
+    label.textContent = name;
+    row.appendChild(label);
+    CUBE_WINDOWS.forEach(([window]) => row.appendChild(cubeCell(windows[window], leg)));
+  });
 }
 
 // Filter leagues based on search
@@ -290,46 +352,45 @@ function filterLeagues() {
   const leagueCards = document.querySelectorAll('.league-card');
   let visibleCount = 0;
 
-  leagueCards.forEach(card => {
-    const leagueName = card.dataset.leagueName;
-    const leagueId = card.dataset.leagueId;
-    const teams = card.dataset.teams;
-    const teamItems = card.querySelectorAll('.team-item');
+  // Only the items highlighted by the previous search need clearing
+  highlightedItems.forEach(item => item.classList.remove('highlight'));
+  highlightedItems = [];
+  // Cards with a matching team, found through the index's matching names rather than by visiting every
+  // team item; before the index loads (or below its shortest query) names are matched by substring
+  const teamCards = new Set();
+  if (searchTerm) {
+    const highlight = ({ card, item }) => {
+      item.classList.add('highlight');
+      highlightedItems.push(item);
+      teamCards.add(card);
+    };
+    if (teamSearch && searchTerm.length >= teamSearch.minQuery) {
+      teamSearch.matchingNames(searchTerm).forEach(name => (teamItemsByName.get(name) || []).forEach(highlight));
+    } else {
+      teamItemsByName.forEach((entries, name) => { if (name.includes(searchTerm)) entries.forEach(highlight); });
+    }
+  }
 
+  leagueCards.forEach(card => {
     if (!searchTerm) {
       // Show all if search is empty
       card.classList.remove('hidden');
       card.classList.remove('expanded');
-      teamItems.forEach(item => item.classList.remove('highlight'));
       visibleCount++;
+      return;
+    }
+    // Check if league name or ID matches
+    const leagueMatches = card.dataset.leagueName.includes(searchTerm) || card.dataset.leagueId.includes(searchTerm);
+    const teamMatches = teamCards.has(card);
+
+    if (leagueMatches || teamMatches) {
+      card.classList.remove('hidden');
+      visibleCount++;
+      // If a team matches, expand the card to show the highlighted teams
+      if (teamMatches) card.classList.add('expanded');
     } else {
-      // Check if league name or ID matches
-      const leagueMatches = leagueName.includes(searchTerm) || leagueId.includes(searchTerm);
-      
-      // Check if any team matches
-      const teamMatches = teams.includes(searchTerm);
-
-      if (leagueMatches || teamMatches) {
-        card.classList.remove('hidden');
-        visibleCount++;
-
-        // If team matches, expand card and highlight matching teams
-        if (teamMatches) {
-          card.classList.add('expanded');
-          teamItems.forEach(item => {
-            if (item.dataset.teamName.includes(searchTerm)) {
-              item.classList.add('highlight');
-            } else {
-              item.classList.remove('highlight');
-            }
-          });
-        } else if (leagueMatches) {
-          teamItems.forEach(item => item.classList.remove('highlight'));
-        }
-      } else {
-        card.classList.add('hidden');
-        card.classList.remove('expanded');
-      }
+      card.classList.add('hidden');
+      card.classList.remove('expanded');
     }
   });
 
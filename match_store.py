@@ -0,0 +1,799 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+import numpy as np
+
+from league_reader import iter_matches
+
+LEAGUES_DIR = 'leagues'
+STORE_DIR = 'compiled'
+STRINGS_FILE = 'strings.json'
+MANIFEST_FILE = 'manifest.json'
+CHANGES_FILE = 'changes.json'
+
+LEAGUE_FILE_PATTERN = re.compile(r'^league_(\d+)_(\d{4})\.json$')
+# Manifest layout version; bumped when partition metadata gains fields, which forces a full rebuild
+MANIFEST_VERSION = 2
+
+# Match status codes (same split the pages use: 'Finished' is history, blank/Not Started/Scheduled are fixtures)
+STATUS_UPCOMING = 0
+STATUS_FINISHED = 1
+STATUS_OTHER = 2
+UPCOMING_STATUSES = ('', 'Not Started', 'Scheduled')
+
+# Per-side stat columns and the `statistics` type getStatValue() looks up for them
+STAT_TYPES = {
+    'shots': 'Shots Total',
+    'shots_on_goal': 'Shots On Goal',
+    'corners': 'Corners',
+    'yellow': 'Yellow Cards',
+    'red': 'Red Cards',
+    'fouls': 'Fouls',
+}
+
+# Betting categories (THRESHOLDS keys in the pages) -> per-side columns summed into the match total
+FULL_TIME_CATEGORIES = {
+    'goals': ('goals',),
+    'shots': ('shots',),
+    'shotsOnGoal': ('shots_on_goal',),
+    'corners': ('corners',),
+    'cards': ('yellow', 'red'),
+    'fouls': ('fouls',),
+}
+
+# First-half columns come from statistics_1half and the halftime score; second halves are derived at load
+FIRST_HALF = '_ht'
+SECOND_HALF = '_2h'
+CATEGORIES = dict(FULL_TIME_CATEGORIES, **{
+    f'{category}{half}': tuple(f'{col}{half}' for col in cols)
+    for half in (FIRST_HALF, SECOND_HALF) for category, cols in FULL_TIME_CATEGORIES.items()
+})
+
+# Blocks leave out (or leave blank) the types a league does not track, which read as 0, so each row records
+# which STAT_TYPES its full-time block reported, one bit per type in STAT_TYPES order
+STAT_BITS = {col: 1 << i for i, col in enumerate(STAT_TYPES)}
+# Types some leagues fill with 0 - 0 when they were not counted; a real match never ends with none of them
+ZERO_UNREPORTED = ('shots', 'shots_on_goal', 'corners', 'fouls')
+
+SIDE_COLUMNS = ('goals',) + tuple(STAT_TYPES)
+HALF_COLUMNS = tuple(f'{col}{FIRST_HALF}' for col in SIDE_COLUMNS)
+STAT_DTYPE = np.int16
+
+# Partition column layout; each partition file is these arrays back to back in this order
+COLUMNS = [
+    ('match_id', np.int32),
+    ('date', 'datetime64[D]'),
+    ('time', np.int16),
+    ('status', np.int8),
+    ('home_id', np.int32),
+    ('away_id', np.int32),
+    ('home_name', np.int32),
+    ('away_name', np.int32),
+    ('referee', np.int32),
+    ('stadium', np.int32),
+    ('round', np.int32),
+    ('stage', np.int32),
+    ('has_stats', np.bool_),
+    ('has_stats_ht', np.bool_),
+    ('stat_types', np.int16),
+] + [(f'{side}_{col}', STAT_DTYPE) for side in ('home', 'away') for col in SIDE_COLUMNS + HALF_COLUMNS]
+COLUMN_INDEX = {name: i for i, (name, _) in enumerate(COLUMNS)}
+# Columns holding StringTable indexes, and the record fields they come from
+STRING_COLUMNS = {
+    'home_name': 'match_hometeam_name',
+    'away_name': 'match_awayteam_name',
+    'referee': 'match_referee',
+    'stadium': 'match_stadium',
+    'round': 'match_round',
+    'stage': 'stage_name',
+}
+
+
+def parse_int(value):
+    """Parse a numeric string the way parseInt(x) || 0 does in the pages"""
+    if isinstance(value, int):
+        return value
+    match = re.match(r'\s*([+-]?\d+)', str(value or ''))
+    return int(match.group(1)) if match else 0
+
+
+def status_code(status):
+    """Map an API-Football match_status string to a status code"""
+    if status == 'Finished':
+        return STATUS_FINISHED
+    if status in UPCOMING_STATUSES:
+        return STATUS_UPCOMING
+    return STATUS_OTHER
+
+
+def get_stat_values(stats):
+    """Turn a `statistics` array into {type: (home, away)} ints"""
+    return {s.get('type'): (parse_int(s.get('home')), parse_int(s.get('away'))) for s in stats or []}
+
+
+def reported_types(stats):
+    """Types in a `statistics` array with a value on either side (some leagues list types with blank values)"""
+    return {s.get('type') for s in stats or [] if str(s.get('home') or '').strip() or str(s.get('away') or '').strip()}
+
+
+def list_league_files(leagues_dir=LEAGUES_DIR):
+    """Return {partition_key: path} for every league_<id>_<year>.json file"""
+    files = {}
+    if not os.path.exists(leagues_dir):
+        return files
+    for filename in sorted(os.listdir(leagues_dir)):
+        if LEAGUE_FILE_PATTERN.match(filename):
+            files[filename[len('league_'):-len('.json')]] = os.path.join(leagues_dir, filename)
+    return files
+
+
+class StringTable:
+    """Append-only string dictionary shared by every partition"""
+
+    def __init__(self, strings=None):
+        self.strings = list(strings or [''])
+        self.lookup = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, value):
+        value = value or ''
+        idx = self.lookup.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(value)
+            self.lookup[value] = idx
+        return idx
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Top-level record fields the store is compiled from; the rest (goalscorer, badges, ...) is never kept
+INGEST_FIELDS = (
+    'match_id', 'match_date', 'match_time', 'match_status', 'league_id', 'league_name', 'country_name',
+    'match_hometeam_id', 'match_awayteam_id', 'match_hometeam_name', 'match_awayteam_name',
+    'match_hometeam_score', 'match_awayteam_score', 'match_hometeam_halftime_score',
+    'match_awayteam_halftime_score', 'match_referee', 'match_stadium', 'match_round', 'stage_name',
+    'league_year', 'statistics', 'statistics_1half',
+)
+
+
+def match_row(match):
+    """One match record as a tuple in COLUMNS order, with the STRING_COLUMNS still as text"""
+    hours, _, minutes = (match.get('match_time') or '').partition(':')
+    row = {
+        'match_id': parse_int(match.get('match_id')),
+        'date': match['match_date'],
+        'time': parse_int(hours) * 60 + parse_int(minutes),
+        'status': status_code(match.get('match_status')),
+        'home_id': parse_int(match.get('match_hometeam_id')),
+        'away_id': parse_int(match.get('match_awayteam_id')),
+        'home_goals': parse_int(match.get('match_hometeam_score')),
+        'away_goals': parse_int(match.get('match_awayteam_score')),
+        'home_goals_ht': parse_int(match.get('match_hometeam_halftime_score')),
+        'away_goals_ht': parse_int(match.get('match_awayteam_halftime_score')),
+    }
+    for col, field in STRING_COLUMNS.items():
+        row[col] = match.get(field) or ''
+    for half, key in (('', 'statistics'), (FIRST_HALF, 'statistics_1half')):
+        stats = get_stat_values(match.get(key))
+        row[f'has_stats{half}'] = bool(stats)
+        if not half:
+            reported = reported_types(match.get(key))
+            row['stat_types'] = sum(bit for col, bit in STAT_BITS.items() if STAT_TYPES[col] in reported
+                                    and not (col in ZERO_UNREPORTED and stats[STAT_TYPES[col]] == (0, 0)))
+        for col, stat_type in STAT_TYPES.items():
+            row[f'home_{col}{half}'], row[f'away_{col}{half}'] = stats.get(stat_type, (0, 0))
+    return tuple(row[name] for name, _ in COLUMNS)
+
+
+def compile_matches(matches, strings):
+    """Compile an iterable of API-Football match records into typed column arrays"""
+    # Some fixtures are listed twice under different match_ids; keep the finished copy
+    kept = {}
+    for match in matches:
+        row = match_row(match)
+        key = (row[COLUMN_INDEX['home_id']], row[COLUMN_INDEX['away_id']], row[COLUMN_INDEX['date']])
+        previous = kept.get(key)
+        if previous is None or (previous[COLUMN_INDEX['status']] != STATUS_FINISHED
+                                and row[COLUMN_INDEX['status']] == STATUS_FINISHED):
+            kept[key] = row
+
+    text_columns = [COLUMN_INDEX[col] for col in STRING_COLUMNS]
+    rows = []
+    for row in kept.values():
+        row = list(row)
+        for i in text_columns:
+            row[i] = strings.intern(row[i])
+        rows.append(row)
+    values = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    columns = {name: np.array(column, dtype=dtype) for (name, dtype), column in zip(COLUMNS, values)}
+
+    order = np.lexsort((columns['match_id'], columns['time'], columns['date']))
+    return {name: values[order] for name, values in columns.items()}
+
+
+def partition_season(key):
+    """Season (the API's season year) of a '<league_id>_<year>' partition key"""
+    return int(key.rsplit('_', 1)[1])
+
+
+def team_finished(columns):
+    """{team_id: finished matches} in a partition, for pruning partitions out of last-N queries"""
+    finished = columns['status'] == STATUS_FINISHED
+    teams, counts = np.unique(np.concatenate([columns['home_id'][finished], columns['away_id'][finished]]),
+                              return_counts=True)
+    return {str(team_id): n for team_id, n in zip(teams.tolist(), counts.tolist())}
+
+
+def compile_league_file(path, strings):
+    """Compile one league JSON file, streamed record by record; returns (columns, partition metadata)"""
+    first = {}
+    league_years = set()
+
+    def matches():
+        for match in iter_matches(path, INGEST_FIELDS):
+            if not first:
+                first.update(match)
+            league_years.add(match.get('league_year') or '')
+            yield match
+
+    columns = compile_matches(matches(), strings)
+    rows = len(columns['match_id'])
+    name = LEAGUE_FILE_PATTERN.match(os.path.basename(path))
+    meta = {
+        'file': os.path.basename(path),
+        'league_id': parse_int(first.get('league_id')),
+        'league_name': first.get('league_name', ''),
+        'country_name': first.get('country_name', ''),
+        'season': int(name.group(2)) if name else None,
+        'league_years': sorted(league_years - {''}),
+        'rows': int(rows),
+        'finished': int((columns['status'] == STATUS_FINISHED).sum()),
+        'upcoming': int((columns['status'] == STATUS_UPCOMING).sum()),
+        'first_date': str(columns['date'].min()) if rows else None,
+        'last_date': str(columns['date'].max()) if rows else None,
+        'team_finished': team_finished(columns),
+    }
+    return columns, meta
+
+
+def partition_path(store_dir, key):
+    return os.path.join(store_dir, f'league_{key}.bin')
+
+
+def write_partition(store_dir, key, columns):
+    """Atomically write a partition's columns back to back into <store_dir>/league_<key>.bin"""
+    path = partition_path(store_dir, key)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for name, dtype in COLUMNS:
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_partition(store_dir, key, rows, schema=None):
+    """Read a partition file into {column: array} views over one buffer"""
+    with open(partition_path(store_dir, key), 'rb') as f:
+        buffer = f.read()
+    columns = {}
+    offset = 0
+    for name, dtype in schema or COLUMNS:
+        dtype = np.dtype(dtype)
+        columns[name] = np.frombuffer(buffer, dtype=dtype, count=rows, offset=offset)
+        offset += dtype.itemsize * rows
+    return columns
+
+
+def write_json(path, data):
+    """Atomically write a JSON file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def file_fingerprint(path, previous=None):
+    """Size, mtime and sha1 of a league file; the hash is reused while size and mtime are unchanged"""
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return dict(previous)
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest.hexdigest()}
+
+
+def partition_teams(columns):
+    """Sorted team ids appearing in a partition"""
+    return np.union1d(columns['home_id'], columns['away_id']).tolist()
+
+
+def diff_partition(old, new):
+    """Diff two versions of a partition by match_id"""
+    old_ids = old['match_id'] if old is not None else np.zeros(0, dtype=np.int32)
+    new_ids = new['match_id'] if new is not None else np.zeros(0, dtype=np.int32)
+    common, old_pos, new_pos = np.intersect1d(old_ids, new_ids, assume_unique=True, return_indices=True)
+
+    finished = np.zeros(len(common), dtype=bool)
+    updated = np.zeros(len(common), dtype=bool)
+    if len(common):
+        finished = (old['status'][old_pos] != STATUS_FINISHED) & (new['status'][new_pos] == STATUS_FINISHED)
+        # Name columns compare as string indices, which the append-only StringTable keeps stable
+        for name, _ in COLUMNS:
+            updated |= old[name][old_pos] != new[name][new_pos]
+        updated &= ~finished
+
+    return {
+        'added': np.setdiff1d(new_ids, old_ids, assume_unique=True).tolist(),
+        'removed': np.setdiff1d(old_ids, new_ids, assume_unique=True).tolist(),
+        'finished': common[finished].tolist(),
+        'updated': common[updated].tolist(),
+    }
+
+
+def changed_teams(old, new, diff):
+    """Team ids on either version of the rows a partition diff reports (a corrected row can change teams)"""
+    teams = []
+    for columns, ids in ((old, diff['removed'] + diff['finished'] + diff['updated']),
+                         (new, diff['added'] + diff['finished'] + diff['updated'])):
+        if columns is not None and ids:
+            rows = np.isin(columns['match_id'], ids)
+            teams.append(columns['home_id'][rows])
+            teams.append(columns['away_id'][rows])
+    return np.unique(np.concatenate(teams)).tolist() if teams else []
+
+
+def update_team_names(store_dir, manifest, team_ids):
+    """Recompute the latest name of the given teams, reading only the partitions they appear in"""
+    team_ids = set(team_ids)
+    keys = {key for team_id in team_ids for key in manifest['team_partitions'].get(str(team_id), [])}
+    latest = {}
+    for key in sorted(keys):
+        data = read_partition(store_dir, key, manifest['partitions'][key]['rows'])
+        dates = data['date'].astype(np.int64).tolist()
+        for side in ('home', 'away'):
+            for team_id, name, date in zip(data[f'{side}_id'].tolist(), data[f'{side}_name'].tolist(), dates):
+                if team_id in team_ids and (team_id not in latest or latest[team_id][0] <= date):
+                    latest[team_id] = (date, name)
+
+    for team_id in team_ids:
+        if team_id in latest:
+            manifest['teams'][str(team_id)] = latest[team_id][1]
+        else:
+            manifest['teams'].pop(str(team_id), None)
+
+
+def new_manifest():
+    return {
+        'version': MANIFEST_VERSION,
+        'data_version': 0,
+        'schema': [[name, np.dtype(dtype).str] for name, dtype in COLUMNS],
+        'partitions': {},
+        'teams': {},
+        'team_partitions': {},
+        'seasons': {},
+    }
+
+
+def season_catalog(partitions):
+    """{season: partitions, rows, finished, upcoming, first and last date} over partition metadata"""
+    seasons = {}
+    for key, meta in sorted(partitions.items()):
+        season = seasons.setdefault(str(meta.get('season') or partition_season(key)), {
+            'partitions': 0, 'rows': 0, 'finished': 0, 'upcoming': 0, 'first_date': None, 'last_date': None})
+        season['partitions'] += 1
+        for field in ('rows', 'finished', 'upcoming'):
+            season[field] += meta[field]
+        if meta['first_date']:
+            season['first_date'] = min(filter(None, (season['first_date'], meta['first_date'])))
+            season['last_date'] = max(filter(None, (season['last_date'], meta['last_date'])))
+    return dict(sorted(seasons.items()))
+
+
+def select_partitions(manifest, leagues=None, seasons=None, date_from=None, date_to=None):
+    """Partition keys that can hold matches of some league ids and seasons dated within [date_from, date_to]
+
+    Partitions are pruned on the catalog's date ranges alone, so no partition file is opened.
+    """
+    leagues = {int(l) for l in leagues} if leagues is not None else None
+    seasons = {int(s) for s in seasons} if seasons is not None else None
+    keys = []
+    for key, meta in manifest['partitions'].items():
+        if leagues is not None and meta['league_id'] not in leagues:
+            continue
+        if seasons is not None and (meta.get('season') or partition_season(key)) not in seasons:
+            continue
+        if date_from is not None or date_to is not None:
+            if not meta['rows']:
+                continue
+            if date_from is not None and meta['last_date'] < str(date_from):
+                continue
+            if date_to is not None and meta['first_date'] > str(date_to):
+                continue
+        keys.append(key)
+    return keys
+
+
+def history_partitions(manifest, teams, last_n, before_date, store_dir=None, leagues=None):
+    """Partition keys that can hold any of the teams' last n finished matches before a date (in some league
+    ids only, for an index restricted to them)
+
+    A team's partitions are walked newest start first until they hold n of its finished matches before the
+    date; every partition of the team ending on or after the oldest of those starts is kept, since one
+    ending earlier only holds older matches. Partitions running past the date are counted from their file
+    when store_dir is given (else not at all); partitions without per-team counts are always kept. A
+    partition overlapping a counted one of the same league may repeat its matches, so it counts nothing.
+    """
+    before_date = str(before_date)
+    leagues = {int(l) for l in leagues} if leagues is not None else None
+    counted = {}
+
+    def finished_before(key, meta, team_id):
+        if meta['last_date'] < before_date:
+            return meta['team_finished'].get(team_id, 0)
+        if store_dir is None:
+            return 0
+        if key not in counted:
+            data = read_partition(store_dir, key, meta['rows'])
+            before = data['date'] < np.datetime64(before_date, 'D')
+            counted[key] = team_finished({name: data[name][before] for name in ('status', 'home_id', 'away_id')})
+        return counted[key].get(team_id, 0)
+
+    keys = set()
+    for team_id in {str(int(t)) for t in teams}:
+        partitions = [(key, manifest['partitions'][key]) for key in manifest['team_partitions'].get(team_id, ())]
+        partitions = [(key, meta) for key, meta in partitions
+                      if meta['first_date'] and meta['first_date'] < before_date
+                      and (leagues is None or meta['league_id'] in leagues)]
+        cutoff = None
+        found = 0
+        league_starts = {}
+        for key, meta in sorted(partitions, key=lambda p: p[1]['first_date'], reverse=True):
+            if 'team_finished' not in meta:
+                cutoff, found = None, 0
+                break
+            start = league_starts.get(meta['league_id'])
+            if start is None or meta['last_date'] < start:
+                found += finished_before(key, meta, team_id)
+            league_starts[meta['league_id']] = min(filter(None, (start, meta['first_date'])))
+            if found >= last_n:
+                cutoff = meta['first_date']
+                break
+        keys.update(key for key, meta in partitions if cutoff is None or meta['last_date'] >= cutoff)
+    return keys
+
+
+def window_partitions(manifest, date_from, date_to=None, last_n=None, leagues=None, store_dir=None,
+                      index_leagues=None):
+    """Partition keys a scan of the fixtures in [date_from, date_to] needs: the fixtures' partitions, and
+    the ones holding their teams' last n matches before date_from (all earlier ones if last_n is None)
+
+    index_leagues are the league ids the scan's index holds (None for every league); the history is only
+    looked for in them.
+    """
+    date_to = date_to or date_from
+    if last_n is None:
+        return sorted(set(select_partitions(manifest, leagues, date_to=date_to))
+                      | set(select_partitions(manifest, index_leagues, date_to=date_to)))
+    fixture_keys = set(select_partitions(manifest, leagues, date_from=date_from, date_to=date_to))
+    teams = {team_id for team_id, keys in manifest['team_partitions'].items() if fixture_keys.intersection(keys)}
+    # Later fixtures in the window count results from earlier in it
+    keys = fixture_keys | set(select_partitions(manifest, index_leagues, date_from=date_from, date_to=date_to))
+    keys |= history_partitions(manifest, teams, last_n, date_from, store_dir, index_leagues)
+    return sorted(keys)
+
+
+def update_store(leagues_dir=LEAGUES_DIR, store_dir=STORE_DIR, full=False):
+    """Bring the compiled store up to date, recompiling only league files whose content changed"""
+    league_files = list_league_files(leagues_dir)
+    if not league_files:
+        print(f"❌ No league files found in '{leagues_dir}'!")
+        return None
+
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = None if full else read_manifest(store_dir)
+    if manifest is not None and (manifest.get('schema') != new_manifest()['schema']
+                                 or manifest.get('version') != MANIFEST_VERSION):
+        print("⚠️  Store schema changed, doing a full rebuild")
+        manifest = None
+
+    if manifest is None:
+        full = True
+        manifest = new_manifest()
+        strings = StringTable()
+    else:
+        with open(os.path.join(store_dir, STRINGS_FILE), encoding='utf-8') as f:
+            strings = StringTable(json.load(f))
+
+    changes = {}
+    affected_teams = set()
+    team_partitions = {team_id: set(keys) for team_id, keys in manifest['team_partitions'].items()}
+
+    def replace_teams(key, old_teams, new_teams):
+        for team_id in old_teams:
+            team_partitions.get(str(team_id), set()).discard(key)
+        for team_id in new_teams:
+            team_partitions.setdefault(str(team_id), set()).add(key)
+
+    for key, path in league_files.items():
+        meta = manifest['partitions'].get(key)
+        try:
+            fingerprint = file_fingerprint(path, meta and meta.get('fingerprint'))
+            if meta and fingerprint['sha1'] == meta['fingerprint']['sha1']:
+                meta['fingerprint'] = fingerprint
+                continue
+
+            old = read_partition(store_dir, key, meta['rows']) if meta else None
+            columns, new_meta = compile_league_file(path, strings)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  ❌ {os.path.basename(path)}: {e}")
+            continue
+
+        new_meta['fingerprint'] = fingerprint
+        write_partition(store_dir, key, columns)
+        manifest['partitions'][key] = new_meta
+        replace_teams(key, partition_teams(old) if old is not None else [], partition_teams(columns))
+        if full:
+            affected_teams.update(partition_teams(columns))
+        else:
+            # Only teams in added, removed or changed rows are affected, not everyone in the league
+            changes[key] = diff_partition(old, columns)
+            diff = changes[key]
+            affected_teams.update(changed_teams(old, columns, diff))
+            print(f"  ✏️  {new_meta['file']}: {len(diff['added'])} added, {len(diff['finished'])} finished, "
+                  f"{len(diff['updated'])} updated, {len(diff['removed'])} removed")
+
+    for key in set(manifest['partitions']) - set(league_files):
+        meta = manifest['partitions'].pop(key)
+        old = read_partition(store_dir, key, meta['rows'])
+        replace_teams(key, partition_teams(old), [])
+        changes[key] = diff_partition(old, None)
+        affected_teams.update(partition_teams(old))
+        os.remove(partition_path(store_dir, key))
+        print(f"  🗑️  {meta['file']}: removed")
+
+    manifest['team_partitions'] = {team_id: sorted(keys) for team_id, keys in sorted(team_partitions.items(), key=lambda x: int(x[0])) if keys}
+    update_team_names(store_dir, manifest, affected_teams)
+    manifest['teams'] = dict(sorted(manifest['teams'].items(), key=lambda x: int(x[0])))
+    manifest['seasons'] = season_catalog(manifest['partitions'])
+
+    if full or changes:
+        manifest['data_version'] += 1
+    changes = {'data_version': manifest['data_version'], 'full': full,
+               'partitions': changes, 'teams': sorted(affected_teams)}
+
+    write_json(os.path.join(store_dir, STRINGS_FILE), strings.strings)
+    write_json(os.path.join(store_dir, MANIFEST_FILE), manifest)
+    write_json(os.path.join(store_dir, CHANGES_FILE), changes)
+    return manifest, changes
+
+
+def compile_store(leagues_dir=LEAGUES_DIR, store_dir=STORE_DIR):
+    """Compile every league JSON file into the columnar store"""
+    print(f"🔨 Compiling league files from '{leagues_dir}' into '{store_dir}'...")
+    result = update_store(leagues_dir, store_dir, full=True)
+    if result:
+        manifest = result[0]
+        total_rows = sum(p['rows'] for p in manifest['partitions'].values())
+        print(f"✅ Compiled {len(manifest['partitions'])} league files, {total_rows} matches, "
+              f"{len(manifest['teams'])} teams")
+    return result
+
+
+def read_manifest(store_dir=STORE_DIR):
+    """Read the store manifest, or None if the store has not been compiled"""
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MatchStore:
+    """Every compiled league concatenated into date-sorted columns"""
+
+    def __init__(self, columns, strings, partitions, teams):
+        self.columns = columns
+        self.strings = strings
+        self.partitions = partitions
+        self.teams = teams
+        self._totals = {}
+        self._masks = {}
+
+    def __len__(self):
+        return len(self.columns['match_id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def team_name(self, team_id):
+        """Most recently used name for a team id"""
+        idx = self.teams.get(int(team_id))
+        return self.strings[idx] if idx is not None else str(team_id)
+
+    def league_name(self, league_id):
+        for meta in self.partitions.values():
+            if meta['league_id'] == int(league_id):
+                return meta['league_name']
+        return str(league_id)
+
+    def stats_mask(self, category):
+        """Rows whose category was recorded: goals always, stats when the period's block was present and the
+        full-time block had the category's type (cards go by yellow cards; blocks only list red ones when
+        there were some). Categories with the same rule share one cached array."""
+        half = category.endswith((FIRST_HALF, SECOND_HALF))
+        column = CATEGORIES[category][0].removesuffix(FIRST_HALF).removesuffix(SECOND_HALF)
+        key = (half, column) if column != 'goals' else column
+        if key not in self._masks:
+            if column == 'goals':
+                mask = np.ones(len(self), dtype=bool)
+            else:
+                block = self.columns['has_stats_ht' if half else 'has_stats']
+                mask = block & ((self.columns['stat_types'] & STAT_BITS[column]) != 0)
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def totals(self, category, side=None):
+        """Per-match totals for a betting category (home + away, or one side)"""
+        key = (category, side)
+        if key not in self._totals:
+            sides = (side,) if side else ('home', 'away')
+            total = np.zeros(len(self), dtype=np.int16)
+            for s in sides:
+                for col in CATEGORIES[category]:
+                    total += self.columns[f'{s}_{col}']
+            self._totals[key] = total
+        return self._totals[key]
+
+    def finished_mask(self):
+        return self.columns['status'] == STATUS_FINISHED
+
+    def upcoming_mask(self):
+        return self.columns['status'] == STATUS_UPCOMING
+
+    def league_mask(self, league_ids):
+        """Boolean mask of rows belonging to the given league ids (None = all)"""
+        if league_ids is None:
+            return np.ones(len(self), dtype=bool)
+        return np.isin(self.columns['league_id'], np.asarray([int(l) for l in league_ids], dtype=np.int32))
+
+    def record(self, pos):
+        """Row as a dict shaped like the pages' matchData objects"""
+        c = self.columns
+        record = {
+            'matchId': int(c['match_id'][pos]),
+            'date': str(c['date'][pos]),
+            'homeTeamId': int(c['home_id'][pos]),
+            'awayTeamId': int(c['away_id'][pos]),
+            'homeTeam': self.strings[c['home_name'][pos]],
+            'awayTeam': self.strings[c['away_name'][pos]],
+            'homeScore': int(c['home_goals'][pos]),
+            'awayScore': int(c['away_goals'][pos]),
+            'leagueId': int(c['league_id'][pos]),
+            'league': self.league_name(c['league_id'][pos]),
+            'referee': self.strings[c['referee'][pos]],
+            'stadium': self.strings[c['stadium'][pos]],
+            'round': self.strings[c['round'][pos]],
+            'stage': self.strings[c['stage'][pos]],
+        }
+        # totalCornersht etc. are the names the pages give first-half totals
+        for category in CATEGORIES:
+            record[f"total{category[0].upper()}{category[1:].replace('_', '')}"] = int(self.totals(category)[pos])
+        return record
+
+
+def add_second_half_columns(columns):
+    """Second-half side columns as full time minus first half (0 where there is no first-half block)"""
+    has_half = columns['has_stats_ht']
+    for side in ('home', 'away'):
+        for col in SIDE_COLUMNS:
+            second = np.maximum(columns[f'{side}_{col}'] - columns[f'{side}_{col}{FIRST_HALF}'], 0)
+            if col != 'goals':
+                second = np.where(has_half, second, 0)
+            columns[f'{side}_{col}{SECOND_HALF}'] = second.astype(STAT_DTYPE)
+
+
+def drop_duplicate_matches(columns, seasons):
+    """Keep one row per (league, home, away, date): seasons downloaded separately can overlap (a
+    '2025' file still lists the end of 2024/2025), so the same match may sit in two partitions"""
+    keys = (columns['date'], columns['away_id'], columns['home_id'], columns['league_id'])
+    # Within each key the finished copy, then the one from the newest season's file, sorts first
+    finished = columns['status'] == STATUS_FINISHED
+    order = np.lexsort((-np.asarray(seasons, dtype=np.int64)[columns['partition']], ~finished) + keys)
+    sorted_keys = [key[order] for key in keys]
+    first = np.ones(len(order), dtype=bool)
+    if len(order):
+        first[1:] = np.any([key[1:] != key[:-1] for key in sorted_keys], axis=0)
+    if first.all():
+        return columns
+    kept = np.sort(order[first])
+    return {name: values[kept] for name, values in columns.items()}
+
+
+def load_store(store_dir=STORE_DIR, leagues=None, seasons=None, date_from=None, date_to=None, partitions=None):
+    """Load the compiled store into a MatchStore, reading only the partitions of some league ids and
+    seasons that can hold matches within [date_from, date_to] (or an explicit list of partition keys)"""
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No compiled store in '{store_dir}' - run match_store.py first")
+    if manifest.get('schema') != new_manifest()['schema']:
+        raise ValueError(f"The store in '{store_dir}' was compiled with an older layout - run match_store.py again")
+
+    with open(os.path.join(store_dir, STRINGS_FILE), encoding='utf-8') as f:
+        strings = json.load(f)
+
+    wanted = set(select_partitions(manifest, leagues, seasons, date_from, date_to))
+    if partitions is not None:
+        wanted &= set(partitions)
+    parts = []
+    partitions = {}
+    for key, meta in manifest['partitions'].items():
+        if key not in wanted:
+            continue
+        part = read_partition(store_dir, key, meta['rows'], manifest['schema'])
+        n = meta['rows']
+        part['league_id'] = np.full(n, meta['league_id'], dtype=np.int32)
+        part['partition'] = np.full(n, len(partitions), dtype=np.int16)
+        parts.append(part)
+        partitions[key] = meta
+
+    if parts:
+        columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+    else:
+        columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS}
+        columns['league_id'] = np.zeros(0, dtype=np.int32)
+        columns['partition'] = np.zeros(0, dtype=np.int16)
+    if len({meta['league_id'] for meta in partitions.values()}) < len(partitions):
+        columns = drop_duplicate_matches(columns, [meta.get('season') or partition_season(key)
+                                                   for key, meta in partitions.items()])
+    if len(columns['match_id']):
+        order = np.lexsort((columns['match_id'], columns['time'], columns['date']))
+        columns = {name: values[order] for name, values in columns.items()}
+    add_second_half_columns(columns)
+
+    teams = {int(team_id): idx for team_id, idx in manifest['teams'].items()}
+    return MatchStore(columns, strings, partitions, teams)
+
+
+def main():
+    """Compile leagues/*.json into the columnar match store"""
+    parser = argparse.ArgumentParser(description='Compile league JSON files into a columnar match store')
+    parser.add_argument('--leagues-dir', default=LEAGUES_DIR)
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--incremental', action='store_true',
+                        help='only recompile league files that changed since the last build')
+    parser.add_argument('--catalog', action='store_true', help='list the compiled seasons instead of compiling')
+    args = parser.parse_args()
+
+    print("📦 MATCH STORE COMPILER")
+    print("="*40)
+    if args.catalog:
+        manifest = read_manifest(args.store_dir)
+        if manifest is None:
+            parser.error(f"No compiled store in '{args.store_dir}'")
+        for season, meta in season_catalog(manifest['partitions']).items():
+            print(f"  {season}: {meta['partitions']:>3} leagues, {meta['rows']:>6} matches "
+                  f"({meta['finished']} finished, {meta['upcoming']} upcoming), "
+                  f"{meta['first_date']} - {meta['last_date']}")
+        return
+    if not args.incremental:
+        compile_store(args.leagues_dir, args.store_dir)
+        return
+
+    print(f"🔄 Incremental update of '{args.store_dir}' from '{args.leagues_dir}'...")
+    result = update_store(args.leagues_dir, args.store_dir)
+    if result:
+        changes = result[1]
+        print(f"✅ {len(changes['partitions'])} leagues rewritten, {len(changes['teams'])} teams affected "
+              f"(data version {changes['data_version']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import gzip
+import json
+import hashlib
+import argparse
+
+from league_reader import iter_matches
+from match_store import (LEAGUE_FILE_PATTERN, LEAGUES_DIR, STAT_TYPES, STORE_DIR, file_fingerprint,
+                         list_league_files, read_manifest, write_json)
+
+try:
+    import brotli
+except ImportError:  # only the gzip copies are written
+    brotli = None
+
+BUNDLES_DIR = os.path.join(STORE_DIR, 'bundles')
+BUNDLES_MANIFEST = 'manifest.json'
+
+# Record fields the pages read (app.js, find_bets.js, find_builders.js, leagues.js, today-matches.js);
+# badges, logos, lineups, goalscorers, odds and the rest of the API record are left out
+BUNDLE_FIELDS = (
+    'match_id', 'match_date', 'match_time', 'match_status', 'match_hometeam_name', 'match_awayteam_name',
+    'match_hometeam_score', 'match_awayteam_score', 'match_hometeam_halftime_score',
+    'match_awayteam_halftime_score', 'statistics', 'statistics_1half',
+)
+# statistics entries getStatValue() is asked for, with only the keys it reads
+BUNDLE_STAT_TYPES = frozenset(STAT_TYPES.values())
+HASH_LENGTH = 12
+
+
+def bundle_record(match):
+    """A league file record with only what the pages read"""
+    for key in ('statistics', 'statistics_1half'):
+        match[key] = [{'type': s.get('type'), 'home': s.get('home'), 'away': s.get('away')}
+                      for s in match.get(key) or [] if s.get('type') in BUNDLE_STAT_TYPES]
+    return match
+
+
+def bundle_bytes(path):
+    """(compact UTF-8 JSON of a league file's stripped records, number of records)"""
+    records = [bundle_record(match) for match in iter_matches(path, BUNDLE_FIELDS)]
+    return json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), len(records)
+
+
+def write_bytes(path, data):
+    """Atomically write a file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_bundle(bundles_dir, key, data):
+    """Write league_<key>.<hash>.json with .gz (and, with brotli installed, .br) copies next to it"""
+    filename = f'league_{key}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.json'
+    path = os.path.join(bundles_dir, filename)
+    sizes = {'bytes': len(data)}
+    write_bytes(path, data)
+    # mtime=0 keeps the .gz identical for identical content
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    write_bytes(path + '.gz', gzipped)
+    sizes['gzip_bytes'] = len(gzipped)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        write_bytes(path + '.br', compressed)
+        sizes['br_bytes'] = len(compressed)
+    return filename, sizes
+
+
+def bundle_is_current(bundles_dir, entry, fingerprint):
+    """Whether a manifest entry was built from this version of its league file and its files are all there"""
+    if not entry or entry['fingerprint']['sha1'] != fingerprint['sha1']:
+        return False
+    path = os.path.join(bundles_dir, entry['file'])
+    suffixes = ('', '.gz') + (('.br',) if brotli is not None else ())
+    return all(os.path.exists(path + suffix) for suffix in suffixes)
+
+
+def publish_bundles(leagues_dir=LEAGUES_DIR, bundles_dir=BUNDLES_DIR, store_dir=STORE_DIR, force=False):
+    """Write a stripped, precompressed, content-hashed bundle per league file plus a manifest naming them
+
+    Bundle names change only when their content does, so they can be cached forever; only the small
+    manifest has to be revalidated. Files whose league file is unchanged are kept as they are.
+    """
+    league_files = list_league_files(leagues_dir)
+    if not league_files:
+        print(f"❌ No league files found in '{leagues_dir}'!")
+        return None
+    os.makedirs(bundles_dir, exist_ok=True)
+    manifest_path = os.path.join(bundles_dir, BUNDLES_MANIFEST)
+    previous = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f).get('files', {})
+
+    files = {}
+    written = 0
+    for key, path in league_files.items():
+        source = os.path.basename(path)
+        entry = previous.get(source)
+        try:
+            fingerprint = file_fingerprint(path, entry and entry['fingerprint'])
+            if bundle_is_current(bundles_dir, entry, fingerprint):
+                files[source] = dict(entry, fingerprint=fingerprint)
+                continue
+            data, matches = bundle_bytes(path)
+        except (OSError, ValueError) as e:
+            print(f"  ❌ {source}: {e}")
+            continue
+        filename, sizes = write_bundle(bundles_dir, key, data)
+        name = LEAGUE_FILE_PATTERN.match(source)
+        files[source] = {'file': filename, 'league_id': int(name.group(1)), 'season': int(name.group(2)),
+                         'matches': matches, **sizes, 'fingerprint': fingerprint}
+        written += 1
+        print(f"  ✏️  {source} -> {filename} ({sizes['bytes'] / 1024:.0f} KB, "
+              f"{sizes['gzip_bytes'] / 1024:.0f} KB gzipped)")
+
+    store_manifest = read_manifest(store_dir)
+    write_json(manifest_path, {
+        'version': 1,
+        'data_version': store_manifest.get('data_version') if store_manifest else None,
+        'files': files,
+    })
+
+    # Bundles no longer named by the manifest (older content, removed leagues) are stale
+    current = {entry['file'] for entry in files.values()}
+    for filename in os.listdir(bundles_dir):
+        if filename.startswith('league_') and filename.split('.json')[0] + '.json' not in current:
+            os.remove(os.path.join(bundles_dir, filename))
+    return files, written
+
+
+def main():
+    """Publish the league files as precompressed, content-hashed bundles for the pages"""
+    parser = argparse.ArgumentParser(
+        description='Write stripped, gzip/brotli precompressed league bundles with content-hashed names. Serve '
+                    'the .gz/.br copies with Content-Encoding (e.g. nginx gzip_static/brotli_static), the '
+                    'league_*.json bundles as immutable and the manifest with no-cache.')
+    parser.add_argument('--leagues-dir', default=LEAGUES_DIR)
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--output', default=BUNDLES_DIR, help='folder for the bundles and their manifest')
+    parser.add_argument('--force', action='store_true', help='rewrite every bundle')
+    args = parser.parse_args()
+
+    print("📤 PUBLISH DATA BUNDLES")
+    print("="*40)
+    if brotli is None:
+        print("⚠️  brotli is not installed, writing gzip copies only")
+    result = publish_bundles(args.leagues_dir, args.output, args.store_dir, args.force)
+    if result is None:
+        return
+    files, written = result
+    source = sum(os.path.getsize(path) for path in list_league_files(args.leagues_dir).values())
+    total = sum(entry['bytes'] for entry in files.values())
+    gzipped = sum(entry['gzip_bytes'] for entry in files.values())
+    print(f"✅ {len(files)} bundles ({written} rewritten): {source / 2**20:.1f} MB of league files -> "
+          f"{total / 2**20:.1f} MB stripped, {gzipped / 2**20:.1f} MB gzipped"
+          + (f", {sum(e.get('br_bytes', 0) for e in files.values()) / 2**20:.1f} MB brotli" if brotli else ''))
+    print(f"💾 Saved to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
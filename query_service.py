@@ -0,0 +1,464 @@
+import os
+import json
+import asyncio
+import argparse
+import threading
+import urllib.parse
+from datetime import date
+from collections import OrderedDict
+from http import HTTPStatus
+
+import pandas as pd
+
+from match_store import MANIFEST_FILE, STORE_DIR, load_store, read_manifest
+from team_index import TeamIndex
+from team_registry import REGISTRY_FILE, load_registry
+from team_search import build_search_index
+from secondary_index import REFEREE_MATCHES, SecondaryIndex
+from head_to_head import PairIndex
+from fixture_scanner import HALF_THRESHOLDS, THRESHOLDS as FIND_BETS_THRESHOLDS, pick_thresholds, scan_fixtures
+from builder_engine import TOP_BUILDERS, BuilderEngine, parse_leg
+from totals_model import fit_model, price_fixtures
+from team_ratings import RATINGS_FILE, TeamRatings, load_ratings
+from stat_cubes import CUBES_DIR, THRESHOLDS as CUBE_THRESHOLDS, build_cubes, league_shard, read_shard
+
+DEFAULT_PORT = 8787
+CACHE_SIZE = 256
+MAX_REQUEST_LINE = 8192
+# Builder searches can return millions of rows, so tables are paged (paging is not part of the cache key)
+DEFAULT_LIMIT = 1000
+PAGING_PARAMS = ('offset', 'limit')
+# Totals models kept fitted, one per as-of date
+TOTALS_MODELS = 8
+# Builder searches keep each fixture's best builders; this bounds what one cached result can hold
+MAX_BUILDERS_PER_FIXTURE = 200
+
+
+class QueryError(Exception):
+    """Bad query parameters; answered with 400"""
+
+
+class StoreState:
+    """One loaded version of the compiled data; requests keep using the state they started with
+
+    Handlers run in worker threads, so the lazily built parts are built under a lock each.
+    """
+
+    LAZY = ('engine', 'pairs', 'referees', 'search', 'ratings', 'cubes', 'totals')
+
+    def __init__(self, store_dir, seasons=None):
+        self.store_dir = store_dir
+        manifest = read_manifest(store_dir)
+        self.data_version = manifest.get('data_version') if manifest else None
+        self.store = load_store(store_dir, seasons=seasons)
+        self.registry = load_registry(os.path.join(store_dir, os.path.basename(REGISTRY_FILE)))
+        self.index = TeamIndex(self.store, registry=self.registry)
+        self._locks = {name: threading.Lock() for name in self.LAZY}
+        self._engine = None
+        self._cubes = None
+        self._search = None
+        self._referees = None
+        self._pairs = None
+        self._totals = {}
+        self._ratings = None
+
+    def _lazy(self, name, build):
+        """The cached value of _<name>, built once even when several threads ask for it together"""
+        value = getattr(self, '_' + name)
+        if value is None:
+            with self._locks[name]:
+                value = getattr(self, '_' + name)
+                if value is None:
+                    value = build()
+                    setattr(self, '_' + name, value)
+        return value
+
+    @property
+    def engine(self):
+        return self._lazy('engine', lambda: BuilderEngine(self.store, self.index, pairs=self.pairs))
+
+    @property
+    def pairs(self):
+        return self._lazy('pairs', lambda: PairIndex(self.store))
+
+    @property
+    def referees(self):
+        return self._lazy('referees', lambda: SecondaryIndex(self.store, 'referee', require_stats=True))
+
+    @property
+    def search(self):
+        return self._lazy('search', lambda: build_search_index(self.store, self.registry))
+
+    @property
+    def ratings(self):
+        """The saved team ratings brought up to this store in memory (rated from scratch if none are saved)"""
+        def build():
+            ratings = load_ratings(os.path.join(self.store_dir, os.path.basename(RATINGS_FILE)))
+            ratings = ratings if ratings is not None else TeamRatings()
+            ratings.update(self.store)
+            return ratings
+        return self._lazy('ratings', build)
+
+    def totals_model(self, as_of):
+        """Totals model fitted on the matches before a date, warm-started from the last one fitted"""
+        with self._locks['totals']:
+            if as_of not in self._totals:
+                previous = next(reversed(self._totals.values()), None)
+                self._totals[as_of] = fit_model(self.store, as_of, previous=previous,
+                                                data_version=self.data_version)
+                while len(self._totals) > TOTALS_MODELS:
+                    del self._totals[next(iter(self._totals))]
+            return self._totals[as_of]
+
+    @property
+    def cubes(self):
+        return self._lazy('cubes', lambda: build_cubes(self.store))
+
+
+class ResultCache:
+    """LRU of query results (tables or JSON-ready dicts) keyed on (query, data version)"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def param(params, name, default=None, cast=str):
+    values = params.get(name)
+    if not values or values[0] == '':
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise QueryError(f'invalid {name}: {values[0]!r}')
+
+
+def iso_date(value):
+    """A 'YYYY-MM-DD' parameter, normalised; anything else is a ValueError"""
+    return date.fromisoformat(value).isoformat()
+
+
+def league_list(params):
+    leagues = param(params, 'leagues')
+    if leagues is None:
+        return None
+    try:
+        return [int(l) for l in leagues.split(',')]
+    except ValueError:
+        raise QueryError(f'invalid leagues: {leagues!r}')
+
+
+def category_list(params):
+    categories = param(params, 'categories')
+    return categories.split(',') if categories else None
+
+
+def referee_appointments(params):
+    """{match_id: referee} from repeated referee=<match_id>:<name> parameters"""
+    appointments = {}
+    for value in params.get('referee', []):
+        match_id, _, name = value.partition(':')
+        if not match_id.isdigit() or not name:
+            raise QueryError(f'invalid referee: {value!r} (give <match_id>:<name>)')
+        appointments[int(match_id)] = name
+    return appointments or None
+
+
+def table_page(table, params):
+    """{'total', 'offset', 'rows'} for one page of a result table, dates as 'YYYY-MM-DD'"""
+    offset = max(param(params, 'offset', 0, int), 0)
+    limit = max(param(params, 'limit', DEFAULT_LIMIT, int), 0)
+    page = table.iloc[offset:offset + limit].copy()
+    for column in page.columns:
+        if pd.api.types.is_datetime64_any_dtype(page[column]):
+            page[column] = page[column].dt.strftime('%Y-%m-%d')
+    return {'total': len(table), 'offset': offset, 'rows': json.loads(page.to_json(orient='records'))}
+
+
+def find_bets(state, params):
+    date_from = param(params, 'date_from', cast=iso_date)
+    if not date_from:
+        raise QueryError('date_from is required')
+    date_to = param(params, 'date_to', cast=iso_date)
+    categories = category_list(params)
+    try:
+        thresholds = pick_thresholds(categories, FIND_BETS_THRESHOLDS, HALF_THRESHOLDS) if categories else None
+    except KeyError as e:
+        raise QueryError(e.args[0])
+    referee_weight = param(params, 'referee_weight', cast=float)
+    if referee_weight is not None and not 0 <= referee_weight <= 1:
+        raise QueryError('referee_weight must be between 0 and 1')
+    h2h_matches = param(params, 'h2h', cast=int)
+    max_rating_gap = param(params, 'max_rating_gap', cast=float)
+    rated = param(params, 'ratings') in ('1', 'true') or max_rating_gap is not None
+    table = scan_fixtures(state.store, date_from, date_to, param(params, 'last', 5, int),
+                          league_list(params), thresholds, param(params, 'min_success_rate', 80, int),
+                          index=state.index, referee_weight=referee_weight,
+                          referee_matches=param(params, 'referee_matches', REFEREE_MATCHES, int),
+                          referee_index=state.referees if referee_weight is not None else None,
+                          referees=referee_appointments(params), h2h_matches=h2h_matches,
+                          h2h_index=state.pairs if h2h_matches is not None else None,
+                          min_h2h_rate=param(params, 'min_h2h_rate', 0, int),
+                          ratings=state.ratings if rated else None, max_rating_gap=max_rating_gap)
+    return table
+
+
+def builder(state, params):
+    date_from = param(params, 'date_from', cast=iso_date)
+    if not date_from:
+        raise QueryError('date_from is required')
+    date_to = param(params, 'date_to', cast=iso_date)
+    args = (date_from, date_to, param(params, 'last', 5, int), league_list(params))
+    min_success_rate = param(params, 'min_success_rate', 70, int)
+    h2h_matches = param(params, 'h2h', cast=int)
+    try:
+        if param(params, 'search') in ('1', 'true'):
+            top = param(params, 'top', TOP_BUILDERS, int)
+            if not 1 <= top <= MAX_BUILDERS_PER_FIXTURE:
+                raise QueryError(f'top must be between 1 and {MAX_BUILDERS_PER_FIXTURE}')
+            table = state.engine.search(*args, min_success_rate, param(params, 'max_legs', 3, int),
+                                        category_list(params), h2h_matches, top, param(params, 'min_legs', 2, int))
+        elif params.get('leg'):
+            table = state.engine.evaluate([parse_leg(leg) for leg in params['leg']], *args, min_success_rate,
+                                          h2h_matches)
+        else:
+            raise QueryError('give leg=category:over|under:threshold or search=1')
+    except (KeyError, ValueError) as e:
+        raise QueryError(f'invalid leg or window: {e}')
+    return table
+
+
+def totals(state, params):
+    date_from = param(params, 'date_from', cast=iso_date)
+    if not date_from:
+        raise QueryError('date_from is required')
+    date_to = param(params, 'date_to', cast=iso_date)
+    categories = category_list(params)
+    try:
+        thresholds = pick_thresholds(categories, FIND_BETS_THRESHOLDS) if categories else None
+    except KeyError as e:
+        raise QueryError(e.args[0])
+    model = state.totals_model(date_from)
+    ratings = state.ratings if param(params, 'ratings') in ('1', 'true') else None
+    table = price_fixtures(state.store, model, date_from, date_to, league_list(params), thresholds, ratings=ratings)
+    min_probability = param(params, 'min_probability', 0, float)
+    if min_probability:
+        table = table[table[['p_over', 'p_under']].max(axis=1) >= min_probability]
+    return table
+
+
+def team_history(state, params):
+    team = param(params, 'team')
+    if team is None:
+        raise QueryError('team is required')
+    team = int(team) if team.isdigit() else team
+    before = param(params, 'before', cast=iso_date)
+    try:
+        positions = state.index.last_n(team, param(params, 'last', 5, int), before, league_list(params))
+        team_id = state.index.team_id(team)
+    except KeyError as e:
+        raise QueryError(str(e))
+    return {'team_id': team_id, 'team': state.store.team_name(team_id),
+            'matches': [state.store.record(pos) for pos in positions.tolist()]}
+
+
+def team_search(state, params):
+    query = param(params, 'q')
+    if query is None:
+        raise QueryError('q is required')
+    # Every match in rank order; the autocomplete asks for limit=10
+    teams = state.search.search(query, limit=None)
+    return pd.DataFrame([{'team_id': team['id'], 'name': team['name'], 'country': team['country'],
+                          'leagues': team['leagues']} for team in teams],
+                        columns=['team_id', 'name', 'country', 'leagues'])
+
+
+def league_summary(state, params):
+    key = param(params, 'league')
+    if key is None:
+        raise QueryError('league is required (league id or <id>_<year> key)')
+    if key not in state.store.partitions:
+        keys = [k for k, meta in state.store.partitions.items() if str(meta['league_id']) == key]
+        if not keys:
+            raise QueryError(f'unknown league {key!r}')
+        key = max(keys)
+    # Shards written by stat_cubes.py for this data version are served as they are
+    shard = read_shard(key, state.data_version, os.path.join(state.store_dir, os.path.basename(CUBES_DIR)))
+    if shard is not None:
+        return shard
+    cubes = state.cubes
+    return league_shard(state.store, key, cubes[cubes['league_key'] == key], CUBE_THRESHOLDS, state.data_version)
+
+
+ENDPOINTS = {
+    '/find-bets': find_bets,
+    '/builder': builder,
+    '/totals': totals,
+    '/team': team_history,
+    '/teams': team_search,
+    '/league': league_summary,
+}
+
+
+class QueryService:
+    """Keeps the compiled store resident and answers analysis queries with a shared result cache"""
+
+    def __init__(self, store_dir=STORE_DIR, cache_size=CACHE_SIZE, seasons=None):
+        self.store_dir = store_dir
+        self.seasons = seasons
+        self.manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+        self.cache = ResultCache(cache_size)
+        self.state = None
+        self.manifest_mtime = None
+        self.inflight = {}
+        self.reload_lock = asyncio.Lock()
+
+    async def current_state(self):
+        """The loaded state, reloaded (and the cache dropped) when the store was re-ingested"""
+        mtime = os.stat(self.manifest_path).st_mtime_ns if os.path.exists(self.manifest_path) else None
+        if self.state is not None and mtime == self.manifest_mtime:
+            return self.state
+        async with self.reload_lock:
+            if self.state is None or mtime != self.manifest_mtime:
+                state = await asyncio.to_thread(StoreState, self.store_dir, self.seasons)
+                if self.state is None or state.data_version != self.state.data_version:
+                    self.cache.clear()
+                self.state, self.manifest_mtime = state, mtime
+        return self.state
+
+    async def query(self, path, params):
+        """JSON-ready result for an endpoint; identical concurrent queries share one computation"""
+        if path == '/status':
+            state = await self.current_state()
+            return {'data_version': state.data_version, 'matches': len(state.store),
+                    'leagues': len(state.store.partitions), 'cache': {
+                        'entries': len(self.cache.entries), 'hits': self.cache.hits, 'misses': self.cache.misses}}
+        handler = ENDPOINTS.get(path)
+        if handler is None:
+            raise LookupError(path)
+
+        state = await self.current_state()
+        query = tuple(sorted((name, tuple(values)) for name, values in params.items() if name not in PAGING_PARAMS))
+        key = (path, query, state.data_version)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self.compute(key, handler, state, params)
+        return table_page(result, params) if isinstance(result, pd.DataFrame) else result
+
+    async def compute(self, key, handler, state, params):
+        """Run a handler in a worker thread, sharing the run with identical queries already in flight"""
+        if key not in self.inflight:
+            self.inflight[key] = asyncio.ensure_future(asyncio.to_thread(handler, state, params))
+        try:
+            result = await asyncio.shield(self.inflight[key])
+        finally:
+            if self.inflight.get(key) is not None and self.inflight[key].done():
+                del self.inflight[key]
+        self.cache.put(key, result)
+        return result
+
+    async def handle(self, reader, writer):
+        """Minimal HTTP/1.1 GET handler with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                if len(request_line) > MAX_REQUEST_LINE:
+                    await self.respond(writer, HTTPStatus.REQUEST_URI_TOO_LONG, {'error': 'request line too long'})
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                keep_alive = len(parts) == 3 and parts[2] == 'HTTP/1.1' \
+                    and headers.get('connection', '').lower() != 'close'
+                if len(parts) != 3 or parts[0] not in ('GET', 'HEAD'):
+                    await self.respond(writer, HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'only GET is supported'})
+                    break
+
+                url = urllib.parse.urlsplit(parts[1])
+                params = urllib.parse.parse_qs(url.query)
+                try:
+                    status, body = HTTPStatus.OK, await self.query(url.path.rstrip('/') or '/', params)
+                except QueryError as e:
+                    status, body = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                except LookupError:
+                    status, body = HTTPStatus.NOT_FOUND, {'error': f'unknown endpoint {url.path}',
+                                                          'endpoints': sorted(ENDPOINTS) + ['/status']}
+                except Exception as e:
+                    status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'{type(e).__name__}: {e}'}
+                await self.respond(writer, status, body, keep_alive, head=parts[0] == 'HEAD')
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, body, keep_alive=False, head=False):
+        payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        head_lines = [
+            f'HTTP/1.1 {status.value} {status.phrase}',
+            'Content-Type: application/json; charset=utf-8',
+            f'Content-Length: {len(payload)}',
+            # The pages are served from their own origin
+            'Access-Control-Allow-Origin: *',
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        writer.write(('\r\n'.join(head_lines) + '\r\n\r\n').encode('latin-1') + (b'' if head else payload))
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        await self.current_state()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🚀 Serving data version {self.state.data_version} on http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Serve find-bets, builder, totals, team, team search and league queries over HTTP"""
+    parser = argparse.ArgumentParser(description='Local JSON query service over the compiled match store')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='cached query results')
+    parser.add_argument('--seasons', help='comma separated seasons to keep resident (default: all)')
+    args = parser.parse_args()
+
+    print("🛰️  QUERY SERVICE")
+    print("="*40)
+    try:
+        asyncio.run(QueryService(args.store_dir, args.cache_size,
+                                 args.seasons.split(',') if args.seasons else None).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
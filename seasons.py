@@ -0,0 +1,14 @@
+from datetime import date, datetime
+
+# Aug-May seasons are named after their first year; from this day of that year onwards the season is under way
+SEASON_START = (8, 20)
+
+
+def current_season(today=None):
+    """Season (its first year) that is under way on a date"""
+    today = today or date.today()
+    return today.year if (today.month, today.day) >= SEASON_START else today.year - 1
+
+
+def season_start(season):
+    return datetime(season, *SEASON_START)
@@ -0,0 +1,161 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+from match_store import CATEGORIES, load_store
+from team_index import EntryIndex, success_rate
+
+# Keys matches can be sliced by besides team: store string columns, and the country of the league file
+STRING_KEYS = ('referee', 'stadium', 'round', 'stage')
+KEYS = STRING_KEYS + ('country',)
+
+# Categories a referee's own rate is blended into fixture scoring for
+REFEREE_CATEGORIES = ('cards', 'cards_ht', 'cards_2h', 'fouls', 'fouls_ht', 'fouls_2h')
+REFEREE_MATCHES = 10
+
+
+def key_codes(store, key):
+    """(per-row key code, -1 where the record has no value; code -> label list) for a secondary key"""
+    if key == 'country':
+        countries = np.asarray([meta['country_name'] or '' for meta in store.partitions.values()], dtype=str)
+        labels, codes = np.unique(countries, return_inverse=True)
+        codes = np.where(labels[codes] == '', -1, codes).astype(np.int64)
+        return codes[store['partition']], labels.tolist()
+    if key not in STRING_KEYS:
+        raise KeyError(f'unknown key {key!r} (one of {", ".join(KEYS)})')
+    # String table indexes are the codes; index 0 is the empty string
+    codes = store[key].astype(np.int64)
+    return np.where(codes == 0, -1, codes), store.strings
+
+
+class SecondaryIndex(EntryIndex):
+    """Finished matches of every referee, stadium, round, stage or country in date order, with prefix sums
+    of the category totals, so e.g. a referee's cards rate before a date is two lookups, not a scan"""
+
+    def __init__(self, store, key, leagues=None, require_stats=False):
+        self.key = key
+        self.leagues = frozenset(int(l) for l in leagues) if leagues is not None else None
+        # codes[row] is the key of every store row, fixtures included, for looking their key up
+        self.codes, self.labels = key_codes(store, key)
+        mask = store.finished_mask() & store.league_mask(self.leagues) & (self.codes >= 0)
+        if require_stats:
+            # Matches without a statistics block count as 0 cards, which would drag a referee's rate down
+            mask &= store['has_stats']
+        positions = np.flatnonzero(mask)
+        super().__init__(store, self.codes[positions], positions)
+        self._by_label = None
+
+    def code(self, value):
+        """Key code for a code or label; labels match exactly, then ignoring case"""
+        if not isinstance(value, str):
+            return int(value)
+        if self._by_label is None:
+            # Filled before it is published, since the query service looks labels up from several threads
+            by_label = {}
+            for code in self.key_ids.tolist():
+                by_label.setdefault(self.labels[code], code)
+                by_label.setdefault(self.labels[code].casefold(), code)
+            self._by_label = by_label
+        code = self._by_label.get(value, self._by_label.get(value.strip().casefold()))
+        if code is None:
+            raise KeyError(f'Unknown {self.key} {value!r}')
+        return code
+
+    def window(self, value, n=None, before_date=None):
+        """(start, end) entry range of a key's last n matches (all if n is None) strictly before a date"""
+        return self.key_window(self.code(value), n, before_date)
+
+    def last_n(self, value, n=None, before_date=None):
+        """Store positions of a key's last n finished matches before a date (oldest first)"""
+        start, end = self.window(value, n, before_date)
+        return self.positions[start:end]
+
+    def hit_rate(self, value, n, before_date, category, threshold, over_under='over'):
+        """(successCount, totalMatches, successRate %) over a key's last n matches before a date"""
+        start, end = self.window(value, n, before_date)
+        hits = int(self.hit_count(category, threshold, start, end, over_under))
+        total = end - start
+        return hits, total, success_rate(hits, total)
+
+    def summary(self, category, threshold=None, before_date=None, min_matches=1):
+        """One row per key: matches, average match total and (with a threshold) the over rate"""
+        starts, ends = self.offsets[:-1], self.offsets[1:]
+        if before_date is not None:
+            _, ends = self.windows(self.key_ids, None, np.full(len(self.key_ids), np.datetime64(before_date, 'D')))
+        matches = ends - starts
+        totals = self.window_total(category, starts, ends)
+        average = np.divide(totals, matches, out=np.zeros(len(matches)), where=matches > 0)
+        table = pd.DataFrame({
+            self.key: [self.labels[code] for code in self.key_ids.tolist()],
+            'matches': matches,
+            f'avg_{category}': np.round(average, 2),
+        })
+        if threshold is not None:
+            over = self.hit_count(category, threshold, starts, ends)
+            table['over'] = over
+            table['over_rate'] = success_rate(over, matches)
+        table = table[table['matches'] >= max(min_matches, 1)]
+        table = table.sort_values([f'avg_{category}', 'matches'], ascending=False, kind='stable')
+        return table.reset_index(drop=True)
+
+
+def build_secondary_indexes(store=None, keys=KEYS, leagues=None):
+    """{key: SecondaryIndex} for several keys over one store"""
+    store = store if store is not None else load_store()
+    return {key: SecondaryIndex(store, key, leagues) for key in keys}
+
+
+def fixture_codes(index, store, fixtures, overrides=None):
+    """Key codes of some fixtures (-1 if unknown), with {match_id: label} overrides such as announced referees"""
+    codes = index.codes[fixtures].copy()
+    if overrides:
+        match_ids = store['match_id'][fixtures].tolist()
+        for i, match_id in enumerate(match_ids):
+            label = overrides.get(match_id)
+            if label:
+                try:
+                    codes[i] = index.code(label)
+                except KeyError:
+                    codes[i] = -1
+    return codes
+
+
+def main():
+    """Rank referees, stadiums, rounds, stages or countries by a category's match totals"""
+    parser = argparse.ArgumentParser(description='Per-referee / stadium / round / stage / country match totals')
+    parser.add_argument('key', choices=KEYS)
+    parser.add_argument('--category', default='cards', choices=sorted(CATEGORIES))
+    parser.add_argument('--threshold', type=float, help='also report how often the total went over this line')
+    parser.add_argument('--value', help='one referee/stadium/...: list its last matches instead')
+    parser.add_argument('--last', type=int, default=REFEREE_MATCHES, help='matches listed with --value')
+    parser.add_argument('--before', help='only count matches before this date (YYYY-MM-DD)')
+    parser.add_argument('--min-matches', type=int, default=5)
+    parser.add_argument('--leagues', help='comma separated league ids (default: all)')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--require-stats', action='store_true', help='skip matches without a statistics block')
+    args = parser.parse_args()
+
+    store = load_store()
+    index = SecondaryIndex(store, args.key, args.leagues.split(',') if args.leagues else None, args.require_stats)
+    print(f"🗂️  {args.key.upper()} INDEX ({len(index)} {args.key} values, {len(index.positions)} matches)")
+    print("="*40)
+    if args.value:
+        try:
+            positions = index.last_n(args.value, args.last, args.before)
+        except KeyError as e:
+            parser.error(e.args[0])
+        totals = store.totals(args.category)
+        for pos in positions.tolist():
+            record = store.record(pos)
+            print(f"  {record['date']}  {record['homeTeam']} - {record['awayTeam']}  {args.category}: {totals[pos]}")
+        if args.threshold is not None:
+            hits, total, rate = index.hit_rate(args.value, args.last, args.before, args.category, args.threshold)
+            print(f"📈 Over {args.threshold}: {hits}/{total} ({rate}%)")
+        return
+
+    table = index.summary(args.category, args.threshold, args.before, args.min_matches)
+    print(table.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
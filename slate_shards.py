@@ -0,0 +1,204 @@
+import os
+import json
+import argparse
+import numpy as np
+
+from match_store import (STORE_DIR, STATUS_FINISHED, STATUS_OTHER, STATUS_UPCOMING, load_store, read_manifest,
+                         write_json)
+from team_index import TeamIndex
+
+SLATES_DIR = os.path.join(STORE_DIR, 'slates')
+SLATES_INDEX = 'index.json'
+HISTORY_MATCHES = 10
+SLATES_VERSION = 2
+
+# The store only keeps the status class, so slates carry these labels instead of the raw API text
+STATUS_LABELS = {STATUS_UPCOMING: 'Not Started', STATUS_FINISHED: 'Finished'}
+OTHER_STATUS_LABEL = 'Other'
+
+# matchData field -> store column, the names loadAllMatches() gives them
+ROW_FIELDS = {
+    'fthg': 'home_goals', 'ftag': 'away_goals',
+    'hs': 'home_shots', 'as': 'away_shots',
+    'hsog': 'home_shots_on_goal', 'asog': 'away_shots_on_goal',
+    'hc': 'home_corners', 'ac': 'away_corners',
+    'hy': 'home_yellow', 'ay': 'away_yellow',
+    'hr': 'home_red', 'ar': 'away_red',
+    'hf': 'home_fouls', 'af': 'away_fouls',
+    # First half, from the halftime score and statistics_1half; calculateStatistics() has no first-half red cards
+    'hthg': 'home_goals_ht', 'htag': 'away_goals_ht',
+    'hsht': 'home_shots_ht', 'asht': 'away_shots_ht',
+    'hsoght': 'home_shots_on_goal_ht', 'asoght': 'away_shots_on_goal_ht',
+    'hcht': 'home_corners_ht', 'acht': 'away_corners_ht',
+    'hyht': 'home_yellow_ht', 'ayht': 'away_yellow_ht',
+    'hfht': 'home_fouls_ht', 'afht': 'away_fouls_ht',
+    'hasHalfStats': 'has_stats_ht',
+}
+# Day fixtures only need what the match cards show; team names are looked up in the slate's 'teams'
+FIXTURE_COLUMNS = ['matchId', 'leagueId', 'dateString', 'matchTime', 'match_status', 'homeTeamId', 'awayTeamId']
+# History matches are all finished, so they carry the stats getTeamLastMatches() reads and no status or time
+MATCH_COLUMNS = ['leagueId', 'dateString', 'homeTeamId', 'awayTeamId'] + list(ROW_FIELDS)
+
+
+def store_fields(store):
+    """{matchData field: list over every store row}, plus 'homeTeam'/'awayTeam' names"""
+    strings = np.asarray(store.strings, dtype=object)
+    minutes = store['time'].astype(np.int64)
+    times = np.char.add(np.char.add(np.char.zfill((minutes // 60).astype(str), 2), ':'),
+                        np.char.zfill((minutes % 60).astype(str), 2))
+    status = np.array([STATUS_LABELS.get(code, OTHER_STATUS_LABEL) for code in range(STATUS_OTHER + 1)],
+                      dtype=object)
+    fields = {
+        'matchId': store['match_id'].tolist(), 'leagueId': store['league_id'].tolist(),
+        'dateString': store['date'].astype(str).tolist(), 'matchTime': times.tolist(),
+        'match_status': status[store['status']].tolist(),
+        'homeTeamId': store['home_id'].tolist(), 'awayTeamId': store['away_id'].tolist(),
+        'homeTeam': strings[store['home_name']].tolist(), 'awayTeam': strings[store['away_name']].tolist(),
+    }
+    # Flags go out as 0/1, which the pages test the same way as booleans
+    fields.update({field: store[column].astype(np.int64).tolist() for field, column in ROW_FIELDS.items()})
+    return fields
+
+
+def pick_rows(fields, columns, positions):
+    """Rows (lists in `columns` order) of the given store positions"""
+    picked = [fields[column] for column in columns]
+    return [[values[p] for values in picked] for p in positions]
+
+
+def build_slates(store, index=None, last_matches=HISTORY_MATCHES, date_from=None, date_to=None):
+    """{date: slate} with each day's fixtures and the last N finished matches of every team playing
+
+    Rows are lists in the slate's 'fixture_columns'/'match_columns' order, to keep the files small.
+    """
+    index = index or TeamIndex(store)
+    fields = store_fields(store)
+    league_names = {meta['league_id']: meta['league_name'] for meta in store.partitions.values()}
+    dates = store['date']
+    mask = np.ones(len(store), dtype=bool)
+    if date_from:
+        mask &= dates >= np.datetime64(date_from, 'D')
+    if date_to:
+        mask &= dates <= np.datetime64(date_to, 'D')
+    fixtures = np.flatnonzero(mask)
+    if not len(fixtures):
+        return {}
+
+    # One vectorized window lookup for every (team, fixture date) pair
+    fixture_dates = dates[fixtures]
+    teams = np.concatenate([store['home_id'][fixtures], store['away_id'][fixtures]])
+    starts, ends = index.windows(teams, last_matches, np.concatenate([fixture_dates, fixture_dates]))
+
+    day_starts = np.flatnonzero(np.append(True, fixture_dates[1:] != fixture_dates[:-1]))
+    day_ends = np.append(day_starts[1:], len(fixtures))
+    slates = {}
+    for day_start, day_end in zip(day_starts, day_ends):
+        day_fixtures = fixtures[day_start:day_end]
+        sides = np.r_[day_start:day_end, len(fixtures) + day_start:len(fixtures) + day_end]
+
+        # Teams can play more than once a day (and share opponents), so history rows are stored once
+        history = {}
+        for team_id, start, end in zip(teams[sides].tolist(), starts[sides].tolist(), ends[sides].tolist()):
+            history.setdefault(str(team_id), index.positions[start:end])
+        history_positions = np.unique(np.concatenate(list(history.values()))) if history else np.zeros(0, int)
+        slot = {int(p): i for i, p in enumerate(history_positions.tolist())}
+
+        # Names are stored once per team instead of on every row
+        team_names = {}
+        for p in np.concatenate([day_fixtures, history_positions]).tolist():
+            team_names.setdefault(str(fields['homeTeamId'][p]), fields['homeTeam'][p])
+            team_names.setdefault(str(fields['awayTeamId'][p]), fields['awayTeam'][p])
+
+        day_leagues = sorted(set(fields['leagueId'][p] for p in day_fixtures.tolist()))
+        slates[str(fixture_dates[day_start])] = {
+            'leagues': {str(l): league_names.get(l, '') for l in day_leagues},
+            'teams': team_names,
+            'fixture_columns': FIXTURE_COLUMNS,
+            'fixtures': pick_rows(fields, FIXTURE_COLUMNS, day_fixtures.tolist()),
+            'match_columns': MATCH_COLUMNS,
+            'matches': pick_rows(fields, MATCH_COLUMNS, history_positions.tolist()),
+            # team id -> indexes into 'matches', oldest first, like getTeamLastMatches()
+            'history': {team_id: [slot[int(p)] for p in positions] for team_id, positions in history.items()},
+        }
+    return slates
+
+
+def in_window(date, date_from=None, date_to=None):
+    """Whether a YYYY-MM-DD string lies in the (inclusive, open-ended) date window"""
+    return (not date_from or date >= date_from) and (not date_to or date <= date_to)
+
+
+def write_slates(store=None, slates_dir=SLATES_DIR, store_dir=STORE_DIR, last_matches=HISTORY_MATCHES,
+                 date_from=None, date_to=None, force=False):
+    """Write one slate file per match date in the window and merge those dates into the index
+
+    Skipped when nothing changed. Dates outside --from/--to keep their existing slates.
+    """
+    manifest = read_manifest(store_dir)
+    data_version = manifest.get('data_version') if manifest else None
+    index_path = os.path.join(slates_dir, SLATES_INDEX)
+    settings = {'last_matches': last_matches, 'date_from': date_from, 'date_to': date_to}
+    previous = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('version') != SLATES_VERSION:
+            previous = {}
+        elif not force and previous.get('data_version') == data_version and previous.get('settings') == settings:
+            print(f"➖ Slates are up to date (data version {data_version})")
+            return None
+
+    store = store if store is not None else load_store(store_dir)
+    slates = build_slates(store, last_matches=last_matches, date_from=date_from, date_to=date_to)
+    os.makedirs(slates_dir, exist_ok=True)
+
+    # Earlier builds' dates outside the rebuilt window stay as they are
+    dates = {date: entry for date, entry in previous.get('dates', {}).items()
+             if not in_window(date, date_from, date_to)}
+    for date, slate in slates.items():
+        filename = f'slate_{date}.json'
+        write_json(os.path.join(slates_dir, filename), {'version': SLATES_VERSION, 'data_version': data_version,
+                                                        'date': date, 'last_matches': last_matches, **slate})
+        dates[date] = {
+            'file': filename,
+            'fixtures': len(slate['fixtures']),
+            'leagues': [int(l) for l in slate['leagues']],
+            'last_matches': last_matches,
+        }
+
+    # Slates for dates in the window that no longer have fixtures would still be served; without a usable
+    # previous index nothing outside the window is listed either
+    for filename in os.listdir(slates_dir):
+        if filename.startswith('slate_') and filename.endswith('.json'):
+            date = filename[6:-5]
+            if date not in dates and (not previous or in_window(date, date_from, date_to)):
+                os.remove(os.path.join(slates_dir, filename))
+
+    write_json(index_path, {'version': SLATES_VERSION, 'data_version': data_version, 'settings': settings,
+                            'dates': dict(sorted(dates.items()))})
+    return slates
+
+
+def main():
+    """Split the store into one small file per match date for the today/find-bets pages"""
+    parser = argparse.ArgumentParser(description='Write per-date fixture slates with each team\'s recent history')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--output', default=SLATES_DIR, help='folder for the slate files')
+    parser.add_argument('--last', type=int, default=HISTORY_MATCHES, help='history matches kept per team')
+    parser.add_argument('--from', dest='date_from', help='first date to write (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', help='last date to write (YYYY-MM-DD)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if the store has not changed')
+    args = parser.parse_args()
+
+    print("🗓️  FIXTURE SLATES")
+    print("="*40)
+    slates = write_slates(slates_dir=args.output, store_dir=args.store_dir, last_matches=args.last,
+                          date_from=args.date_from, date_to=args.date_to, force=args.force)
+    if slates is not None:
+        fixtures = sum(len(slate['fixtures']) for slate in slates.values())
+        print(f"✅ {len(slates)} dates, {fixtures} fixtures")
+        print(f"💾 Saved to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+// Per-league statistics cubes from stat_cubes.py: season and last-5/10 over counts and rates for the league
+// and each of its teams, so the pages show them without downloading and re-counting the raw matches.
+// Leagues without a shard (or pages without published cubes) get null and show nothing extra.
+
+const CUBES_DIR = 'compiled/cubes/';
+const CUBES_INDEX = CUBES_DIR + 'index.json';
+const CUBES_VERSION = 2;
+
+let cubeIndex;
+const leagueCubes = {};
+
+async function loadCubeIndex() {
+  if (cubeIndex === undefined) {
+    try {
+      const response = await fetch(CUBES_INDEX, { cache: 'no-cache' });
+      const index = response.ok ? await response.json() : null;
+      cubeIndex = index && index.version === CUBES_VERSION ? index : null;
+    } catch (error) {
+      cubeIndex = null;
+    }
+  }
+  return cubeIndex;
+}
+
+// Resolves to the shard of a league id's newest season (see league_shard in stat_cubes.py), or null
+function loadLeagueCube(leagueId) {
+  if (!(leagueId in leagueCubes)) {
+    leagueCubes[leagueId] = loadCubeIndex().then(async index => {
+      const shards = index ? index.shards : {};
+      const keys = Object.keys(shards).filter(key => String(shards[key].league_id) === leagueId);
+      if (!keys.length) return null;
+      // Keys are <id>_<year>, so the newest season has the largest year
+      const key = keys.reduce((a, b) => (Number(b.split('_')[1]) > Number(a.split('_')[1]) ? b : a));
+      try {
+        // Shards are rewritten in place when the store changes
+        const response = await fetch(CUBES_DIR + index.shards[key].file, { cache: 'no-cache' });
+        if (!response.ok) {
+          console.warn(`Could not load cube ${key}: ${response.status}`);
+          return null;
+        }
+        const shard = await response.json();
+        return shard.data_version === index.data_version ? shard : null;
+      } catch (error) {
+        console.warn(`Failed to load cube ${key}:`, error);
+        return null;
+      }
+    });
+  }
+  return leagueCubes[leagueId];
+}
+
+// [{category, threshold, leg}] in the shard's line order; leg indexes the over/over_rate/under_rate lists
+function cubeLines(shard) {
+  const lines = [];
+  Object.entries(shard.thresholds).forEach(([category, thresholds]) => {
+    thresholds.forEach(threshold => lines.push({ category, threshold, leg: lines.length }));
+  });
+  return lines;
+}
@@ -0,0 +1,209 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+from match_store import STORE_DIR, load_store, read_manifest, write_json
+from team_index import math_round
+from builder_engine import THRESHOLDS
+
+CUBES_DIR = os.path.join(STORE_DIR, 'cubes')
+CUBES_INDEX = 'index.json'
+# Bumped when the shard layout or rates change, so stale shards are rebuilt and not served
+CUBES_VERSION = 2
+
+VENUES = ('all', 'home', 'away')
+# Window name -> last N matches (None for the whole season)
+WINDOWS = {'season': None, 'last5': 5, 'last10': 10}
+
+# Teams are keyed by API id; LEAGUE_TEAM is the whole league, counted once per match
+LEAGUE_TEAM = -1
+
+
+def cube_entries(store, venue):
+    """(partition, team, position) of every finished match entry for a venue, sorted by partition, team, date"""
+    positions = np.flatnonzero(store.finished_mask())
+    if venue == 'league':
+        teams = np.full(len(positions), LEAGUE_TEAM, dtype=np.int64)
+    elif venue == 'home':
+        teams = store['home_id'][positions]
+    elif venue == 'away':
+        teams = store['away_id'][positions]
+    else:
+        teams = np.concatenate([store['home_id'][positions], store['away_id'][positions]])
+        positions = np.concatenate([positions, positions])
+    partitions = store['partition'][positions]
+    order = np.lexsort((positions, teams, partitions))
+    return partitions[order], teams[order].astype(np.int64), positions[order]
+
+
+def over_bits(store, positions, thresholds):
+    """(legs x entries) bool of match totals over each (category, threshold) line"""
+    rows = []
+    for category, lines in thresholds.items():
+        totals = store.totals(category)[positions]
+        rows.extend(totals > threshold for threshold in lines)
+    return np.array(rows, dtype=bool).reshape(len(rows), len(positions))
+
+
+def build_cubes(store, thresholds=None):
+    """Over counts per (partition, team, venue, window, category, threshold) as one tidy DataFrame"""
+    thresholds = thresholds or THRESHOLDS
+    legs = [(category, threshold) for category, lines in thresholds.items() for threshold in lines]
+    frames = []
+    for venue in VENUES + ('league',):
+        partitions, teams, positions = cube_entries(store, venue)
+        if not len(positions):
+            continue
+        new_group = np.ones(len(positions), dtype=bool)
+        new_group[1:] = (partitions[1:] != partitions[:-1]) | (teams[1:] != teams[:-1])
+        starts = np.flatnonzero(new_group)
+        ends = np.append(starts[1:], len(positions))
+        # Entries are date-ordered within a group, so counting back from the group end gives the last N
+        from_end = np.repeat(ends, ends - starts) - np.arange(len(positions)) - 1
+        bits = over_bits(store, positions, thresholds)
+
+        for window, n in WINDOWS.items():
+            in_window = np.ones(len(positions), dtype=bool) if n is None else from_end < n
+            matches = np.add.reduceat(in_window.astype(np.int64), starts)
+            over = np.add.reduceat((bits & in_window).astype(np.int64), starts, axis=1)
+            frames.append(pd.DataFrame({
+                'partition': np.tile(partitions[starts], len(legs)),
+                'team_id': np.tile(teams[starts], len(legs)),
+                'venue': 'all' if venue == 'league' else venue,
+                'window': window,
+                'leg': np.repeat(np.arange(len(legs)), len(starts)),
+                'category': np.repeat([leg[0] for leg in legs], len(starts)),
+                'threshold': np.repeat([leg[1] for leg in legs], len(starts)),
+                'matches': np.tile(matches, len(legs)),
+                'over': over.ravel(),
+            }))
+
+    if not frames:
+        return pd.DataFrame(columns=['league_key', 'team_id', 'venue', 'window', 'leg', 'category', 'threshold',
+                                     'matches', 'over', 'under', 'over_rate', 'under_rate'])
+    cubes = pd.concat(frames, ignore_index=True)
+    keys = np.array(list(store.partitions), dtype=object)
+    cubes.insert(0, 'league_key', keys[cubes.pop('partition').to_numpy()])
+    cubes['under'] = cubes['matches'] - cubes['over']
+    # Rates round like Math.round() in calculateStatistics, so the pages can show them as they are; it takes
+    # the under percentage as 100 - over, which rounds differently from under / matches on exact halves
+    over, matches = cubes['over'].to_numpy(), cubes['matches'].to_numpy()
+    over_percent = np.divide(over, matches, out=np.zeros(len(cubes)), where=matches > 0) * 100
+    cubes['over_rate'] = math_round(over_percent)
+    cubes['under_rate'] = math_round(np.where(matches > 0, 100 - over_percent, 0))
+    return cubes
+
+
+def league_shard(store, key, cubes, thresholds, data_version):
+    """Compact JSON for one league: {team_id: {venue: {window: {matches, over, over_rate, under_rate}}}}
+
+    over / over_rate / under_rate are lists with one value per line, in thresholds order.
+    """
+    meta = store.partitions[key]
+    legs = sum(len(lines) for lines in thresholds.values())
+    cubes = cubes.sort_values(['team_id', 'venue', 'window', 'leg'], kind='stable')
+    # Every (team, venue, window) group holds exactly one row per leg, so groups are fixed-size blocks
+    heads = cubes.iloc[::legs]
+    over, over_rate, under_rate = (cubes[name].to_numpy().reshape(-1, legs).tolist()
+                                   for name in ('over', 'over_rate', 'under_rate'))
+
+    teams = {}
+    for i, (team_id, venue, window, matches) in enumerate(zip(heads['team_id'].tolist(), heads['venue'].tolist(),
+                                                              heads['window'].tolist(), heads['matches'].tolist())):
+        slot = teams.setdefault('league' if team_id == LEAGUE_TEAM else str(team_id), {})
+        slot.setdefault(venue, {})[window] = {
+            'matches': matches, 'over': over[i], 'over_rate': over_rate[i], 'under_rate': under_rate[i],
+        }
+    league = teams.pop('league', {}).get('all', {})
+    return {
+        'version': CUBES_VERSION,
+        'data_version': data_version,
+        'league_key': key,
+        'league_id': meta['league_id'],
+        'league_name': meta['league_name'],
+        'country_name': meta['country_name'],
+        'thresholds': thresholds,
+        'league': league,
+        'team_names': {team_id: store.team_name(int(team_id)) for team_id in teams},
+        'teams': teams,
+    }
+
+
+def write_cubes(store=None, cubes_dir=CUBES_DIR, store_dir=STORE_DIR, thresholds=None, force=False, seasons=None):
+    """Materialize one JSON shard per league plus an index (from some seasons only, or all); skipped when
+    the store has not changed"""
+    thresholds = thresholds or THRESHOLDS
+    seasons = sorted(int(s) for s in seasons) if seasons is not None else None
+    manifest = read_manifest(store_dir)
+    data_version = manifest.get('data_version') if manifest else None
+    index_path = os.path.join(cubes_dir, CUBES_INDEX)
+    if not force and os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if (previous.get('version') == CUBES_VERSION and previous.get('data_version') == data_version
+                and previous.get('thresholds') == thresholds and previous.get('seasons') == seasons):
+            print(f"➖ Cubes are up to date (data version {data_version})")
+            return None
+
+    store = store if store is not None else load_store(store_dir, seasons=seasons)
+    cubes = build_cubes(store, thresholds)
+    os.makedirs(cubes_dir, exist_ok=True)
+
+    shards = {}
+    for key, league_cubes in cubes.groupby('league_key', sort=True):
+        filename = f'league_{key}.json'
+        write_json(os.path.join(cubes_dir, filename), league_shard(store, key, league_cubes, thresholds, data_version))
+        meta = store.partitions[key]
+        shards[key] = {'file': filename, 'league_id': meta['league_id'], 'league_name': meta['league_name'],
+                       'teams': int(league_cubes['team_id'].nunique()) - 1}
+
+    # Shards of leagues that are no longer in the store would serve stale numbers
+    for filename in os.listdir(cubes_dir):
+        if filename.startswith('league_') and filename.endswith('.json') and filename[7:-5] not in shards:
+            os.remove(os.path.join(cubes_dir, filename))
+
+    write_json(index_path, {'version': CUBES_VERSION, 'data_version': data_version, 'venues': list(VENUES),
+                            'windows': list(WINDOWS), 'thresholds': thresholds, 'seasons': seasons, 'shards': shards})
+    return cubes
+
+
+def read_shard(key, data_version, cubes_dir=CUBES_DIR, thresholds=None):
+    """The written shard of one league, or None when it is missing or was built from other data or lines"""
+    thresholds = thresholds or THRESHOLDS
+    try:
+        with open(os.path.join(cubes_dir, CUBES_INDEX), encoding='utf-8') as f:
+            index = json.load(f)
+        entry = index['shards'].get(key)
+        if (entry is None or index.get('version') != CUBES_VERSION or index.get('data_version') != data_version
+                or index.get('thresholds') != thresholds):
+            return None
+        with open(os.path.join(cubes_dir, entry['file']), encoding='utf-8') as f:
+            shard = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+    # The index and shards are rewritten one file at a time, so the shard itself must agree too
+    return shard if (shard.get('version'), shard.get('data_version')) == (CUBES_VERSION, data_version) else None
+
+
+def main():
+    """Pre-aggregate per-league and per-team over/under counts for the pages"""
+    parser = argparse.ArgumentParser(description='Build per-league/per-team statistics cubes from the match store')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--output', default=CUBES_DIR, help='folder for the JSON shards')
+    parser.add_argument('--force', action='store_true', help='rebuild even if the store has not changed')
+    parser.add_argument('--seasons', help='comma separated seasons to aggregate (default: all)')
+    args = parser.parse_args()
+
+    print("🧊 STATISTICS CUBES")
+    print("="*40)
+    cubes = write_cubes(cubes_dir=args.output, store_dir=args.store_dir, force=args.force,
+                        seasons=args.seasons.split(',') if args.seasons else None)
+    if cubes is not None:
+        print(f"✅ {cubes['league_key'].nunique()} league shards, {len(cubes)} cells")
+        print(f"💾 Saved to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import os
+import csv
+import json
+import argparse
+from datetime import date, timedelta
+import numpy as np
+
+from league_reader import iter_matches
+
+# Same order and names as the API's statistics blocks ('Corners' really is listed twice)
+STAT_ORDER = ['Corners', 'Throw In', 'Free Kick', 'Goal Kick', 'Penalty', 'Substitution', 'Attacks',
+              'Dangerous Attacks', 'On Target', 'Off Target', 'Shots Total', 'Shots On Goal', 'Shots Off Goal',
+              'Shots Blocked', 'Shots Inside Box', 'Shots Outside Box', 'Fouls', 'Corners', 'Offsides',
+              'Ball Possession', 'Yellow Cards', 'Saves', 'Passes Total', 'Passes Accurate']
+
+# Per-team full-match means of the stats the pages use; a team's strength scales the attacking ones
+STAT_MEANS = {'Shots Total': 12.5, 'Shots On Goal': 4.3, 'Corners': 5.0, 'Fouls': 11.5, 'Yellow Cards': 2.1,
+              'Throw In': 20.0, 'Free Kick': 12.0, 'Goal Kick': 8.0, 'Offsides': 1.8,
+              'Attacks': 95.0, 'Dangerous Attacks': 50.0, 'Saves': 3.0, 'Passes Total': 430.0}
+GOAL_MEAN = 1.35
+FIRST_HALF_SHARE = 0.45
+
+COUNTRIES = ['England', 'Spain', 'Italy', 'Germany', 'France', 'Portugal', 'Netherlands', 'Belgium', 'Turkey',
+             'Greece', 'Scotland', 'Austria', 'Switzerland', 'Denmark', 'Norway', 'Sweden', 'Poland', 'Czech Republic',
+             'Croatia', 'Serbia', 'Romania', 'Hungary', 'Slovakia', 'Slovenia', 'Bulgaria', 'Ukraine']
+TOWN_PARTS = ['Port', 'Bridge', 'Ash', 'North', 'West', 'Mill', 'Stone', 'Brook', 'Green', 'Castle', 'Oak', 'River',
+              'Hill', 'Lake', 'Fair', 'Wood', 'East', 'King', 'Queen', 'Red', 'Black', 'White', 'Iron', 'Salt']
+TOWN_ENDINGS = ['ton', 'ford', 'field', 'burg', 'ville', 'mouth', 'dale', 'chester', 'wick', 'stad', 'grad', 'polis',
+                'heim', 'bury', 'haven', 'port']
+CLUB_FORMS = ['{town}', '{town} FC', 'FC {town}', '{town} United', '{town} City', 'Sporting {town}', 'Real {town}',
+              'AC {town}', '{town} Rovers', 'Dinamo {town}', '{town} Athletic']
+# How fixture providers tend to spell league names differently
+VARIANTS = [lambda n: n + ' FC', lambda n: n.replace('United', 'Utd'), lambda n: n.replace('City', ''),
+            lambda n: n.upper(), lambda n: n.replace('FC ', ''), lambda n: n.replace(' ', '-')]
+
+
+def team_names(rng, count, used):
+    """Unique, realistic-looking club names"""
+    names = []
+    while len(names) < count:
+        town = rng.choice(TOWN_PARTS) + rng.choice(TOWN_ENDINGS)
+        name = rng.choice(CLUB_FORMS).format(town=town)
+        if name not in used:
+            used.add(name)
+            names.append(name)
+    return names
+
+
+def stat_block(home, away):
+    """API 'statistics' list from {type: (home, away)}"""
+    block = []
+    for stat_type in STAT_ORDER:
+        h, a = home.get(stat_type, 0), away.get(stat_type, 0)
+        if stat_type == 'Ball Possession':
+            block.append({'type': stat_type, 'home': f'{h}%', 'away': f'{a}%'})
+        else:
+            block.append({'type': stat_type, 'home': str(h), 'away': str(a)})
+    return block
+
+
+def match_stats(rng, home_strength, away_strength):
+    """(home, away) full-match and first-half stat dicts plus scores"""
+    full = ({}, {})
+    half = ({}, {})
+    for side, (own, other) in enumerate(((home_strength, away_strength), (away_strength, home_strength))):
+        for stat_type, mean in STAT_MEANS.items():
+            attacking = stat_type in ('Shots Total', 'Shots On Goal', 'Corners', 'Attacks', 'Dangerous Attacks')
+            value = int(rng.poisson(mean * (own / other if attacking else 1.0)))
+            full[side][stat_type] = value
+            half[side][stat_type] = int(rng.binomial(value, FIRST_HALF_SHARE))
+        full[side]['On Target'] = full[side]['Shots On Goal']
+        full[side]['Off Target'] = max(full[side]['Shots Total'] - full[side]['Shots On Goal'], 0)
+        full[side]['Shots On Goal'] = min(full[side]['Shots On Goal'], full[side]['Shots Total'])
+        half[side]['Shots On Goal'] = min(half[side]['Shots On Goal'], half[side]['Shots Total'])
+
+    possession = int(np.clip(rng.normal(50 + 10 * (home_strength - away_strength), 6), 25, 75))
+    full[0]['Ball Possession'], full[1]['Ball Possession'] = possession, 100 - possession
+    half[0]['Ball Possession'], half[1]['Ball Possession'] = possession, 100 - possession
+
+    goals = [int(rng.poisson(GOAL_MEAN * home_strength / away_strength * 1.1)),
+             int(rng.poisson(GOAL_MEAN * away_strength / home_strength * 0.9))]
+    half_goals = [int(rng.binomial(g, FIRST_HALF_SHARE)) for g in goals]
+    return full, half, goals, half_goals
+
+
+def match_record(rng, match_id, league, home, away, day, finished):
+    """One match in the exact API-Football get_events shape"""
+    record = {
+        'match_id': str(match_id),
+        'country_id': str(league['country_id']),
+        'country_name': league['country_name'],
+        'league_id': str(league['league_id']),
+        'league_name': league['league_name'],
+        'match_date': day.isoformat(),
+        'match_status': 'Finished' if finished else 'Not Started',
+        'match_time': f"{int(rng.integers(12, 21)):02d}:{int(rng.choice([0, 15, 30, 45])):02d}",
+        'match_hometeam_id': str(home['id']),
+        'match_hometeam_name': home['name'],
+        'match_hometeam_score': '',
+        'match_awayteam_name': away['name'],
+        'match_awayteam_id': str(away['id']),
+        'match_awayteam_score': '',
+        'match_hometeam_halftime_score': '',
+        'match_awayteam_halftime_score': '',
+        'match_hometeam_extra_score': '',
+        'match_awayteam_extra_score': '',
+        'match_hometeam_penalty_score': '',
+        'match_awayteam_penalty_score': '',
+        'match_hometeam_ft_score': '',
+        'match_awayteam_ft_score': '',
+        'match_hometeam_system': '',
+        'match_awayteam_system': '',
+        'match_live': '0',
+        'match_round': str(league['round']),
+        'match_stadium': f"{home['name']} Stadium",
+        'match_referee': f"R. {league['country_name'][:3]}{int(rng.integers(1, 30))}",
+        'team_home_badge': f"https://apiv3.apifootball.com/badges/{home['id']}_{home['slug']}.jpg",
+        'team_away_badge': f"https://apiv3.apifootball.com/badges/{away['id']}_{away['slug']}.jpg",
+        'league_logo': f"https://apiv3.apifootball.com/badges/logo_leagues/{league['league_id']}_{league['slug']}.png",
+        'country_logo': f"https://apiv3.apifootball.com/badges/logo_country/{league['country_id']}_"
+                        f"{league['country_slug']}.png",
+        'league_year': league['league_year'],
+        'fk_stage_key': '6',
+        'stage_name': 'Current',
+        'goalscorer': [],
+        'statistics': [],
+        'statistics_1half': [],
+    }
+    if finished:
+        full, half, goals, half_goals = match_stats(rng, home['strength'], away['strength'])
+        record.update({
+            'match_hometeam_score': str(goals[0]), 'match_awayteam_score': str(goals[1]),
+            'match_hometeam_halftime_score': str(half_goals[0]),
+            'match_awayteam_halftime_score': str(half_goals[1]),
+            'match_hometeam_ft_score': str(goals[0]), 'match_awayteam_ft_score': str(goals[1]),
+            'match_hometeam_system': '4-3-3', 'match_awayteam_system': '4-4-2',
+            'statistics': stat_block(*full),
+            'statistics_1half': stat_block(*half),
+        })
+    return record
+
+
+def season_fixtures(rng, teams, start, end):
+    """Double round robin (circle method) spread evenly over the season"""
+    teams = list(teams)
+    if len(teams) % 2:
+        teams.append(None)
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = [(teams[i], teams[n - 1 - i]) for i in range(n // 2)]
+        rounds.append([(a, b) if r % 2 == 0 else (b, a) for a, b in pairs if a is not None and b is not None])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    rounds += [[(b, a) for a, b in pairs] for pairs in rounds]
+
+    step = max((end - start).days // max(len(rounds), 1), 1)
+    fixtures = []
+    for r, pairs in enumerate(rounds):
+        round_start = start + timedelta(days=r * step)
+        for home, away in pairs:
+            fixtures.append((r + 1, home, away, round_start + timedelta(days=int(rng.integers(0, min(step, 3))))))
+    return fixtures
+
+
+def generate_dataset(out_dir, leagues=96, seasons=1, first_year=2025, teams_per_league=(12, 20), seed=0,
+                     today=None):
+    """Write league_<id>_<year>.json files; returns {key: matches}. Every 8th league is a cup drawing
+    its teams from the other leagues, so team histories span competitions like in the real data."""
+    rng = np.random.default_rng(seed)
+    today = today or date(first_year + seasons - 1, 11, 1)
+    os.makedirs(out_dir, exist_ok=True)
+
+    used = set()
+    league_defs = []
+    all_teams = []
+    next_team_id = 1000
+    for i in range(leagues):
+        country_id = i % len(COUNTRIES)
+        count = int(rng.integers(teams_per_league[0], teams_per_league[1] + 1))
+        teams = []
+        for name in team_names(rng, count, used):
+            slug = name.lower().replace(' ', '-')
+            teams.append({'id': next_team_id, 'name': name, 'slug': slug, 'strength': float(rng.lognormal(0, 0.25))})
+            next_team_id += 1
+        all_teams.extend(teams)
+        cup = i % 8 == 7
+        league_defs.append({
+            'league_id': 100 + i,
+            'league_name': f"{COUNTRIES[country_id]} {'Cup' if cup else 'League'} {i // len(COUNTRIES) + 1}",
+            'slug': f'league-{100 + i}', 'country_id': 40 + country_id, 'country_name': COUNTRIES[country_id],
+            'country_slug': COUNTRIES[country_id].lower().replace(' ', '-'), 'teams': teams, 'cup': cup,
+        })
+
+    written = {}
+    match_id = 100000
+    for year in range(first_year, first_year + seasons):
+        for league in league_defs:
+            teams = league['teams']
+            if league['cup']:
+                picks = rng.choice(len(all_teams), size=len(teams), replace=False)
+                teams = [all_teams[p] for p in picks]
+            league = dict(league, league_year=f'{year}/{year + 1}')
+            matches = []
+            for round_no, home, away, day in season_fixtures(rng, teams, date(year, 8, 1), date(year + 1, 5, 31)):
+                league['round'] = round_no
+                matches.append(match_record(rng, match_id, league, home, away, day, day < today))
+                match_id += 1
+            matches.sort(key=lambda m: (m['match_date'], m['match_time']))
+            path = os.path.join(out_dir, f"league_{league['league_id']}_{year}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(matches, indent=2, ensure_ascii=False))
+            written[f"{league['league_id']}_{year}"] = len(matches)
+    return written
+
+
+TEAM_NAME_FIELDS = ('match_hometeam_name', 'match_awayteam_name')
+
+
+def league_team_names(leagues_dir):
+    """Every team name in generated league files"""
+    names = set()
+    for filename in sorted(os.listdir(leagues_dir)):
+        if filename.endswith('.json'):
+            for match in iter_matches(os.path.join(leagues_dir, filename), TEAM_NAME_FIELDS):
+                names.add(match['match_hometeam_name'])
+                names.add(match['match_awayteam_name'])
+    return sorted(names)
+
+
+def generate_name_csvs(out_dir, names, files=20, rows=500, variant_rate=0.3, seed=0):
+    """Fixture CSVs (Home Team/Away Team) and league CSVs (HomeTeam/AwayTeam) for the name tools,
+    plus the matching recommended_mappings.csv; fixture names are misspelt at variant_rate"""
+    rng = np.random.default_rng(seed)
+    fixtures_dir = os.path.join(out_dir, 'fixtures')
+    league_dir = os.path.join(out_dir, 'leagues', 'main')
+    os.makedirs(fixtures_dir, exist_ok=True)
+    os.makedirs(league_dir, exist_ok=True)
+
+    variant = {}
+    for name in names:
+        if rng.random() < variant_rate:
+            changed = VARIANTS[int(rng.integers(len(VARIANTS)))](name).strip()
+            if changed and changed != name:
+                variant[name] = changed
+
+    for i in range(files):
+        picks = rng.choice(len(names), size=(rows, 2))
+        with open(os.path.join(fixtures_dir, f'fixtures_{i:03d}.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Date', 'Time', 'Home Team', 'Away Team', 'Odds 1', 'Odds X', 'Odds 2'])
+            for row, (h, a) in enumerate(picks):
+                writer.writerow([(date(2025, 8, 1) + timedelta(days=row % 300)).isoformat(), '15:00',
+                                 variant.get(names[h], names[h]), variant.get(names[a], names[a]),
+                                 f'{rng.uniform(1.2, 6):.2f}', f'{rng.uniform(2.5, 4.5):.2f}',
+                                 f'{rng.uniform(1.2, 6):.2f}'])
+        with open(os.path.join(league_dir, f'league_{i:03d}.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+            for row, (h, a) in enumerate(picks):
+                writer.writerow([(date(2025, 8, 1) + timedelta(days=row % 300)).strftime('%d/%m/%Y'),
+                                 names[h], names[a], int(rng.poisson(1.4)), int(rng.poisson(1.1))])
+
+    with open(os.path.join(out_dir, 'recommended_mappings.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Fixture Team', 'League Team', 'Confidence', 'Action'])
+        for name, changed in sorted(variant.items()):
+            writer.writerow([changed, name, 0.9, 'REVIEW'])
+    return fixtures_dir, league_dir, variant
+
+
+def main():
+    """Generate synthetic API-Football league files for benchmarks"""
+    parser = argparse.ArgumentParser(description='Generate realistic synthetic league_<id>_<year>.json files')
+    parser.add_argument('output', help='folder for the league files')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiple of the 96 leagues we track today')
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = generate_dataset(args.output, leagues=max(int(96 * args.scale), 1), seasons=args.seasons,
+                               seed=args.seed)
+    print(f"✅ {len(written)} league files, {sum(written.values())} matches written to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
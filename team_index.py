@@ -0,0 +1,188 @@
+import threading
+import numpy as np
+
+from match_store import CATEGORIES, load_store
+
+# Entry keys are (team slot << DATE_BITS) | day number, so one sorted int64 array orders by team then date
+DATE_BITS = 32
+DATE_BIAS = 1 << 31
+
+
+def to_day(date):
+    """Day number (days since 1970-01-01) for a 'YYYY-MM-DD' string, datetime64 or date"""
+    return np.datetime64(date, 'D').astype(np.int64)
+
+
+def to_days(dates):
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def success_rate(hits, total):
+    """Math.round((hits / total) * 100) as the pages compute it (arrays or scalars, 0 when total is 0)
+
+    The float steps are the same as in JS, so e.g. 23/40 is 57.49999... and shows as 57, not 58.
+    """
+    hits = np.asarray(hits, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    return math_round(np.divide(hits, total, out=np.zeros_like(hits), where=total > 0) * 100)
+
+
+def math_round(values):
+    """JS Math.round(): nearest integer, exact halves up (arrays or scalars)"""
+    values = np.asarray(values, dtype=np.float64)
+    whole = np.floor(values)
+    rounded = whole + (values - whole >= 0.5)
+    return rounded.astype(np.int64) if rounded.ndim else int(rounded)
+
+
+class EntryIndex:
+    """Finished matches grouped by an integer key (team, referee, ...) in date order, with prefix sums of the
+    category totals, so any key's last n matches before a date and their totals are a couple of lookups"""
+
+    def __init__(self, store, entry_keys, positions, **aligned):
+        self.store = store
+        self._hits = {}
+
+        # Store rows are already date-sorted, so sorting by (key, row) gives each key's matches in date order
+        order = np.lexsort((positions, entry_keys))
+        self.positions = positions[order]
+        self.entry_keys = entry_keys[order]
+        for name, values in aligned.items():
+            setattr(self, name, values[order])
+        self.days = store['date'][self.positions].astype(np.int64)
+
+        self.key_ids, starts = np.unique(self.entry_keys, return_index=True)
+        self.offsets = np.append(starts, len(self.positions))
+        slots = np.searchsorted(self.key_ids, self.entry_keys)
+        self.keys = (slots.astype(np.int64) << DATE_BITS) | (self.days + DATE_BIAS)
+
+        # prefix[category][i] = sum of match totals over entries [0, i)
+        self.prefix = {}
+        for category in CATEGORIES:
+            values = store.totals(category)[self.positions]
+            self.prefix[category] = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    def key_range(self, key_id):
+        """(start, end) entry range of a key, empty if it has no finished matches"""
+        slot = np.searchsorted(self.key_ids, key_id)
+        if slot < len(self.key_ids) and self.key_ids[slot] == key_id:
+            return int(self.offsets[slot]), int(self.offsets[slot + 1])
+        return 0, 0
+
+    def key_window(self, key_id, n=None, before_date=None):
+        """(start, end) entry range of a key's last n matches (all if n is None) strictly before a date"""
+        start, end = self.key_range(key_id)
+        if before_date is not None and end > start:
+            slot = np.searchsorted(self.key_ids, key_id)
+            key = (int(slot) << DATE_BITS) | (int(to_day(before_date)) + DATE_BIAS)
+            end = start + int(np.searchsorted(self.keys[start:end], key, side='left'))
+        return (start, end) if n is None else (max(start, end - n), end)
+
+    def windows(self, key_ids, n, before_dates):
+        """Vectorised key_window(): (starts, ends) entry arrays for many (key, date) pairs"""
+        key_ids = np.asarray(key_ids, dtype=np.int64)
+        slots = np.searchsorted(self.key_ids, key_ids)
+        slots = np.minimum(slots, max(len(self.key_ids) - 1, 0))
+        known = (self.key_ids[slots] == key_ids) if len(self.key_ids) else np.zeros(len(key_ids), dtype=bool)
+
+        keys = (slots.astype(np.int64) << DATE_BITS) | (to_days(before_dates) + DATE_BIAS)
+        ends = np.searchsorted(self.keys, keys, side='left')
+        key_starts = self.offsets[slots] if len(self.key_ids) else np.zeros(len(key_ids), dtype=np.int64)
+        starts = key_starts if n is None else np.maximum(key_starts, ends - n)
+        starts = np.where(known, starts, 0)
+        ends = np.where(known, ends, 0)
+        return starts, ends
+
+    def window_total(self, category, start, end):
+        """Sum of a category's match totals over an entry range (works on arrays too)"""
+        prefix = self.prefix[category]
+        return prefix[end] - prefix[start]
+
+    def hit_prefix(self, category, threshold):
+        """Prefix counts of entries whose match total is over the threshold"""
+        key = (category, float(threshold))
+        if key not in self._hits:
+            over = self.store.totals(category)[self.positions] > threshold
+            self._hits[key] = np.concatenate([[0], np.cumsum(over, dtype=np.int32)])
+        return self._hits[key]
+
+    def hit_count(self, category, threshold, start, end, over_under='over'):
+        """Matches in an entry range that go over (total > threshold) or under (total <= threshold)"""
+        prefix = self.hit_prefix(category, threshold)
+        over = prefix[end] - prefix[start]
+        return over if over_under == 'over' else (end - start) - over
+
+
+class TeamIndex(EntryIndex):
+    """Finished matches of every team in date order, with prefix sums of the category totals"""
+
+    def __init__(self, store, leagues=None, registry=None, rows=None):
+        """rows: optional bool mask of the store rows to index, such as store.stats_mask(category)"""
+        self.registry = registry
+        self.leagues = frozenset(int(l) for l in leagues) if leagues is not None else None
+        self.rows = rows
+        self._restricted = {}
+        self._restricted_lock = threading.Lock()
+
+        mask = store.finished_mask() & store.league_mask(self.leagues)
+        if rows is not None:
+            mask &= rows
+        positions = np.flatnonzero(mask)
+        teams = np.concatenate([store['home_id'][positions], store['away_id'][positions]])
+        positions = np.concatenate([positions, positions])
+        is_home = np.concatenate([np.ones(len(teams) // 2, dtype=bool), np.zeros(len(teams) // 2, dtype=bool)])
+        super().__init__(store, teams, positions, is_home=is_home)
+
+    def for_leagues(self, leagues):
+        """Index restricted to some league ids (cached), or self for all leagues"""
+        if leagues is None:
+            return self
+        key = frozenset(int(l) for l in leagues)
+        if key == self.leagues:
+            return self
+        # Built once even when several query threads ask for the same leagues
+        with self._restricted_lock:
+            if key not in self._restricted:
+                self._restricted[key] = TeamIndex(self.store, key, self.registry, self.rows)
+            return self._restricted[key]
+
+    def team_id(self, team):
+        """API team id for an id or, with a registry, any known name or alias"""
+        if isinstance(team, str) and self.registry is not None:
+            team_id = self.registry.resolve(team)
+            if team_id is None:
+                raise KeyError(f'Unknown team {team!r}')
+            return team_id
+        if isinstance(team, str) and not team.strip().isdigit():
+            raise KeyError(f'Unknown team {team!r} (names need the team registry)')
+        return int(team)
+
+    def team_range(self, team):
+        """(start, end) entry range of a team, empty if it has no finished matches"""
+        return self.key_range(self.team_id(team))
+
+    def window(self, team, n, before_date=None):
+        """(start, end) entry range of a team's last n matches strictly before a date"""
+        return self.key_window(self.team_id(team), n, before_date)
+
+    def last_n(self, team, n, before_date=None, leagues=None):
+        """Store positions of a team's last n finished matches before a date (oldest first)"""
+        index = self.for_leagues(leagues)
+        start, end = index.window(team, n, before_date)
+        return index.positions[start:end]
+
+    def hit_rate(self, team, n, before_date, category, threshold, over_under='over', leagues=None):
+        """(successCount, totalMatches, successRate %) like analyzeTeamMatches in find_bets.js"""
+        index = self.for_leagues(leagues)
+        start, end = index.window(team, n, before_date)
+        hits = int(index.hit_count(category, threshold, start, end, over_under))
+        total = end - start
+        return hits, total, success_rate(hits, total)
+
+
+def build_team_index(store=None, leagues=None, registry=None):
+    """Load the compiled store (if not given) and index it by team"""
+    return TeamIndex(store if store is not None else load_store(), leagues, registry)
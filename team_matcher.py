@@ -0,0 +1,136 @@
+import re
+import difflib
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+from instrumentation import count
+
+# Same tokens normalizeTeamName() strips in the pages
+STRIP_TOKENS = ('cf', 'fc', 'real', 'sport', 'club', 'sc', 'ac', 'uefa', 'st')
+STRIP_TOKENS_PATTERN = re.compile(r'\b(?:' + '|'.join(STRIP_TOKENS) + r')\b')
+
+NGRAM_SIZE = 3
+TOP_CANDIDATES = 20
+
+
+def fold_team_name(name):
+    """normalizeTeamName() without the filler-token stripping: lowercase, no accents or punctuation"""
+    if not name or not isinstance(name, str):
+        return ''
+    s = unicodedata.normalize('NFD', name.lower())
+    s = re.sub(r'[\u0300-\u036f]', '', s)
+    s = re.sub(r'[^a-z0-9\s]', ' ', s)
+    return re.sub(r'\s+', ' ', s).strip()
+
+
+def normalize_team_name(name):
+    """Python port of normalizeTeamName(): lowercase, strip accents, punctuation and filler tokens"""
+    s = STRIP_TOKENS_PATTERN.sub('', fold_team_name(name))
+    return re.sub(r'\s+', ' ', s).strip()
+
+
+def name_ngrams(normalized, size=NGRAM_SIZE):
+    """Character n-grams of a normalized name, padded so short names still produce grams"""
+    padded = f' {normalized} '
+    return {padded[i:i + size] for i in range(max(len(padded) - size + 1, 1))}
+
+
+class TeamMatcher:
+    """Fuzzy team name lookup with n-gram/token blocking, so only a few candidates get exact scoring
+
+    groups optionally maps names to a group key (a country, a league CSV folder); a query with a group is
+    only scored against names of that group and names without one.
+    """
+
+    def __init__(self, names, groups=None):
+        self.names = list(names)
+        self.normalized = [normalize_team_name(name) for name in self.names]
+        self.groups = np.array([(groups or {}).get(name) or '' for name in self.names], dtype=object)
+        self.active = np.ones(len(self.names), dtype=bool)
+        self.lookup = defaultdict(list)
+        for i, name in enumerate(self.names):
+            self.lookup[name].append(i)
+
+        gram_postings = defaultdict(list)
+        token_postings = defaultdict(list)
+        self.gram_counts = np.zeros(len(self.names), dtype=np.int32)
+        for i, normalized in enumerate(self.normalized):
+            grams = name_ngrams(normalized)
+            self.gram_counts[i] = len(grams)
+            for gram in grams:
+                gram_postings[gram].append(i)
+            for token in set(normalized.split()):
+                token_postings[token].append(i)
+        self.gram_index = {gram: np.array(ids, dtype=np.int32) for gram, ids in gram_postings.items()}
+        self.token_index = {token: np.array(ids, dtype=np.int32) for token, ids in token_postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def remove(self, name):
+        """Stop offering a name as a match (e.g. once it has been mapped)"""
+        self.active[self.lookup.get(name, [])] = False
+
+    def candidates(self, name, group=None, top=TOP_CANDIDATES):
+        """Indexes of the best blocked candidates for a name, by n-gram Dice plus shared-token bonus"""
+        normalized = normalize_team_name(name)
+        grams = name_ngrams(normalized)
+        scores = np.zeros(len(self.names), dtype=np.float64)
+        for gram in grams:
+            ids = self.gram_index.get(gram)
+            if ids is not None:
+                scores[ids] += 1
+        scores = 2 * scores / (len(grams) + self.gram_counts)
+        for token in set(normalized.split()):
+            ids = self.token_index.get(token)
+            if ids is not None:
+                scores[ids] += 0.5
+
+        scores[~self.active] = 0
+        if group:
+            scores[(self.groups != group) & (self.groups != '')] = 0
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > top:
+            hits = hits[np.argpartition(-scores[hits], top)[:top]]
+        return hits[np.argsort(-scores[hits], kind='stable')]
+
+    def get_close_matches(self, name, n=5, cutoff=0.6, group=None):
+        """Like difflib.get_close_matches, but returns [(name, confidence)] best first"""
+        normalized = normalize_team_name(name)
+        # difflib caches its index of seq2, so keep the query there and swap candidates in as seq1
+        raw_matcher = difflib.SequenceMatcher(None)
+        raw_matcher.set_seq2(name.lower())
+        normalized_matcher = difflib.SequenceMatcher(None)
+        normalized_matcher.set_seq2(normalized)
+
+        scored = {}
+        floor = cutoff
+        compared = exact = 0
+        for i in self.candidates(name, group):
+            compared += 1
+            candidate = self.names[i]
+            raw_matcher.set_seq1(candidate.lower())
+            normalized_matcher.set_seq1(self.normalized[i])
+            use_normalized = bool(normalized and self.normalized[i])
+            # quick_ratio() is an upper bound of ratio(), so hopeless candidates skip the exact score
+            bound = max(raw_matcher.quick_ratio(), normalized_matcher.quick_ratio() if use_normalized else 0)
+            if bound < floor:
+                continue
+            exact += 1
+            score = raw_matcher.ratio()
+            if use_normalized:
+                score = max(score, normalized_matcher.ratio())
+            if score >= cutoff and score > scored.get(candidate, -1):
+                scored[candidate] = score
+                if len(scored) >= n:
+                    floor = max(cutoff, sorted(scored.values(), reverse=True)[n - 1])
+        count('names_compared', compared)
+        count('names_scored', exact)
+        return sorted(scored.items(), key=lambda x: (-x[1], x[0]))[:n]
+
+    def best_match(self, name, cutoff=0.6, group=None):
+        """(name, confidence) of the best match, or (None, 0.0)"""
+        matches = self.get_close_matches(name, 1, cutoff, group)
+        return matches[0] if matches else (None, 0.0)
@@ -1,8 +1,12 @@
 import os
+import argparse
 import pandas as pd
 import csv
 from collections import defaultdict
-import difflib
+from team_matcher import TeamMatcher
+from team_registry import load_registry
+import instrumentation
+from instrumentation import count, span
 
 def get_team_names_from_fixtures(fixtures_folder):
     """Extract team names from fixture CSV files"""
@@ -20,7 +24,9 @@ def get_team_names_from_fixtures(fixtures_folder):
             filepath = os.path.join(fixtures_folder, filename)
             try:
                 # Read CSV file
-                df = pd.read_csv(filepath)
+                with span('read_csv', file=filename):
+                    df = pd.read_csv(filepath)
+                count('rows_read', len(df))
                 
                 # Look for Home Team and Away Team columns (fixture format)
                 home_col = None
@@ -52,6 +58,14 @@ def get_team_names_from_fixtures(fixtures_folder):
     
     return team_names, processed_files
 
+def league_csv_folders(root="leagues"):
+    """leagues/main plus every season's filtered folder (leagues/other2025, leagues/other2026, ...)"""
+    if not os.path.isdir(root):
+        return [os.path.join(root, "main")]
+    others = sorted(name for name in os.listdir(root)
+                    if name.startswith("other") and os.path.isdir(os.path.join(root, name)))
+    return [os.path.join(root, "main")] + [os.path.join(root, name) for name in others]
+
 def get_team_names_from_leagues(leagues_folders):
     """Extract team names from league CSV files"""
     team_names = set()
@@ -69,7 +83,9 @@ def get_team_names_from_leagues(leagues_folders):
                 filepath = os.path.join(folder_name, filename)
                 try:
                     # Read CSV file
-                    df = pd.read_csv(filepath)
+                    with span('read_csv', file=f"{folder_name}/{filename}"):
+                        df = pd.read_csv(filepath)
+                    count('rows_read', len(df))
                     
                     # Look for team columns - different formats for different folders
                     home_col = None
@@ -111,13 +127,16 @@ def get_team_names_from_leagues(leagues_folders):
     
     return team_names, processed_files
 
-def find_similar_names(name, name_list, threshold=0.6):
-    """Find similar team names using fuzzy matching"""
-    matches = difflib.get_close_matches(name, name_list, n=5, cutoff=threshold)
-    return matches
+def find_similar_names(name, matcher, threshold=0.6, group=None):
+    """Find similar team names using fuzzy matching, as [(name, confidence)] best first"""
+    return matcher.get_close_matches(name, n=5, cutoff=threshold, group=group)
 
-def compare_team_names(fixture_teams, league_teams):
-    """Compare team names between fixtures and leagues"""
+def team_groups(names, registry=None):
+    """{name: country} for the names the team registry knows, so fuzzy matches stay within a country"""
+    return registry.countries(names) if registry is not None else {}
+
+def compare_team_names(fixture_teams, league_teams, groups=None):
+    """Compare team names between fixtures and leagues (groups: {name: country} to match within)"""
     print("\n" + "="*60)
     print("📊 TEAM NAME COMPARISON ANALYSIS")
     print("="*60)
@@ -145,15 +164,26 @@ def compare_team_names(fixture_teams, league_teams):
         for team in sorted(exact_matches):
             print(f"  • {team}")
     
+    # Fuzzy-match each one-sided team once; the report and the saved CSVs both use these results
+    with span('build_matchers'):
+        groups = groups or {}
+        league_matcher = TeamMatcher(league_teams, groups)
+        fixture_matcher = TeamMatcher(fixture_teams, groups)
+    similar_names = {}
+    with span('similar_names', names=len(fixture_only) + len(league_only)):
+        for team in fixture_only:
+            similar_names[('Fixture Only', team)] = find_similar_names(team, league_matcher, 0.3, groups.get(team))
+        for team in league_only:
+            similar_names[('League Only', team)] = find_similar_names(team, fixture_matcher, 0.3, groups.get(team))
+
     # Show fixture-only teams with potential league matches
     if fixture_only:
         print(f"\n🏟️  TEAMS ONLY IN FIXTURES ({len(fixture_only)}):")
         for team in sorted(fixture_only):
-            similar = find_similar_names(team, list(league_teams), threshold=0.5)
+            similar = [(sim, confidence) for sim, confidence in similar_names[('Fixture Only', team)] if confidence >= 0.5]
             if similar:
                 print(f"  • {team}")
-                for sim in similar[:3]:  # Show top 3 matches
-                    confidence = difflib.SequenceMatcher(None, team.lower(), sim.lower()).ratio()
+                for sim, confidence in similar[:3]:  # Show top 3 matches
                     print(f"    └─ {sim} (confidence: {confidence:.2f})")
             else:
                 print(f"  • {team} (no similar names found)")
@@ -162,38 +192,45 @@ def compare_team_names(fixture_teams, league_teams):
     if league_only:
         print(f"\n⚽ TEAMS ONLY IN LEAGUES ({len(league_only)}):")
         for team in sorted(league_only):
-            similar = find_similar_names(team, list(fixture_teams), threshold=0.5)
+            similar = [(sim, confidence) for sim, confidence in similar_names[('League Only', team)] if confidence >= 0.5]
             if similar:
                 print(f"  • {team}")
-                for sim in similar[:3]:  # Show top 3 matches
-                    confidence = difflib.SequenceMatcher(None, team.lower(), sim.lower()).ratio()
+                for sim, confidence in similar[:3]:  # Show top 3 matches
                     print(f"    └─ {sim} (confidence: {confidence:.2f})")
             else:
                 print(f"  • {team} (no similar names found)")
     
-    return exact_matches, fixture_only, league_only
+    return exact_matches, fixture_only, league_only, similar_names
 
-def generate_mapping_suggestions(fixture_only, league_only):
+def generate_mapping_suggestions(fixture_only, league_only, registry=None):
     """Generate mapping suggestions for mismatched team names"""
     print(f"\n🔄 MAPPING SUGGESTIONS:")
     print("="*50)
     
     mappings = []
-    used_league_teams = set()
+    groups = team_groups(set(fixture_only) | set(league_only), registry)
+    league_matcher = TeamMatcher(league_only, groups)
+    
+    # Names the team registry already knows are aliases of the same team id map without fuzzy matching
+    league_by_id = {}
+    if registry is not None:
+        for league_team in sorted(league_only):
+            team_id = registry.resolve(league_team)
+            if team_id is not None:
+                league_by_id.setdefault(team_id, league_team)
     
     for fixture_team in sorted(fixture_only):
-        # Find best matches in league teams
-        available_league_teams = [team for team in league_only if team not in used_league_teams]
-        matches = find_similar_names(fixture_team, available_league_teams, threshold=0.3)
+        known_match = league_by_id.get(registry.resolve(fixture_team)) if registry is not None else None
+        if known_match and league_matcher.active[league_matcher.lookup[known_match]].any():
+            best_match, confidence = known_match, 1.0
+        else:
+            # Find best match among league teams not mapped yet
+            best_match, confidence = league_matcher.best_match(fixture_team, cutoff=0.3, group=groups.get(fixture_team))
         
-        if matches:
-            best_match = matches[0]
-            confidence = difflib.SequenceMatcher(None, fixture_team.lower(), best_match.lower()).ratio()
-            
-            if confidence > 0.4:  # Only suggest if confidence is reasonable
-                print(f"  '{fixture_team}' → '{best_match}' (confidence: {confidence:.2f})")
-                mappings.append((fixture_team, best_match, confidence))
-                used_league_teams.add(best_match)
+        if best_match and confidence > 0.4:  # Only suggest if confidence is reasonable
+            print(f"  '{fixture_team}' → '{best_match}' (confidence: {confidence:.2f})")
+            mappings.append((fixture_team, best_match, confidence))
+            league_matcher.remove(best_match)
     
     if not mappings:
         print("  No strong mapping suggestions found.")
@@ -223,7 +260,7 @@ def generate_javascript_mapping(mappings, exact_matches):
     print("}")
     print("\n// Usage: normalizeTeamName('Man City') returns 'Manchester City'")
 
-def save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_only, league_only, mappings):
+def save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_only, league_only, mappings, similar_names):
     """Save analysis results to CSV files"""
     print(f"\n💾 SAVING RESULTS TO FILES:")
     
@@ -252,25 +289,15 @@ def save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_on
         for team in sorted(exact_matches):
             writer.writerow([team, 'Exact Match', '', '', '1.00'])
         
-        # Fixture-only teams
-        for team in sorted(fixture_only):
-            similar = find_similar_names(team, list(league_teams), threshold=0.3)
-            if similar:
-                best_match = similar[0]
-                confidence = difflib.SequenceMatcher(None, team.lower(), best_match.lower()).ratio()
-                writer.writerow([team, 'Fixture Only', '; '.join(similar[:3]), best_match, f'{confidence:.2f}'])
-            else:
-                writer.writerow([team, 'Fixture Only', 'No matches', '', '0.00'])
-        
-        # League-only teams
-        for team in sorted(league_only):
-            similar = find_similar_names(team, list(fixture_teams), threshold=0.3)
-            if similar:
-                best_match = similar[0]
-                confidence = difflib.SequenceMatcher(None, team.lower(), best_match.lower()).ratio()
-                writer.writerow([team, 'League Only', '; '.join(similar[:3]), best_match, f'{confidence:.2f}'])
-            else:
-                writer.writerow([team, 'League Only', 'No matches', '', '0.00'])
+        # Fixture-only and league-only teams
+        for status, teams in (('Fixture Only', fixture_only), ('League Only', league_only)):
+            for team in sorted(teams):
+                similar = similar_names[(status, team)]
+                if similar:
+                    best_match, confidence = similar[0]
+                    writer.writerow([team, status, '; '.join(sim for sim, _ in similar[:3]), best_match, f'{confidence:.2f}'])
+                else:
+                    writer.writerow([team, status, 'No matches', '', '0.00'])
     
     print(f"  ✅ team_comparison_results.csv (detailed comparison)")
     
@@ -286,19 +313,30 @@ def save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_on
 
 def main():
     """Main function to run the team name analysis"""
+    parser = argparse.ArgumentParser(description='Compare fixture and league team names and suggest mappings')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    with instrumentation.profiling(args, 'team_name_analyzer'):
+        analyze()
+
+def analyze():
+    """Read both name sets, compare them, suggest mappings and save the results"""
     print("🏈 FOOTBALL TEAM NAME ANALYZER (Enhanced)")
     print("="*55)
     
     # Define folder paths
     fixtures_folder = "fixtures"
-    leagues_folders = ["leagues/main", "leagues/other2025"]
+    leagues_folders = league_csv_folders()
     
     # Get team names from fixtures
-    fixture_teams, fixture_files = get_team_names_from_fixtures(fixtures_folder)
+    with span('read_fixture_names'):
+        fixture_teams, fixture_files = get_team_names_from_fixtures(fixtures_folder)
     print(f"\n📋 Processed fixture files: {len(fixture_files)}")
     
     # Get team names from leagues
-    league_teams, league_files = get_team_names_from_leagues(leagues_folders)
+    with span('read_league_names'):
+        league_teams, league_files = get_team_names_from_leagues(leagues_folders)
     print(f"\n📋 Processed league files: {len(league_files)}")
     
     if not fixture_teams and not league_teams:
@@ -313,17 +351,23 @@ def main():
         print("⚠️  No league teams found!")
         return
     
-    # Compare team names
-    exact_matches, fixture_only, league_only = compare_team_names(fixture_teams, league_teams)
+    # Compare team names, within each country where the team registry (if it has been built) knows it
+    registry = load_registry()
+    with span('compare_team_names'):
+        groups = team_groups(fixture_teams | league_teams, registry)
+        exact_matches, fixture_only, league_only, similar_names = compare_team_names(fixture_teams, league_teams,
+                                                                                     groups)
     
-    # Generate mapping suggestions
-    mappings = generate_mapping_suggestions(fixture_only, league_only)
+    # Generate mapping suggestions (known aliases from the team registry first)
+    with span('mapping_suggestions'):
+        mappings = generate_mapping_suggestions(fixture_only, league_only, registry)
     
     # Generate JavaScript mapping code
     generate_javascript_mapping(mappings, exact_matches)
     
     # Save results to files
-    save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_only, league_only, mappings)
+    with span('save_results'):
+        save_results_to_files(fixture_teams, league_teams, exact_matches, fixture_only, league_only, mappings, similar_names)
     
     print(f"\n✅ Analysis complete!")
     print(f"📊 Summary: {len(exact_matches)} exact matches, {len(fixture_only)} fixture-only, {len(league_only)} league-only")
@@ -0,0 +1,343 @@
+import os
+import json
+import math
+import argparse
+import numpy as np
+import pandas as pd
+
+from match_store import CHANGES_FILE, STORE_DIR, load_store, read_manifest, write_json
+from team_index import DATE_BIAS, DATE_BITS, to_days
+from team_registry import REGISTRY_FILE, load_registry
+
+RATINGS_FILE = os.path.join(STORE_DIR, 'team_ratings.json')
+RATINGS_VERSION = 1
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 65.0
+
+# One entry per rated match, in rating order
+HISTORY_COLUMNS = {
+    'match_id': np.int64, 'day': np.int64, 'time': np.int64, 'league_id': np.int64, 'home_id': np.int64,
+    'away_id': np.int64, 'home_goals': np.int64, 'away_goals': np.int64,
+    'home_before': np.float64, 'away_before': np.float64, 'delta': np.float64,
+}
+# A rated match whose result fields change in the store is rated again
+RESULT_FIELDS = ('match_id', 'day', 'time', 'league_id', 'home_id', 'away_id', 'home_goals', 'away_goals')
+
+# Added to fixture tables when ratings are given; rating_gap is home minus away
+RATING_COLUMNS = ['home_rating', 'away_rating', 'rating_gap']
+# Average rating of the opponents in each team's last-N sample, as it was when they were played
+OPPOSITION_COLUMNS = ['home_opposition', 'away_opposition']
+
+
+def order_keys(days, times, match_ids):
+    """int64 keys ordering matches by date, kick-off minute, then match id"""
+    minutes = np.asarray(days, dtype=np.int64) * 1440 + np.clip(np.asarray(times, dtype=np.int64), 0, 1439)
+    return (minutes << 32) | np.asarray(match_ids, dtype=np.int64)
+
+
+def goal_multiplier(goal_difference):
+    """World Football Elo margin weight: 1 up to one goal, 1.5 for two, (11 + n) / 8 for n >= 3"""
+    if goal_difference <= 1:
+        return 1.0
+    if goal_difference == 2:
+        return 1.5
+    return (11 + goal_difference) / 8
+
+
+def default_settings():
+    return {'initial_rating': INITIAL_RATING, 'k_factor': K_FACTOR, 'home_advantage': HOME_ADVANTAGE}
+
+
+def empty_history():
+    return {name: np.zeros(0, dtype=dtype) for name, dtype in HISTORY_COLUMNS.items()}
+
+
+class TeamRatings:
+    """Elo ratings of every team over every league and cup, streamed through the finished matches in date
+    order; each match's ratings are kept, so any team's rating on any date is a lookup"""
+
+    def __init__(self, history=None, settings=None, data_version=None):
+        self.settings = settings or default_settings()
+        self.data_version = data_version
+        self.history = history if history is not None else empty_history()
+        self.restore()
+
+    def __len__(self):
+        return len(self.history['match_id'])
+
+    def restore(self):
+        """Current ratings and the teams seen in each league, from the history"""
+        h = self.history
+        # Home and away entries of each match interleaved, so later matches come later
+        teams = np.column_stack([h['home_id'], h['away_id']]).ravel()
+        after = np.column_stack([h['home_before'] + h['delta'], h['away_before'] - h['delta']]).ravel()
+        team_ids, last = np.unique(teams[::-1], return_index=True)
+        self.current = dict(zip(team_ids.tolist(), after[::-1][last].tolist()))
+        self.league_teams = {}
+        leagues = np.repeat(h['league_id'], 2)
+        for league_id, team_id in set(zip(leagues.tolist(), teams.tolist())):
+            self.league_teams.setdefault(league_id, set()).add(team_id)
+        self._index = None
+
+    def first_rating(self, league_id):
+        """Rating a team starts from: the current average of its league's teams (INITIAL_RATING in a new league)"""
+        teams = self.league_teams.get(league_id)
+        if not teams:
+            return self.settings['initial_rating']
+        # fsum is exact, so the result does not depend on the set's iteration order
+        return math.fsum(self.current[team_id] for team_id in teams) / len(teams)
+
+    def add(self, records):
+        """Rate matches (RESULT_FIELDS arrays, in order) one after another and append them to the history"""
+        k_factor = self.settings['k_factor']
+        home_advantage = self.settings['home_advantage']
+        n = len(records['match_id'])
+        home_before = np.empty(n)
+        away_before = np.empty(n)
+        delta = np.empty(n)
+        rows = zip(records['league_id'].tolist(), records['home_id'].tolist(), records['away_id'].tolist(),
+                   records['home_goals'].tolist(), records['away_goals'].tolist())
+        for i, (league_id, home, away, home_goals, away_goals) in enumerate(rows):
+            home_rating = self.current.get(home)
+            away_rating = self.current.get(away)
+            if home_rating is None:
+                home_rating = self.first_rating(league_id)
+            if away_rating is None:
+                away_rating = self.first_rating(league_id)
+            expected = 1 / (1 + 10 ** ((away_rating - home_rating - home_advantage) / 400))
+            result = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+            change = k_factor * goal_multiplier(abs(home_goals - away_goals)) * (result - expected)
+            self.current[home] = home_rating + change
+            self.current[away] = away_rating - change
+            self.league_teams.setdefault(league_id, set()).update((home, away))
+            home_before[i], away_before[i], delta[i] = home_rating, away_rating, change
+
+        records = dict(records, home_before=home_before, away_before=away_before, delta=delta)
+        self.history = {name: np.concatenate([self.history[name], np.asarray(records[name], dtype=dtype)])
+                        for name, dtype in HISTORY_COLUMNS.items()}
+        self._index = None
+
+    def update(self, store):
+        """Rate the store's finished matches that are not rated yet, in O(new matches)
+
+        A result dated before the last rated match, or a rated one whose score, date or teams changed, replays
+        the matches from that point on rather than the whole history. Matches that are no longer in the store
+        (or not in a partial store) keep their ratings. Returns (matches rated, rated matches replayed).
+        """
+        positions = np.flatnonzero(store.finished_mask())
+        _, first = np.unique(store['match_id'][positions], return_index=True)
+        positions = positions[np.sort(first)]
+        rows = {
+            'match_id': store['match_id'][positions], 'day': store['date'][positions].astype(np.int64),
+            'time': store['time'][positions], 'league_id': store['league_id'][positions],
+            'home_id': store['home_id'][positions], 'away_id': store['away_id'][positions],
+            'home_goals': store['home_goals'][positions], 'away_goals': store['away_goals'][positions],
+        }
+        rows = {name: np.asarray(values, dtype=np.int64) for name, values in rows.items()}
+
+        h = self.history
+        by_id = np.argsort(h['match_id'])
+        slots = np.minimum(np.searchsorted(h['match_id'][by_id], rows['match_id']), max(len(self) - 1, 0))
+        entries = by_id[slots] if len(self) else slots
+        known = h['match_id'][entries] == rows['match_id'] if len(self) else np.zeros(len(positions), dtype=bool)
+        changed = np.zeros(len(positions), dtype=bool)
+        for name in RESULT_FIELDS:
+            changed[known] |= rows[name][known] != h[name][entries[known]]
+        incoming = ~known | changed
+        if not incoming.any():
+            return 0, 0
+
+        records = {name: values[incoming] for name, values in rows.items()}
+        start = order_keys(records['day'], records['time'], records['match_id']).min()
+        history_keys = order_keys(h['day'], h['time'], h['match_id'])
+        if changed.any():
+            start = min(start, history_keys[entries[changed]].min())
+        replay = history_keys >= start
+        replayed = 0
+        if replay.any():
+            # Everything rated from that point on is rated again, the changed matches with their new values
+            tail = replay.copy()
+            tail[entries[changed]] = False
+            replayed = int(tail.sum())
+            records = {name: np.concatenate([h[name][tail], values]) for name, values in records.items()}
+            self.history = {name: values[~replay] for name, values in h.items()}
+            self.restore()
+
+        order = np.argsort(order_keys(records['day'], records['time'], records['match_id']), kind='stable')
+        self.add({name: values[order] for name, values in records.items()})
+        return int(incoming.sum()), replayed
+
+    def snapshot_index(self):
+        """(team ids, keys, ratings) of every team's rating after each of its matches, keyed like EntryIndex"""
+        if self._index is None:
+            h = self.history
+            teams = np.concatenate([h['home_id'], h['away_id']])
+            days = np.concatenate([h['day'], h['day']])
+            after = np.concatenate([h['home_before'] + h['delta'], h['away_before'] - h['delta']])
+            sequence = np.concatenate([np.arange(len(self)), np.arange(len(self))])
+            team_ids = np.unique(teams)
+            keys = (np.searchsorted(team_ids, teams).astype(np.int64) << DATE_BITS) | (days + DATE_BIAS)
+            order = np.lexsort((sequence, keys))
+            self._index = team_ids, keys[order], after[order]
+        return self._index
+
+    def ratings_at(self, team_ids, dates):
+        """Ratings going into matches on some dates (after every earlier day's matches), NaN before a team's
+        first rated match"""
+        index_ids, keys, after = self.snapshot_index()
+        team_ids = np.asarray(team_ids, dtype=np.int64)
+        if not len(keys):
+            return np.full(team_ids.shape, np.nan)
+        slots = np.minimum(np.searchsorted(index_ids, team_ids), len(index_ids) - 1)
+        query = (slots.astype(np.int64) << DATE_BITS) | (to_days(dates) + DATE_BIAS)
+        last = np.maximum(np.searchsorted(keys, query, side='left') - 1, 0)
+        rated = (index_ids[slots] == team_ids) & ((keys[last] >> DATE_BITS) == slots) & (keys[last] < query)
+        return np.where(rated, after[last], np.nan)
+
+    def rating(self, team_id, date=None):
+        """A team's rating going into a date (its latest rating if date is None), NaN if it has none yet"""
+        if date is None:
+            return self.current.get(int(team_id), np.nan)
+        return float(self.ratings_at([team_id], date)[0])
+
+    def table(self, date=None, leagues=None):
+        """Every team's rating and rated matches going into a date (latest if None), best first; with league
+        ids, only teams that played in them"""
+        index_ids, keys, _ = self.snapshot_index()
+        team_ids = index_ids
+        if leagues is not None:
+            members = set().union(*(self.league_teams.get(int(l), set()) for l in leagues))
+            team_ids = team_ids[np.isin(team_ids, np.asarray(sorted(members), dtype=np.int64))]
+        slots = np.searchsorted(index_ids, team_ids).astype(np.int64)
+        if date is None:
+            ratings = np.asarray([self.current[team_id] for team_id in team_ids.tolist()], dtype=np.float64)
+            ends = np.searchsorted(keys, (slots + 1) << DATE_BITS)
+        else:
+            ratings = self.ratings_at(team_ids, date)
+            ends = np.searchsorted(keys, (slots << DATE_BITS) | (to_days(date) + DATE_BIAS))
+        matches = ends - np.searchsorted(keys, slots << DATE_BITS)
+        table = pd.DataFrame({'team_id': team_ids, 'rating': ratings.round(1), 'matches': matches})
+        table = table[matches > 0].sort_values(['rating', 'team_id'], ascending=[False, True], kind='stable')
+        table.insert(0, 'rank', np.arange(1, len(table) + 1))
+        return table.reset_index(drop=True)
+
+    def to_json(self):
+        return {'version': RATINGS_VERSION, 'data_version': self.data_version, 'settings': self.settings,
+                'history': {name: values.tolist() for name, values in self.history.items()}}
+
+    @classmethod
+    def from_json(cls, data):
+        history = {name: np.asarray(data['history'][name], dtype=dtype) for name, dtype in HISTORY_COLUMNS.items()}
+        return cls(history, data['settings'], data['data_version'])
+
+
+def fixture_ratings(ratings, store, fixtures):
+    """(home ratings, away ratings) going into some fixtures (store positions)"""
+    dates = store['date'][fixtures]
+    return (ratings.ratings_at(store['home_id'][fixtures], dates),
+            ratings.ratings_at(store['away_id'][fixtures], dates))
+
+
+def opposition_ratings(ratings, index, starts, ends):
+    """Average rating the opponents had going into the matches of TeamIndex entry ranges (NaN if none rated)"""
+    store = index.store
+    opponents = np.where(index.is_home, store['away_id'][index.positions], store['home_id'][index.positions])
+    opponent_ratings = ratings.ratings_at(opponents, store['date'][index.positions])
+    rated = ~np.isnan(opponent_ratings)
+    total = np.concatenate([[0], np.cumsum(np.where(rated, opponent_ratings, 0))])
+    count = np.concatenate([[0], np.cumsum(rated, dtype=np.int64)])
+    n = count[ends] - count[starts]
+    return np.divide(total[ends] - total[starts], n, out=np.full(len(n), np.nan), where=n > 0)
+
+
+def load_ratings(ratings_file=RATINGS_FILE, settings=None):
+    """Saved ratings, or None when there are none for these settings"""
+    if not os.path.exists(ratings_file):
+        return None
+    with open(ratings_file, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != RATINGS_VERSION or data['settings'] != (settings or default_settings()):
+        return None
+    return TeamRatings.from_json(data)
+
+
+def update_ratings(store_dir=STORE_DIR, ratings_file=RATINGS_FILE, rebuild=False, settings=None):
+    """Bring the saved ratings up to the store's data version; (ratings, matches rated, matches replayed)
+
+    When the ratings are one ingest behind, only the partitions changes.json lists are read.
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No compiled store in '{store_dir}' - run match_store.py first")
+    data_version = manifest.get('data_version')
+    ratings = None if rebuild else load_ratings(ratings_file, settings)
+    if ratings is not None and ratings.data_version == data_version:
+        return ratings, 0, 0
+
+    partitions = None
+    changes_path = os.path.join(store_dir, CHANGES_FILE)
+    if ratings is not None and os.path.exists(changes_path):
+        with open(changes_path, encoding='utf-8') as f:
+            changes = json.load(f)
+        if not changes['full'] and changes['data_version'] == (ratings.data_version or 0) + 1:
+            partitions = list(changes['partitions'])
+    ratings = ratings if ratings is not None else TeamRatings(settings=settings)
+    rated, replayed = ratings.update(load_store(store_dir, partitions=partitions))
+    ratings.data_version = data_version
+    write_json(ratings_file, ratings.to_json())
+    return ratings, rated, replayed
+
+
+def main():
+    """Update the team ratings from the store and list them"""
+    parser = argparse.ArgumentParser(description='Elo ratings of every team across leagues and cups')
+    parser.add_argument('--date', help='ratings going into this date (default: latest)')
+    parser.add_argument('--leagues', help='comma separated league ids to list teams of (default: all)')
+    parser.add_argument('--team', help='show one team\'s rated matches (id, name or alias)')
+    parser.add_argument('--top', type=int, default=30, help='number of teams to list')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--rebuild', action='store_true', help='rate every match again from scratch')
+    args = parser.parse_args()
+
+    print("🏆 TEAM RATINGS")
+    print("="*40)
+    ratings_file = os.path.join(args.store_dir, os.path.basename(RATINGS_FILE))
+    ratings, rated, replayed = update_ratings(args.store_dir, ratings_file, args.rebuild)
+    print(f"✅ {rated} matches rated, {replayed} replayed ({len(ratings)} in total, "
+          f"data version {ratings.data_version})")
+    store = load_store(args.store_dir)
+
+    if args.team:
+        if args.team.isdigit():
+            team_id = int(args.team)
+        else:
+            registry = load_registry(os.path.join(args.store_dir, os.path.basename(REGISTRY_FILE)))
+            if registry is None:
+                parser.error(f'No team registry in {args.store_dir!r} to look up {args.team!r} - '
+                             'run team_registry.py first or pass the team id')
+            team_id = registry.resolve(args.team)
+            if team_id is None:
+                parser.error(f'Unknown team {args.team!r}')
+        h = ratings.history
+        rows = np.flatnonzero((h['home_id'] == team_id) | (h['away_id'] == team_id))
+        if args.date:
+            rows = rows[h['day'][rows] < to_days(args.date)]
+        print(f"📈 {store.team_name(team_id)}: {ratings.rating(team_id, args.date):.1f}")
+        for i in rows[-args.top:].tolist():
+            home = h['home_id'][i] == team_id
+            before = h['home_before'][i] if home else h['away_before'][i]
+            change = h['delta'][i] if home else -h['delta'][i]
+            print(f"  {np.datetime64(int(h['day'][i]), 'D')}  {store.team_name(h['home_id'][i])} "
+                  f"{h['home_goals'][i]}-{h['away_goals'][i]} {store.team_name(h['away_id'][i])}  "
+                  f"{before:.1f} {change:+.1f}")
+        return
+
+    table = ratings.table(args.date, args.leagues.split(',') if args.leagues else None).head(args.top)
+    table.insert(2, 'team', [store.team_name(team_id) for team_id in table['team_id']])
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
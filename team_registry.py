@@ -0,0 +1,212 @@
+import os
+import json
+import argparse
+from collections import defaultdict
+import pandas as pd
+
+from match_store import STORE_DIR, load_store, write_json
+from team_matcher import normalize_team_name
+
+REGISTRY_FILE = os.path.join(STORE_DIR, 'team_registry.json')
+
+# Where an alias came from: the league JSON itself, or a fuzzy mapping that was accepted
+SOURCE_LEAGUE = 'league'
+SOURCE_MAPPING = 'mapping'
+
+
+class TeamRegistry:
+    """API team id -> canonical name and aliases, with O(1) alias resolution"""
+
+    def __init__(self, teams=None):
+        # teams: {team_id: {'name': str, 'aliases': {alias: source}, 'leagues': [ids], 'country': str}}
+        self.teams = teams or {}
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the exact and normalized alias lookups"""
+        by_alias = defaultdict(set)
+        by_lower = defaultdict(set)
+        by_normalized = defaultdict(set)
+        for team_id, team in self.teams.items():
+            for alias in [team['name']] + list(team['aliases']):
+                by_alias[alias].add(team_id)
+                by_lower[alias.lower()].add(team_id)
+                key = normalize_team_name(alias)
+                if key:
+                    by_normalized[key].add(team_id)
+
+        # A name several teams answer to resolves to the one it is the canonical name of, if that is unique
+        self.by_alias = {}
+        for alias, ids in by_alias.items():
+            if len(ids) > 1:
+                ids = {team_id for team_id in ids if self.teams[team_id]['name'] == alias}
+            if len(ids) == 1:
+                self.by_alias[alias] = next(iter(ids))
+        self.by_lower = {key: next(iter(ids)) for key, ids in by_lower.items() if len(ids) == 1}
+        self.by_normalized = {key: next(iter(ids)) for key, ids in by_normalized.items() if len(ids) == 1}
+
+    def __len__(self):
+        return len(self.teams)
+
+    def __contains__(self, team_id):
+        return int(team_id) in self.teams
+
+    def resolve(self, name):
+        """Team id for a raw name or alias, or None"""
+        if name is None:
+            return None
+        if isinstance(name, int):
+            return name if name in self.teams else None
+        team_id = self.by_alias.get(name)
+        if team_id is None:
+            team_id = self.by_lower.get(name.lower())
+        if team_id is None:
+            team_id = self.by_normalized.get(normalize_team_name(name))
+        return team_id
+
+    def name(self, team_id):
+        """Canonical name of a team id"""
+        team = self.teams.get(int(team_id))
+        return team['name'] if team else None
+
+    def canonical(self, name):
+        """Canonical name for a raw name or alias, or the name itself if unknown"""
+        team_id = self.resolve(name)
+        return self.teams[team_id]['name'] if team_id is not None else name
+
+    def aliases(self, team_id):
+        return sorted(self.teams[int(team_id)]['aliases'])
+
+    def add_alias(self, team_id, alias, source=SOURCE_MAPPING, reindex=True):
+        """Register another name for a team"""
+        team = self.teams[int(team_id)]
+        if alias and alias != team['name'] and alias not in team['aliases']:
+            team['aliases'][alias] = source
+            if reindex:
+                self.reindex()
+
+    def alias_mappings(self, targets=None):
+        """{alias: canonical name} for every alias that differs from its team's canonical name
+
+        With targets (the names mappings must end at), a team's other names map to its name in targets instead,
+        and teams without a name in targets are left out.
+        """
+        if targets is None:
+            return {alias: self.teams[team_id]['name'] for alias, team_id in self.by_alias.items()
+                    if alias != self.teams[team_id]['name']}
+        target_of = {}
+        for team_id, team in self.teams.items():
+            for name in [team['name']] + sorted(team['aliases']):
+                if name in targets and self.by_alias.get(name) == team_id:
+                    target_of[team_id] = name
+                    break
+        return {alias: target_of[team_id] for alias, team_id in self.by_alias.items()
+                if team_id in target_of and alias != target_of[team_id] and alias not in targets}
+
+    def import_mappings(self, mapping_file='recommended_mappings.csv', min_confidence=0.6):
+        """Record accepted 'Fixture Team' -> 'League Team' mappings as aliases; returns how many were added"""
+        if not os.path.exists(mapping_file):
+            return 0
+        df = pd.read_csv(mapping_file)
+        if 'Fixture Team' not in df.columns or 'League Team' not in df.columns:
+            return 0
+        confidence = df['Confidence'] if 'Confidence' in df.columns else pd.Series(1.0, index=df.index)
+        df = df[confidence.astype(float) >= min_confidence]
+
+        added = 0
+        for fixture_team, league_team in zip(df['Fixture Team'].astype(str).str.strip(),
+                                             df['League Team'].astype(str).str.strip()):
+            team_id = self.resolve(league_team)
+            if team_id is not None and self.resolve(fixture_team) is None:
+                self.add_alias(team_id, fixture_team, reindex=False)
+                added += 1
+        if added:
+            self.reindex()
+        return added
+
+    def countries(self, names):
+        """{name: country} of the names that resolve to a team with a known country"""
+        countries = {}
+        for name in names:
+            team_id = self.resolve(name)
+            if team_id is not None and self.teams[team_id].get('country'):
+                countries[name] = self.teams[team_id]['country']
+        return countries
+
+    def to_json(self):
+        return {'version': 1, 'teams': {str(team_id): team for team_id, team in sorted(self.teams.items())}}
+
+
+def build_registry(store=None, previous=None):
+    """Build the registry from every team id in the compiled store, keeping accepted mapping aliases"""
+    store = store if store is not None else load_store()
+    partitions = list(store.partitions.values())
+    names = defaultdict(dict)
+    leagues = defaultdict(set)
+    countries = defaultdict(dict)
+
+    partition = store['partition'].tolist()
+    days = store['date'].astype('int64').tolist()
+    for side in ('home', 'away'):
+        for team_id, name_idx, part, day in zip(store[f'{side}_id'].tolist(), store[f'{side}_name'].tolist(),
+                                                partition, days):
+            name = store.strings[name_idx]
+            if day >= names[team_id].get(name, -1):
+                names[team_id][name] = day
+            meta = partitions[part]
+            leagues[team_id].add(meta['league_id'])
+            countries[team_id][meta['country_name']] = countries[team_id].get(meta['country_name'], 0) + 1
+
+    teams = {}
+    for team_id, seen in names.items():
+        canonical = store.team_name(team_id)
+        aliases = {name: SOURCE_LEAGUE for name in seen if name != canonical}
+        if previous is not None and team_id in previous.teams:
+            for alias, source in previous.teams[team_id]['aliases'].items():
+                if source != SOURCE_LEAGUE and alias != canonical:
+                    aliases.setdefault(alias, source)
+        teams[team_id] = {
+            'name': canonical,
+            'aliases': dict(sorted(aliases.items())),
+            'leagues': sorted(leagues[team_id]),
+            # Cup and European matches put a team in other countries' files; its home country is the most common
+            'country': max(countries[team_id].items(), key=lambda x: (x[1], x[0]))[0],
+        }
+    return TeamRegistry(teams)
+
+
+def load_registry(path=REGISTRY_FILE):
+    """Load the saved registry, or None if it has not been built"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return TeamRegistry({int(team_id): team for team_id, team in data['teams'].items()})
+
+
+def save_registry(registry, path=REGISTRY_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write_json(path, registry.to_json())
+
+
+def main():
+    """Build (or refresh) the team registry from the compiled store"""
+    parser = argparse.ArgumentParser(description='Build the team id -> canonical name -> aliases registry')
+    parser.add_argument('--mappings', default='recommended_mappings.csv',
+                        help='accepted fixture -> league name mappings to record as aliases')
+    parser.add_argument('--output', default=REGISTRY_FILE)
+    args = parser.parse_args()
+
+    print("🪪 TEAM REGISTRY")
+    print("="*40)
+    registry = build_registry(previous=load_registry(args.output))
+    added = registry.import_mappings(args.mappings)
+    save_registry(registry, args.output)
+
+    aliases = sum(len(team['aliases']) for team in registry.teams.values())
+    print(f"✅ {len(registry)} teams, {aliases} aliases ({added} new from {args.mappings})")
+    print(f"💾 Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
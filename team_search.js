@@ -0,0 +1,127 @@
+// Team autocomplete over the index team_search.py exports
+// Same matching and ranking as TeamSearchIndex.search() in Python
+
+const TEAM_SEARCH_FILE = 'compiled/team_search.json';
+const TEAM_SEARCH_TOKENS = ['cf', 'fc', 'real', 'sport', 'club', 'sc', 'ac', 'uefa', 'st'];
+const TIER_NAME = 0, TIER_WORD = 1, TIER_INSIDE = 2;
+
+// normalizeTeamName() without the filler-token stripping
+function foldTeamName(name) {
+  if (!name) return '';
+  let s = name.toLowerCase();
+  s = s.normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+  s = s.replace(/[^a-z0-9\s]/g, ' ');
+  return s.replace(/\s+/g, ' ').trim();
+}
+
+function stripTeamTokens(folded) {
+  let s = folded;
+  TEAM_SEARCH_TOKENS.forEach(t => s = s.replace(new RegExp('\\b' + t + '\\b', 'g'), ''));
+  return s.replace(/\s+/g, ' ').trim();
+}
+
+// Postings are exported as gaps between ascending team ranks
+function decodePostings(encoded) {
+  const postings = {};
+  for (const [gram, gaps] of Object.entries(encoded)) {
+    let rank = 0;
+    postings[gram] = gaps.map(gap => (rank += gap));
+  }
+  return postings;
+}
+
+function intersectRanks(a, b) {
+  const out = [];
+  let i = 0, j = 0;
+  while (i < a.length && j < b.length) {
+    if (a[i] === b[j]) { out.push(a[i]); i++; j++; }
+    else if (a[i] < b[j]) i++;
+    else j++;
+  }
+  return out;
+}
+
+class TeamSearch {
+  constructor(data) {
+    this.minQuery = data.min_query;
+    this.gramSize = data.gram_size;
+    // Teams come in rank order: most matches played recently first
+    this.teams = data.teams.map(row => Object.fromEntries(data.fields.map((field, i) => [field, row[i]])));
+    this.prefixes = decodePostings(data.prefixes);
+    this.words = decodePostings(data.words);
+    this.grams = decodePostings(data.grams);
+  }
+
+  static async load(file = TEAM_SEARCH_FILE) {
+    const response = await fetch(file);
+    if (!response.ok) return null;
+    return new TeamSearch(await response.json());
+  }
+
+  // The query as typed and with filler tokens stripped, like the names were indexed
+  queryForms(query) {
+    const folded = foldTeamName(query);
+    const forms = [];
+    [folded, stripTeamTokens(folded)].forEach(form => {
+      if (form.length >= this.minQuery && !forms.includes(form)) forms.push(form);
+    });
+    return forms;
+  }
+
+  // [tier, candidate ranks] best tier first; exact for forms of up to gramSize characters
+  tiers(form) {
+    if (form.length <= this.gramSize) {
+      return [[TIER_NAME, this.prefixes[form] || []], [TIER_WORD, this.words[form] || []],
+              [TIER_INSIDE, this.grams[form] || []]];
+    }
+    const postings = [];
+    for (let i = 0; i + this.gramSize <= form.length; i++) {
+      postings.push(this.grams[form.slice(i, i + this.gramSize)] || []);
+    }
+    postings.sort((a, b) => a.length - b.length);
+    let ranks = postings[0];
+    for (let i = 1; i < postings.length && ranks.length; i++) ranks = intersectRanks(ranks, postings[i]);
+    const head = form.slice(0, this.gramSize);
+    return [[TIER_NAME, intersectRanks(ranks, this.prefixes[head] || [])],
+            [TIER_WORD, intersectRanks(ranks, this.words[head] || [])],
+            [TIER_INSIDE, ranks]];
+  }
+
+  matches(rank, form, tier) {
+    const keys = this.teams[rank].keys;
+    if (tier === TIER_NAME) return keys.some(key => key.startsWith(form));
+    if (tier === TIER_WORD) return keys.some(key => (' ' + key).includes(' ' + form));
+    return keys.some(key => key.includes(form));
+  }
+
+  // Teams any of whose names contain the query; names starting with it first, then a word starting
+  // with it, most active first in each. accept(team) can skip teams the page has no data for.
+  search(query, limit = 10, accept = null) {
+    const found = [];
+    const seen = new Set();
+    for (const form of this.queryForms(query)) {
+      const exact = form.length <= this.gramSize;
+      for (const [tier, ranks] of this.tiers(form)) {
+        for (const rank of ranks) {
+          if (seen.has(rank) || !(exact || this.matches(rank, form, tier))) continue;
+          seen.add(rank);
+          const team = this.teams[rank];
+          if (accept && !accept(team)) continue;
+          found.push(team);
+          if (limit !== null && found.length >= limit) return found;
+        }
+      }
+    }
+    return found;
+  }
+
+  // Lowercased names and aliases of every matching team
+  matchingNames(query) {
+    const names = new Set();
+    this.search(query, null).forEach(team => {
+      names.add(team.name.toLowerCase());
+      team.aliases.forEach(alias => names.add(alias.toLowerCase()));
+    });
+    return names;
+  }
+}
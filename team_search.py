@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import argparse
+from collections import defaultdict
+import numpy as np
+
+from match_store import STORE_DIR, load_store, read_manifest, write_json
+from team_matcher import fold_team_name, normalize_team_name
+from team_registry import build_registry, load_registry
+
+SEARCH_FILE = os.path.join(STORE_DIR, 'team_search.json')
+
+# Autocomplete starts at two characters; longer queries go through the trigram postings
+MIN_QUERY = 2
+GRAM_SIZE = 3
+# Teams are ranked by finished matches in this many days before the latest result
+ACTIVE_DAYS = 90
+DEFAULT_LIMIT = 10
+
+# Result tiers: a name starts with the query, a word in it does, or the query is inside a word
+TIER_NAME, TIER_WORD, TIER_INSIDE = range(3)
+
+
+def search_keys(names):
+    """Folded and normalized forms of every name a team goes by, deduplicated and non-empty"""
+    keys = {}
+    for name in names:
+        for key in (fold_team_name(name), normalize_team_name(name)):
+            if key:
+                keys[key] = None
+    return list(keys)
+
+
+def query_forms(query):
+    """What a typed query is matched as: folded as typed, and with filler tokens ('fc', 'real') stripped"""
+    return search_keys([query])
+
+
+def key_grams(key):
+    """Every substring of a key that is MIN_QUERY..GRAM_SIZE characters long"""
+    return {key[i:i + size] for size in range(MIN_QUERY, GRAM_SIZE + 1) for i in range(len(key) - size + 1)}
+
+
+def key_heads(key, words=False):
+    """The first MIN_QUERY..GRAM_SIZE characters of a key, or of every word in it"""
+    starts = [0] + [i + 1 for i, char in enumerate(key) if char == ' '] if words else [0]
+    return {key[start:start + size] for start in starts for size in range(MIN_QUERY, GRAM_SIZE + 1)
+            if start + size <= len(key)}
+
+
+def team_activity(store, active_days=ACTIVE_DAYS):
+    """{team_id: (finished matches in the last active_days, last match day)} over every store row"""
+    finished = store.finished_mask()
+    days = store['date'].astype(np.int64)
+    latest = days[finished].max() if finished.any() else (days.max() if len(days) else 0)
+    recent = finished & (days > latest - active_days)
+
+    counts = defaultdict(int)
+    last = {}
+    for side in ('home', 'away'):
+        ids, n = np.unique(store[f'{side}_id'][recent], return_counts=True)
+        for team_id, matches in zip(ids.tolist(), n.tolist()):
+            counts[team_id] += matches
+        for team_id, day in zip(store[f'{side}_id'].tolist(), days.tolist()):
+            last[team_id] = max(last.get(team_id, day), day)
+    return {team_id: (counts[team_id], day) for team_id, day in last.items()}
+
+
+class TeamSearchIndex:
+    """Autocomplete over every team name and alias: postings of team ranks, most active team first
+
+    Postings hold ranks in ascending order for every 2-3 character name start (prefixes), word start
+    (words) and substring (grams), so a short query reads each result tier straight off them, best first.
+    Longer queries intersect their trigrams' postings (and their head's) and check the candidates' names.
+    """
+
+    POSTINGS = ('prefixes', 'words', 'grams')
+
+    def __init__(self, teams, postings=None):
+        # teams: [{'id', 'name', 'aliases', 'leagues', 'country', 'keys'}] in rank order
+        self.teams = teams
+        self.by_id = {team['id']: rank for rank, team in enumerate(teams)}
+        if postings is None:
+            postings = {kind: defaultdict(list) for kind in self.POSTINGS}
+            for rank, team in enumerate(teams):
+                heads, words, grams = set(), set(), set()
+                for key in team['keys']:
+                    heads |= key_heads(key)
+                    words |= key_heads(key, words=True)
+                    grams |= key_grams(key)
+                for kind, found in zip(self.POSTINGS, (heads, words, grams)):
+                    for gram in found:
+                        postings[kind][gram].append(rank)
+        self.prefixes, self.words, self.grams = (dict(postings[kind]) for kind in self.POSTINGS)
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.teams)
+
+    def array(self, kind, gram):
+        """Postings as a cached int32 array, for intersecting"""
+        ranks = self._arrays.get((kind, gram))
+        if ranks is None:
+            ranks = self._arrays[kind, gram] = np.asarray(getattr(self, kind).get(gram, ()), dtype=np.int32)
+        return ranks
+
+    def tiers(self, form):
+        """(tier, ranks that may match at that tier) best tier first; exact for forms of up to GRAM_SIZE"""
+        if len(form) <= GRAM_SIZE:
+            for tier, kind in zip((TIER_NAME, TIER_WORD, TIER_INSIDE), self.POSTINGS):
+                yield tier, getattr(self, kind).get(form, ())
+            return
+        # Teams holding every trigram of the form, rarest trigram first
+        postings = sorted((self.array('grams', form[i:i + GRAM_SIZE]) for i in range(len(form) - GRAM_SIZE + 1)),
+                          key=len)
+        ranks = postings[0]
+        for other in postings[1:]:
+            if not len(ranks):
+                break
+            ranks = np.intersect1d(ranks, other, assume_unique=True)
+        head = form[:GRAM_SIZE]
+        yield TIER_NAME, np.intersect1d(ranks, self.array('prefixes', head), assume_unique=True).tolist()
+        yield TIER_WORD, np.intersect1d(ranks, self.array('words', head), assume_unique=True).tolist()
+        yield TIER_INSIDE, ranks.tolist()
+
+    def matches(self, rank, form, tier):
+        keys = self.teams[rank]['keys']
+        if tier == TIER_NAME:
+            return any(key.startswith(form) for key in keys)
+        if tier == TIER_WORD:
+            return any(f' {form}' in f' {key}' for key in keys)
+        return any(form in key for key in keys)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Teams any of whose names contain the query (accents, punctuation and 'FC'-style tokens ignored),
+        names starting with it first, then names with a word starting with it; most active first in each"""
+        found, seen = [], set()
+        # Matches on the query as typed come before matches on its stripped form
+        for form in query_forms(query):
+            if len(form) < MIN_QUERY:
+                continue
+            exact = len(form) <= GRAM_SIZE
+            for tier, ranks in self.tiers(form):
+                for rank in ranks:
+                    if rank in seen or not (exact or self.matches(rank, form, tier)):
+                        continue
+                    seen.add(rank)
+                    found.append(self.teams[rank])
+                    if limit is not None and len(found) >= limit:
+                        return found
+        return found
+
+    def to_json(self, data_version=None):
+        """Compact export: team rows in rank order and delta-encoded postings"""
+        data = {
+            'version': 1,
+            'data_version': data_version,
+            'min_query': MIN_QUERY,
+            'gram_size': GRAM_SIZE,
+            'fields': ['id', 'name', 'aliases', 'leagues', 'country', 'keys'],
+            'teams': [[team['id'], team['name'], team['aliases'], team['leagues'], team['country'], team['keys']]
+                      for team in self.teams],
+        }
+        for kind in self.POSTINGS:
+            postings = getattr(self, kind)
+            data[kind] = {gram: np.diff(postings[gram], prepend=0).tolist() for gram in sorted(postings)}
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        fields = data['fields']
+        teams = [dict(zip(fields, row)) for row in data['teams']]
+        return cls(teams, {kind: {gram: np.cumsum(gaps).tolist() for gram, gaps in data[kind].items()}
+                           for kind in cls.POSTINGS})
+
+
+def build_search_index(store=None, registry=None, active_days=ACTIVE_DAYS):
+    """Index every registry team (canonical names and aliases), ranked by recent matches played"""
+    store = store if store is not None else load_store()
+    registry = registry if registry is not None else (load_registry() or build_registry(store))
+    activity = team_activity(store, active_days)
+
+    teams = []
+    for team_id, team in registry.teams.items():
+        aliases = list(team['aliases'])
+        teams.append({
+            'id': team_id,
+            'name': team['name'],
+            'aliases': aliases,
+            'leagues': team['leagues'],
+            'country': team['country'],
+            'keys': search_keys([team['name']] + aliases),
+        })
+
+    def rank(team):
+        recent, last_day = activity.get(team['id'], (0, 0))
+        return -recent, -last_day, team['name']
+
+    teams.sort(key=rank)
+    return TeamSearchIndex(teams)
+
+
+def load_search_index(path=SEARCH_FILE):
+    """Load the exported index, or None if it has not been built"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return TeamSearchIndex.from_json(json.load(f))
+
+
+def write_search_index(store=None, path=SEARCH_FILE, store_dir=STORE_DIR, active_days=ACTIVE_DAYS):
+    manifest = read_manifest(store_dir)
+    index = build_search_index(store if store is not None else load_store(store_dir), active_days=active_days)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write_json(path, index.to_json(manifest.get('data_version') if manifest else None))
+    return index
+
+
+def main():
+    """Build the team autocomplete index, or query it"""
+    parser = argparse.ArgumentParser(description='Precomputed team search index for the autocomplete boxes')
+    parser.add_argument('query', nargs='?', help='search the saved index instead of building it')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--output', default=SEARCH_FILE)
+    parser.add_argument('--active-days', type=int, default=ACTIVE_DAYS,
+                        help='teams are ranked by matches played in this many days')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    if args.query is not None:
+        index = load_search_index(args.output)
+        if index is None:
+            parser.error(f"{args.output} not found; build it first")
+        started = time.perf_counter()
+        results = index.search(args.query, args.limit)
+        elapsed = time.perf_counter() - started
+        for team in results:
+            print(f"  {team['name']:<32} #{team['id']:<8} {team['country']}")
+        print(f"🔎 {len(results)} teams in {elapsed * 1000:.3f} ms")
+        return
+
+    print("🔎 TEAM SEARCH INDEX")
+    print("="*40)
+    index = write_search_index(path=args.output, store_dir=args.store_dir, active_days=args.active_days)
+    print(f"✅ {len(index)} teams, {len(index.grams)} grams")
+    print(f"💾 Saved to {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import io
+import sys
+import json
+import math
+import contextlib
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from match_store import update_store  # noqa: E402
+from synthetic_data import generate_dataset  # noqa: E402
+
+
+def quietly(fn, *args, **kwargs):
+    """Call one of the emoji-printing pipeline functions without its progress output"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def js_round(value):
+    """Math.round: nearest integer, exact halves up"""
+    return math.floor(value) + (value - math.floor(value) >= 0.5)
+
+
+def js_rate(hits, total):
+    """Math.round((hits / total) * 100) as find_bets.js computes successRate, 0 for no matches"""
+    return js_round(hits / total * 100) if total else 0
+
+
+def js_hits(totals, threshold, over_under):
+    """Success count of analyzeTeamMatches: over is total > threshold, under is total <= threshold"""
+    return int(sum(total > threshold if over_under == 'over' else total <= threshold for total in totals))
+
+
+def last_before(store, rows, before_date, n=None):
+    """Store positions among a mask of finished rows dated strictly before a date, last n in date order"""
+    positions = np.flatnonzero(rows & store.finished_mask() & (store['date'] < np.datetime64(before_date, 'D')))
+    positions = positions[np.argsort(store['date'][positions], kind='stable')]
+    return positions if n is None else positions[max(len(positions) - n, 0):]
+
+
+def meeting_rows(store, team_a, team_b):
+    """Rows where two teams met, at either venue"""
+    return (((store['home_id'] == team_a) & (store['away_id'] == team_b))
+            | ((store['home_id'] == team_b) & (store['away_id'] == team_a)))
+
+
+def reference_fixtures(store, day, last_matches, leagues=None):
+    """(fixture, home positions, away positions) the way analyzeFixture picks them: upcoming fixtures of the
+    day, each team's last N matches before it in the selected leagues, none with under min(3, N) on a side"""
+    in_leagues = store.league_mask(leagues)
+    fixtures = np.flatnonzero(store.upcoming_mask() & (store['date'] == np.datetime64(day, 'D')) & in_leagues)
+    for fixture in fixtures.tolist():
+        home, away = (last_before(store, in_leagues & ((store['home_id'] == team) | (store['away_id'] == team)),
+                                  day, last_matches)
+                      for team in (store['home_id'][fixture], store['away_id'][fixture]))
+        if min(len(home), len(away)) >= min(3, last_matches):
+            yield fixture, home, away
+
+
+def match_record(match_id, league_id, date, home, away, score=None, stats=None, referee='', time='15:00'):
+    """An API-Football style record; score=(home, away) makes it finished, stats={type: (home, away)}"""
+    return {
+        'match_id': str(match_id), 'league_id': str(league_id), 'league_name': f'League {league_id}',
+        'country_name': 'Testland', 'match_date': date, 'match_time': time,
+        'match_status': 'Finished' if score is not None else '',
+        'match_hometeam_id': str(home), 'match_hometeam_name': f'Team {home}',
+        'match_awayteam_id': str(away), 'match_awayteam_name': f'Team {away}',
+        'match_hometeam_score': str(score[0]) if score is not None else '',
+        'match_awayteam_score': str(score[1]) if score is not None else '',
+        'match_hometeam_halftime_score': '0' if score is not None else '',
+        'match_awayteam_halftime_score': '0' if score is not None else '',
+        'match_referee': referee, 'match_round': '1', 'match_stadium': '', 'stage_name': 'Current',
+        'league_year': '', 'statistics': [{'type': t, 'home': str(h), 'away': str(a)}
+                                          for t, (h, a) in (stats or {}).items()],
+        'statistics_1half': [],
+    }
+
+
+def write_league(leagues_dir, league_id, season, records):
+    os.makedirs(leagues_dir, exist_ok=True)
+    path = os.path.join(leagues_dir, f'league_{league_id}_{season}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    return path
+
+
+@pytest.fixture(scope='session')
+def synthetic_dirs(tmp_path_factory):
+    """(leagues_dir, store_dir) of a compiled 16-league, 3-season synthetic dataset with cups"""
+    root = tmp_path_factory.mktemp('synthetic')
+    leagues_dir = str(root / 'leagues')
+    store_dir = str(root / 'compiled')
+    quietly(generate_dataset, leagues_dir, leagues=16, seasons=3, seed=7)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    return leagues_dir, store_dir
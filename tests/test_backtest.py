@@ -0,0 +1,61 @@
+import numpy as np
+
+from conftest import match_record, quietly, write_league
+from backtest import rate_histograms
+from fixture_scanner import DIRECTIONS
+from match_store import COLUMNS, STAT_BITS, load_store, match_row, update_store
+from team_index import TeamIndex
+
+FULL = {'Shots Total': (12, 10), 'Corners': (5, 5), 'Yellow Cards': (2, 1)}
+# A league that only reports corners: shots and cards are left out of the block
+PARTIAL = {'Corners': (4, 4)}
+
+
+def partial_stats_store(tmp_path):
+    """Teams 1 and 2 with shots recorded on every other match, then two finished fixtures: 1 v 2 with full
+    statistics and 3 v 4 with corners only"""
+    records = []
+    for day in range(1, 7):
+        stats = FULL if day % 2 else PARTIAL
+        records.append(match_record(day, 9, f'2025-01-0{day}', 1, 3, (1, 0), stats))
+        records.append(match_record(10 + day, 9, f'2025-01-0{day}', 2, 4, (0, 1), stats))
+    records.append(match_record(30, 9, '2025-01-10', 1, 2, (2, 2), {'Shots Total': (15, 10), 'Corners': (6, 2)}))
+    records.append(match_record(31, 9, '2025-01-11', 3, 4, (0, 0), PARTIAL))
+    leagues_dir, store_dir = str(tmp_path / 'leagues'), str(tmp_path / 'store')
+    write_league(leagues_dir, 9, 2025, records)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    return load_store(store_dir)
+
+
+def test_stats_mask_follows_the_types_in_the_block(tmp_path):
+    store = partial_stats_store(tmp_path)
+    partial = store['match_id'] % 2 == 0
+    partial[store['match_id'] >= 30] = [False, True]
+    assert (store.stats_mask('shots') == ~partial).all()
+    assert (store.stats_mask('cards') == ~partial & (store['match_id'] != 30)).all()
+    assert store.stats_mask('corners').all() and store.stats_mask('goals').all()
+
+
+def test_blank_and_zero_filled_types_are_not_reported():
+    stats = {'Corners': (0, 0), 'Yellow Cards': (0, 0), 'Fouls': (9, 7)}
+    record = match_record(1, 9, '2025-01-01', 1, 2, (1, 0), stats)
+    record['statistics'].append({'type': 'Shots Total', 'home': '', 'away': ' '})
+    stat_types = match_row(record)[[name for name, _ in COLUMNS].index('stat_types')]
+    # A match without cards happens, one without corners does not: those leagues fill in 0 - 0 when uncounted
+    assert stat_types == STAT_BITS['yellow'] | STAT_BITS['fouls']
+
+
+def test_missing_stat_types_are_neither_scored_nor_counted(tmp_path):
+    store = partial_stats_store(tmp_path)
+    fixtures = np.flatnonzero(store['match_id'] >= 30)
+    hist = rate_histograms(store, TeamIndex(store), fixtures, [3], {'shots': [18.5]})
+    over, under = DIRECTIONS.index('over'), DIRECTIONS.index('under')
+    # Only 1 v 2 is scored, over both teams' last 3 matches with shots (all 22): a 100% over bet that won
+    assert hist[0, 0, over, 0].tolist() == np.eye(101, dtype=int)[100].tolist()
+    assert hist[0, 0, over, 1, 100] == 1
+    assert hist[0, 0, under, 0, 0] == 1 and hist[0, 0, under, 1].sum() == 0
+
+    # Counting missing types as 0: both fixtures scored, the windows reach back over the zeros
+    hist = rate_histograms(store, TeamIndex(store), fixtures, [3], {'shots': [18.5]}, require_stats=False)
+    assert hist[0, 0, over, 0].sum() == 2
+    assert hist[0, 0, over, 0, 33] == 2
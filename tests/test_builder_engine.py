@@ -0,0 +1,115 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import js_rate, last_before, meeting_rows, reference_fixtures
+from builder_engine import THRESHOLDS, BuilderEngine, leg_text
+from match_store import load_store
+
+
+@pytest.fixture(scope='module')
+def engine(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return BuilderEngine(load_store(store_dir))
+
+
+def busy_day(store):
+    dates = pd.Series(store['date'][store.upcoming_mask()])
+    return str(dates.value_counts().idxmax().date())
+
+
+def all_met(store, positions, legs):
+    """Matches meeting every leg: over is total > threshold, under is total <= threshold"""
+    met = np.ones(len(positions), dtype=bool)
+    for category, threshold, direction in legs:
+        totals = store.totals(category)[positions]
+        met &= totals > threshold if direction == 'over' else totals <= threshold
+    return met
+
+
+@pytest.mark.parametrize('legs,last_matches,leagues,min_rate', [
+    ([('goals', 2.5, 'over'), ('corners', 9.5, 'under')], 5, None, 0),
+    # 23/40 shows as 57%, so those fixtures stay out at 58
+    ([('cards', 3.5, 'over')], 20, None, 58),
+    ([('goals', 1.5, 'over'), ('shots', 24.5, 'over'), ('fouls', 22.5, 'under')], 10, None, 0),
+    ([('goals', 0.5, 'over'), ('cards', 2.5, 'over')], 2, 'first half', 50),
+])
+def test_evaluate_matches_a_scan_of_the_windows(engine, legs, last_matches, leagues, min_rate):
+    store = engine.store
+    day = busy_day(store)
+    if leagues is not None:
+        leagues = np.unique(store['league_id'])[:8].tolist()
+    table = engine.evaluate(legs, day, last_matches=last_matches, leagues=leagues, min_success_rate=min_rate,
+                            h2h_matches=3)
+
+    expected = set()
+    for fixture, home, away in reference_fixtures(store, day, last_matches, leagues):
+        home_hits, away_hits = int(all_met(store, home, legs).sum()), int(all_met(store, away, legs).sum())
+        combined = js_rate(home_hits + away_hits, len(home) + len(away))
+        if combined < min_rate:
+            continue
+        # Meetings in any competition, either venue
+        meetings = last_before(store, meeting_rows(store, store['home_id'][fixture], store['away_id'][fixture]), day, 3)
+        h2h_hits = int(all_met(store, meetings, legs).sum())
+        expected.add((int(store['match_id'][fixture]), home_hits, len(home), away_hits, len(away),
+                      js_rate(home_hits, len(home)), js_rate(away_hits, len(away)), combined,
+                      h2h_hits, len(meetings), js_rate(h2h_hits, len(meetings))))
+    columns = ['match_id', 'home_hits', 'home_matches', 'away_hits', 'away_matches', 'home_rate', 'away_rate',
+               'combined_rate', 'h2h_hits', 'h2h_matches', 'h2h_rate']
+    assert set(map(tuple, table[columns].astype(int).values.tolist())) == expected
+    assert expected
+
+
+@pytest.mark.parametrize('last_matches,min_rate', [(5, 70), (20, 58)])
+def test_search_matches_every_combination(engine, last_matches, min_rate):
+    store = engine.store
+    day = busy_day(store)
+    categories = ('goals', 'corners', 'cards')
+    legs = [(category, threshold, direction) for category in THRESHOLDS if category in categories
+            for threshold in THRESHOLDS[category] for direction in ('over', 'under')]
+    table = engine.search(day, last_matches=last_matches, min_success_rate=min_rate, categories=categories, top=None)
+
+    expected = set()
+    for fixture, home, away in reference_fixtures(store, day, last_matches):
+        # Per leg, the window's matches meeting it as bits, so a combination is an AND plus a bit count
+        bits = {}
+        for leg in legs:
+            bits[leg] = tuple(int(sum(1 << j for j, met in enumerate(all_met(store, side, [leg])) if met))
+                              for side in (home, away))
+        for size in (2, 3):
+            for combination in itertools.combinations(legs, size):
+                if len({leg[0] for leg in combination}) < size:
+                    continue
+                hits = [bin(np.bitwise_and.reduce([bits[leg][side] for leg in combination])).count('1')
+                        for side in (0, 1)]
+                rate = js_rate(sum(hits), len(home) + len(away))
+                if rate >= min_rate:
+                    expected.add((int(store['match_id'][fixture]), ', '.join(map(leg_text, combination)),
+                                  hits[0], hits[1], rate))
+    columns = ['match_id', 'criteria', 'home_hits', 'away_hits', 'combined_rate']
+    assert set(map(tuple, table[columns].values.tolist())) == expected
+    assert expected
+
+
+def test_search_keeps_each_fixtures_best_builders(engine):
+    day = busy_day(engine.store)
+    everything = engine.search(day, min_success_rate=60, h2h_matches=3, top=None)
+    assert len(everything) > 5 * everything['match_id'].nunique()
+
+    best = engine.search(day, min_success_rate=60, h2h_matches=3, top=5)
+    expected = everything.sort_values(['match_id', 'combined_rate', 'legs'], ascending=[True, False, False],
+                                      kind='stable').groupby('match_id', sort=False).head(5)
+    columns = ['match_id', 'criteria', 'combined_rate', 'h2h_hits', 'h2h_rate']
+    assert sorted(map(tuple, best[columns].values)) == sorted(map(tuple, expected[columns].values))
+    assert best['match_id'].value_counts().max() <= 5
+
+
+def test_search_min_legs(engine):
+    day = busy_day(engine.store)
+    everything = engine.search(day, min_success_rate=60, top=None)
+    three = engine.search(day, min_success_rate=60, top=None, min_legs=3)
+    pd.testing.assert_frame_equal(three, everything[everything['legs'] == 3].reset_index(drop=True))
+    with pytest.raises(ValueError):
+        engine.search(day, min_legs=3, max_legs=2)
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from conftest import quietly
+from filter_csv_files import DATE_FORMATS, filter_csv_files, filter_file
+from seasons import current_season, season_start
+
+
+@pytest.mark.parametrize('today,season', [
+    (date(2025, 8, 19), 2024), (date(2025, 8, 20), 2025), (date(2025, 12, 31), 2025), (date(2026, 1, 1), 2025),
+    (date(2026, 5, 31), 2025), (date(2026, 8, 20), 2026),
+])
+def test_current_season_turns_over_on_the_season_start(today, season):
+    assert current_season(today) == season
+    assert season_start(season) <= datetime(today.year, today.month, today.day) < season_start(season + 1)
+
+
+def parse_one(value):
+    """The first DATE_FORMATS format that reads a value, or None"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+DATES = ['19082025', '20082025', '19/08/2025', '21/08/2025', '2025-08-20', '2025-08-19', '08/25/2025', '', 'TBC',
+         '31/12/2025', '2026-01-03', '01012024']
+
+
+def test_rows_on_or_after_the_cutoff_are_kept_unchanged(tmp_path):
+    rows = pd.DataFrame({'Div': ['E0'] * len(DATES), 'Date': DATES,
+                         'HomeTeam': [f'Team {i}' for i in range(len(DATES))],
+                         'FTHG': ['007', '', '1', '2', '0', '3', '1', '2', '1', '0', '4', '1']})
+    source, output = tmp_path / 'E0.csv', tmp_path / 'E0_out.csv'
+    rows.to_csv(source, index=False)
+
+    stats = filter_file(str(source), str(output), season_start(2025), chunksize=5)
+    cutoff = season_start(2025)
+    expected = rows[[parse_one(value) is not None and parse_one(value) >= cutoff for value in DATES]]
+    kept = pd.read_csv(output, dtype=str, keep_default_na=False)
+    assert kept.values.tolist() == expected.values.tolist()
+    assert kept['Date'].tolist() == ['20082025', '21/08/2025', '2025-08-20', '08/25/2025', '31/12/2025', '2026-01-03']
+    assert stats == {'file': 'E0.csv', 'rows': len(DATES), 'dated': 10, 'kept': 6, 'error': None}
+
+
+def test_every_file_is_filtered_to_the_season(tmp_path):
+    input_dir, output_dir = tmp_path / 'other', tmp_path / 'out'
+    input_dir.mkdir()
+    pd.DataFrame({'Date': ['19/08/2025', '20/08/2025'], 'Home': ['A', 'B']}).to_csv(input_dir / 'ARG.csv', index=False)
+    pd.DataFrame({'Day': ['20/08/2025'], 'Home': ['C']}).to_csv(input_dir / 'BRA.csv', index=False)
+    pd.DataFrame({'Date': ['soon'], 'Home': ['D']}).to_csv(input_dir / 'CHN.csv', index=False)
+
+    quietly(filter_csv_files, str(input_dir), str(output_dir), workers=1, season=2025)
+    # Files without a Date column or any readable date are skipped rather than written empty
+    assert sorted(path.name for path in output_dir.iterdir()) == ['ARG2025.csv']
+    assert pd.read_csv(output_dir / 'ARG2025.csv')['Home'].tolist() == ['B']
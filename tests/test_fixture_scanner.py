@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import js_hits, js_rate, reference_fixtures
+from fixture_scanner import scan_fixtures
+from match_store import load_store
+
+
+@pytest.fixture(scope='module')
+def store(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return load_store(store_dir)
+
+
+@pytest.mark.parametrize('last_matches,leagues,min_rate', [(5, None, 0), (20, None, 58), (2, 'some', 50)])
+def test_scan_matches_analyze_fixture(store, last_matches, leagues, min_rate):
+    dates = pd.Series(store['date'][store.upcoming_mask()])
+    day = str(dates.value_counts().idxmax().date())
+    if leagues is not None:
+        leagues = np.unique(store['league_id'])[::2].tolist()
+    thresholds = {'goals': [1, 2.5], 'cards': [3.5, 5.5], 'shots_2h': [10.5]}
+    table = scan_fixtures(store, day, last_matches=last_matches, leagues=leagues, thresholds=thresholds,
+                          min_success_rate=min_rate)
+
+    expected = set()
+    for fixture, home, away in reference_fixtures(store, day, last_matches, leagues):
+        for category, lines in thresholds.items():
+            totals = store.totals(category)
+            for threshold in lines:
+                for direction in ('over', 'under'):
+                    home_hits = js_hits(totals[home], threshold, direction)
+                    away_hits = js_hits(totals[away], threshold, direction)
+                    combined = js_rate(home_hits + away_hits, len(home) + len(away))
+                    if combined >= min_rate:
+                        expected.add((int(store['match_id'][fixture]), category, threshold, direction,
+                                      home_hits, len(home), away_hits, len(away),
+                                      js_rate(home_hits, len(home)), js_rate(away_hits, len(away)), combined))
+    columns = ['match_id', 'category', 'threshold', 'direction', 'home_hits', 'home_matches', 'away_hits',
+               'away_matches', 'home_rate', 'away_rate', 'combined_rate']
+    assert set(map(tuple, table[columns].values.tolist())) == expected
+    assert expected
@@ -0,0 +1,83 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import js_hits, js_rate, last_before, meeting_rows, reference_fixtures
+from fixture_scanner import scan_fixtures
+from head_to_head import PairIndex, main
+from match_store import CATEGORIES, load_store
+
+
+@pytest.fixture(scope='module')
+def pairs(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return PairIndex(load_store(store_dir))
+
+
+def test_hit_rate_matches_a_scan_of_the_meetings(pairs):
+    store = pairs.store
+    rng = np.random.default_rng(3)
+    for _ in range(300):
+        row = int(rng.integers(len(store)))
+        home, away = int(store['home_id'][row]), int(store['away_id'][row])
+        if rng.random() < 0.2:
+            # Teams that may never have met
+            away = int(store['away_id'][int(rng.integers(len(store)))])
+        before = str(store['date'][row] + np.timedelta64(int(rng.integers(-3, 4)), 'D'))
+        n = int(rng.choice([1, 3, 5, 10]))
+        category = str(rng.choice(list(CATEGORIES)))
+        threshold = float(rng.choice([0.5, 1, 2, 2.5, 4, 4.5, 10.5]))
+        over_under = str(rng.choice(['over', 'under']))
+
+        expected = last_before(store, meeting_rows(store, home, away), before, n)
+        # Either order is the same pair
+        assert pairs.last_n(away, home, n, before).tolist() == expected.tolist()
+        hits = js_hits(store.totals(category)[expected], threshold, over_under)
+        assert pairs.hit_rate(home, away, n, before, category, threshold, over_under) == \
+            (hits, len(expected), js_rate(hits, len(expected)))
+
+
+def test_restricted_to_leagues(pairs):
+    store = pairs.store
+    leagues = np.unique(store['league_id'])[::3].tolist()
+    restricted = PairIndex(store, leagues)
+    found = 0
+    for row in range(0, len(store), 97):
+        home, away, before = store['home_id'][row], store['away_id'][row], store['date'][row]
+        expected = last_before(store, meeting_rows(store, home, away) & store.league_mask(leagues), before, 5)
+        assert restricted.last_n(home, away, 5, before).tolist() == expected.tolist()
+        found += len(expected)
+    assert found
+
+
+def test_scanner_h2h_columns_match_a_scan(pairs):
+    store = pairs.store
+    dates = pd.Series(store['date'][store.upcoming_mask()])
+    day = str(dates.value_counts().idxmax().date())
+    thresholds = {'goals': [1.5, 2.5], 'cards': [3.5], 'corners_ht': [4.5]}
+    table = scan_fixtures(store, day, last_matches=5, thresholds=thresholds, h2h_matches=3, h2h_index=pairs)
+
+    expected = set()
+    for fixture, _, _ in reference_fixtures(store, day, 5):
+        meetings = last_before(store, meeting_rows(store, store['home_id'][fixture], store['away_id'][fixture]), day, 3)
+        for category, lines in thresholds.items():
+            totals = store.totals(category)[meetings]
+            for threshold in lines:
+                for direction in ('over', 'under'):
+                    hits = js_hits(totals, threshold, direction)
+                    expected.add((int(store['match_id'][fixture]), category, threshold, direction,
+                                  hits, len(meetings), js_rate(hits, len(meetings))))
+    columns = ['match_id', 'category', 'threshold', 'direction', 'h2h_hits', 'h2h_matches', 'h2h_rate']
+    assert set(map(tuple, table[columns].values.tolist())) == expected
+    assert any(row[5] for row in expected)
+
+
+@pytest.mark.parametrize('last', ['0', '-3'])
+def test_cli_rejects_fewer_than_one_meeting(monkeypatch, capsys, last):
+    monkeypatch.setattr(sys, 'argv', ['head_to_head.py', '1', '2', '--last', last])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert '--last must be at least 1' in capsys.readouterr().err
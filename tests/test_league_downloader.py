@@ -0,0 +1,114 @@
+import json
+import asyncio
+from datetime import date
+
+import pytest
+
+from conftest import match_record, write_league
+from league_downloader import DownloadError, LeagueDownloader, default_season, sync_leagues, sync_window
+
+
+class StubApi:
+    """get_events over some leagues' matches, failing the first `failures[league_id]` requests with a 503"""
+
+    def __init__(self, matches, failures=None):
+        self.matches = matches
+        self.failures = dict(failures or {})
+        self.requests = []
+
+    async def handle(self, request):
+        from aiohttp import web
+        params = dict(request.query)
+        self.requests.append(params)
+        league_id = int(params['league_id'])
+        if self.failures.get(league_id):
+            self.failures[league_id] -= 1
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        found = [m for m in self.matches.get(league_id, []) if params['from'] <= m['match_date'] <= params['to']]
+        return web.json_response(found or {'error': 404, 'message': 'No event found (please check your plan)!!'})
+
+    def windows(self, league_id):
+        return sorted((r['from'], r['to']) for r in self.requests if int(r['league_id']) == league_id)
+
+
+def run_with_stub(api, work):
+    """Run work(base_url) against a local server answering like the API"""
+    web = pytest.importorskip('aiohttp.web')
+    from aiohttp.test_utils import TestServer
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/', api.handle)
+        async with TestServer(app) as server:
+            return await work(str(server.make_url('/')))
+    return asyncio.run(main())
+
+
+def fetch_events(api, league_id, date_from, date_to, retries=2):
+    async def work(base_url):
+        async with LeagueDownloader('key', base_url, retries=retries, backoff=0) as client:
+            return await client.get_events(league_id, date_from, date_to)
+    return run_with_stub(api, work)
+
+
+def test_default_season_follows_the_files_on_disk(tmp_path):
+    leagues_dir = str(tmp_path)
+    write_league(leagues_dir, 10, 2024, [])
+    write_league(leagues_dir, 10, 2025, [])
+    write_league(leagues_dir, 20, 2023, [])
+    # January belongs to the season that started the previous August
+    assert default_season(10, leagues_dir, today=date(2026, 1, 15)) == 2025
+    assert default_season(20, leagues_dir, today=date(2026, 1, 15)) == 2023
+    assert default_season(30, leagues_dir, today=date(2026, 1, 15)) == 2025
+    assert default_season(30, leagues_dir, today=date(2026, 9, 1)) == 2026
+
+
+def test_unavailable_responses_are_retried():
+    api = StubApi({1: [match_record(1, 1, '2025-03-01', 1, 2, (1, 0))]}, failures={1: 2})
+    assert [m['match_id'] for m in fetch_events(api, 1, date(2025, 3, 1), date(2025, 3, 31))] == ['1']
+    assert len(api.requests) == 3
+
+    api = StubApi({}, failures={1: 3})
+    with pytest.raises(DownloadError, match='HTTP 503'):
+        fetch_events(api, 1, date(2025, 3, 1), date(2025, 3, 31))
+    assert len(api.requests) == 3
+
+
+def test_no_events_answer_is_an_empty_list():
+    api = StubApi({1: [match_record(1, 1, '2025-03-01', 1, 2, (1, 0))]})
+    assert fetch_events(api, 1, date(2025, 4, 1), date(2025, 4, 30)) == []
+    assert fetch_events(api, 2, date(2025, 3, 1), date(2025, 3, 31)) == []
+
+
+def test_sync_requests_the_changed_window_and_merges_it(tmp_path):
+    leagues_dir, state_path = str(tmp_path / 'leagues'), str(tmp_path / 'state.json')
+    today = date(2025, 3, 20)
+    old = match_record(1, 7, '2025-01-10', 1, 2, (2, 0))
+    unsettled = match_record(2, 7, '2025-03-12', 3, 4)
+    write_league(leagues_dir, 7, 2025, [old, unsettled])
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({'7_2025': {'synced_at': '2025-03-18T09:00:00'}}, f)
+
+    played = match_record(2, 7, '2025-03-12', 3, 4, (1, 1))
+    new = match_record(3, 7, '2025-03-25', 1, 3)
+    api = StubApi({7: [old, played, new]})
+
+    async def work(base_url):
+        return await sync_leagues([(7, 2025)], 'key', base_url, leagues_dir, state_path, today=today)
+    summaries, failures = run_with_stub(api, work)
+
+    # From the unsettled match (less a few days for late corrections) to the fixture lookahead, in 31-day chunks
+    start, end = sync_window([old, unsettled], 2025, today, date(2025, 3, 18))
+    assert (start, end) == (date(2025, 3, 9), date(2025, 4, 10))
+    assert api.windows(7) == [('2025-03-09', '2025-04-08'), ('2025-04-09', '2025-04-10')]
+    assert not failures
+    assert summaries == [{'key': '7_2025', 'from': '2025-03-09', 'to': '2025-04-10', 'fetched': 2, 'matches': 3,
+                          'added': 1, 'changed': True}]
+    with open(tmp_path / 'leagues' / 'league_7_2025.json', encoding='utf-8') as f:
+        assert json.load(f) == [old, played, new]
+    with open(state_path, encoding='utf-8') as f:
+        assert json.load(f)['7_2025']['from'] == '2025-03-09'
+
+    # Nothing new: the file is left alone
+    summaries, _ = run_with_stub(api, work)
+    assert summaries[0]['changed'] is False
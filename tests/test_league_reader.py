@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+from conftest import match_record
+from league_reader import filter_matches, iter_matches, iter_records, write_array
+from match_store import match_row
+
+
+def league_file(tmp_path, indent=2):
+    """A small league file like the API dumps: nested statistics, unicode names, a long goalscorer list"""
+    records = [match_record(i, 7, f'2025-03-{i + 1:02d}', 1, 2, (i % 3, 1) if i < 5 else None,
+                            {'Corners': (i, 2), 'Shots Total': (10 + i, 8)}) for i in range(8)]
+    records[1]['match_hometeam_name'] = 'Atlético "Madrid" ]['
+    records[2]['goalscorer'] = [{'time': str(m), 'home_scorer': 'Żółć' * 50} for m in range(90)]
+    path = tmp_path / 'league_7_2025.json'
+    path.write_text(json.dumps(records, indent=indent, ensure_ascii=False), encoding='utf-8')
+    return str(path), records
+
+
+@pytest.mark.parametrize('indent,chunk_chars', [(2, 1 << 16), (None, 7), (4, 1)])
+def test_streaming_matches_json_load(tmp_path, indent, chunk_chars):
+    path, records = league_file(tmp_path, indent)
+    with open(path, encoding='utf-8') as f:
+        loaded = json.load(f)
+    assert loaded == records
+    assert list(iter_matches(path, chunk_chars=chunk_chars)) == loaded
+    fields = ('match_id', 'match_hometeam_name', 'statistics', 'not_a_field')
+    assert list(iter_matches(path, fields, chunk_chars)) == [{field: record[field] for field in fields[:3]}
+                                                              for record in loaded]
+    # Store rows come out the same as from the records of the old whole-file json.load
+    assert [match_row(record) for record in iter_matches(path, chunk_chars=chunk_chars)] == \
+        [match_row(record) for record in loaded]
+
+
+def test_filters_and_output_match_filtering_the_loaded_list(tmp_path):
+    path, records = league_file(tmp_path)
+    kept = list(filter_matches(iter_matches(path), '2025-03-02', '2025-03-07', {'Finished'}))
+    assert kept == [r for r in records if '2025-03-02' <= r['match_date'] <= '2025-03-07'
+                    and r['match_status'] == 'Finished']
+    out = io.StringIO()
+    assert write_array(out, kept) == 4
+    assert json.loads(out.getvalue()) == kept
+    out = io.StringIO()
+    assert write_array(out, []) == 0 and json.loads(out.getvalue()) == []
+
+
+@pytest.mark.parametrize('text', ['{"match_id": "1"}', '[{"match_id": "1"}, {"match_id"', '', '[{"a": 1},'])
+def test_malformed_files_raise(text):
+    with pytest.raises(ValueError):
+        list(iter_records(io.StringIO(text), 4))
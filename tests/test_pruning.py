@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from conftest import match_record, quietly, write_league
+from match_store import load_store, read_manifest, update_store, window_partitions
+from fixture_scanner import scan_fixtures
+
+
+def assert_same_scan(store_dir, date_from, date_to, last_n, leagues):
+    manifest = read_manifest(store_dir)
+    partitions = window_partitions(manifest, date_from, date_to, last_n, leagues, store_dir, index_leagues=leagues)
+    full = scan_fixtures(load_store(store_dir), date_from, date_to, last_n, leagues)
+    pruned = scan_fixtures(load_store(store_dir, partitions=partitions), date_from, date_to, last_n, leagues)
+    assert len(full)
+    assert pruned.equals(full)
+
+
+def test_league_restricted_history_is_not_pruned_by_cup_games(tmp_path):
+    leagues_dir = str(tmp_path / 'leagues')
+    store_dir = str(tmp_path / 'compiled')
+    goals = {'Corners': (5, 5)}
+    previous = [match_record(100 + i, 10, f'2025-0{1 + i}-10', team, 3 + i, (2, 1), goals)
+                for i in range(4) for team in (1, 2)]
+    previous = [dict(m, match_id=str(100 + n)) for n, m in enumerate(previous)]
+    current = [match_record(200, 10, '2025-08-10', 1, 7, (1, 1), goals),
+               match_record(201, 10, '2025-08-10', 2, 8, (1, 1), goals),
+               match_record(202, 10, '2025-08-24', 1, 8, (3, 0), goals),
+               match_record(203, 10, '2025-08-24', 2, 7, (3, 0), goals),
+               match_record(204, 10, '2025-09-20', 1, 2)]
+    cup = [match_record(300 + n, 20, f'2025-09-0{1 + n}', team, 9, (0, 0), goals)
+           for n, team in enumerate((1, 2, 1, 2, 1, 2))]
+    write_league(leagues_dir, 10, 2024, previous)
+    write_league(leagues_dir, 10, 2025, current)
+    write_league(leagues_dir, 20, 2025, cup)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+
+    manifest = read_manifest(store_dir)
+    assert window_partitions(manifest, '2025-09-20', None, 5, ['10'], store_dir, index_leagues=['10']) == \
+        ['10_2024', '10_2025']
+    # An index over every league does get its last 5 from the cup
+    assert '10_2024' not in window_partitions(manifest, '2025-09-20', None, 5, ['10'], store_dir)
+    assert_same_scan(store_dir, '2025-09-20', None, 5, ['10'])
+    assert_same_scan(store_dir, '2025-09-20', None, 5, None)
+
+
+@pytest.mark.parametrize('last_n', [3, 5, 10])
+def test_pruned_scan_matches_full_store(synthetic_dirs, last_n):
+    _, store_dir = synthetic_dirs
+    store = load_store(store_dir)
+    rng = np.random.default_rng(last_n)
+    days = np.unique(store['date'][store.upcoming_mask()])
+    league_ids = sorted({meta['league_id'] for meta in store.partitions.values()})
+    for day in rng.choice(days, 3, replace=False):
+        day = str(day)
+        assert_same_scan(store_dir, day, None, last_n, None)
+        leagues = [str(l) for l in rng.choice(league_ids, 4, replace=False)]
+        if len(scan_fixtures(store, day, None, last_n, leagues)):
+            assert_same_scan(store_dir, day, None, last_n, leagues)
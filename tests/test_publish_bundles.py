@@ -0,0 +1,90 @@
+import os
+import gzip
+import json
+import hashlib
+
+from conftest import match_record, quietly, write_league
+from match_store import STAT_TYPES, read_manifest, update_store
+from publish_bundles import BUNDLE_FIELDS, BUNDLES_MANIFEST, publish_bundles
+
+
+def league_records(league_id, goals=1):
+    records = [match_record(league_id * 10 + i, league_id, f'2025-02-0{i + 1}', 1, 2, (goals, 0),
+                            {'Corners': (4, 3), 'Yellow Cards': (1, 2)}, referee='R. Test') for i in range(3)]
+    for record in records:
+        record['statistics'].append({'type': 'Ball Possession', 'home': '55%', 'away': '45%'})
+        record['statistics'][0]['extra'] = 'not read by the pages'
+        record['match_hometeam_badge'] = 'https://example.com/badge.png'
+    return records
+
+
+def publish(tmp_path, **kwargs):
+    leagues_dir, store_dir = str(tmp_path / 'leagues'), str(tmp_path / 'store')
+    bundles_dir = str(tmp_path / 'bundles')
+    quietly(update_store, leagues_dir, store_dir)
+    files, written = quietly(publish_bundles, leagues_dir, bundles_dir, store_dir, **kwargs)
+    with open(os.path.join(bundles_dir, BUNDLES_MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    return bundles_dir, manifest, files, written
+
+
+def test_bundles_hold_only_what_the_pages_read(tmp_path):
+    write_league(str(tmp_path / 'leagues'), 5, 2025, league_records(5))
+    bundles_dir, manifest, _, _ = publish(tmp_path)
+    entry = manifest['files']['league_5_2025.json']
+    with open(os.path.join(bundles_dir, entry['file']), 'rb') as f:
+        data = f.read()
+    with open(os.path.join(bundles_dir, entry['file'] + '.gz'), 'rb') as f:
+        assert gzip.decompress(f.read()) == data
+    # Content-hashed name
+    assert entry['file'] == f"league_5_2025.{hashlib.sha256(data).hexdigest()[:12]}.json"
+    assert (entry['league_id'], entry['season'], entry['matches'], entry['bytes']) == (5, 2025, 3, len(data))
+
+    records = json.loads(data)
+    assert [record['match_id'] for record in records] == ['50', '51', '52']
+    for record, source in zip(records, league_records(5)):
+        assert set(record) <= set(BUNDLE_FIELDS)
+        assert all(record[field] == source[field] for field in BUNDLE_FIELDS if not field.startswith('statistics'))
+        assert record['statistics'] == [{'type': 'Corners', 'home': '4', 'away': '3'},
+                                        {'type': 'Yellow Cards', 'home': '1', 'away': '2'}]
+        assert all(s['type'] in STAT_TYPES.values() for s in record['statistics'])
+
+
+def test_manifest_is_stamped_with_the_store_version(tmp_path):
+    leagues_dir = str(tmp_path / 'leagues')
+    write_league(leagues_dir, 5, 2025, league_records(5))
+    _, manifest, _, _ = publish(tmp_path)
+    assert manifest['version'] == 1
+    assert manifest['data_version'] == read_manifest(str(tmp_path / 'store'))['data_version']
+
+    write_league(leagues_dir, 6, 2025, league_records(6))
+    _, manifest, _, _ = publish(tmp_path)
+    assert manifest['data_version'] == read_manifest(str(tmp_path / 'store'))['data_version'] == 2
+    assert sorted(manifest['files']) == ['league_5_2025.json', 'league_6_2025.json']
+
+
+def test_unchanged_leagues_are_not_rewritten(tmp_path):
+    leagues_dir = str(tmp_path / 'leagues')
+    write_league(leagues_dir, 5, 2025, league_records(5))
+    write_league(leagues_dir, 6, 2025, league_records(6))
+    bundles_dir, manifest, _, written = publish(tmp_path)
+    assert written == 2
+    paths = {source: os.path.join(bundles_dir, entry['file']) for source, entry in manifest['files'].items()}
+    modified = {path: os.stat(path).st_mtime_ns for path in paths.values()}
+
+    _, again, _, written = publish(tmp_path)
+    assert written == 0 and again['files'] == manifest['files']
+    assert {path: os.stat(path).st_mtime_ns for path in paths.values()} == modified
+
+    # A changed league gets a new bundle name and its old bundle is removed; the other is left alone
+    write_league(leagues_dir, 6, 2025, league_records(6, goals=3))
+    _, changed, _, written = publish(tmp_path)
+    assert written == 1
+    assert changed['files']['league_5_2025.json'] == manifest['files']['league_5_2025.json']
+    assert changed['files']['league_6_2025.json']['file'] != manifest['files']['league_6_2025.json']['file']
+    assert os.stat(paths['league_5_2025.json']).st_mtime_ns == modified[paths['league_5_2025.json']]
+    assert not os.path.exists(paths['league_6_2025.json'])
+    assert not os.path.exists(paths['league_6_2025.json'] + '.gz')
+
+    _, forced, _, written = publish(tmp_path, force=True)
+    assert written == 2 and forced['files'] == changed['files']
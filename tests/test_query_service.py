@@ -0,0 +1,88 @@
+import json
+import asyncio
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from query_service import QueryService, StoreState
+
+BAD_QUERIES = [
+    ('/find-bets', {}),
+    ('/find-bets', {'date_from': 'bogus'}),
+    ('/find-bets', {'date_from': '2025-13-01'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'date_to': 'x'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'last': 'five'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'leagues': '1,a'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'categories': 'nope'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'referee_weight': '2'}),
+    ('/find-bets', {'date_from': '2025-09-01', 'referee': 'abc'}),
+    ('/builder', {'date_from': 'bogus', 'search': '1'}),
+    ('/builder', {'date_from': '2025-09-01', 'date_to': '09/20/2025', 'search': '1'}),
+    ('/builder', {'date_from': '2025-09-01'}),
+    ('/builder', {'date_from': '2025-09-01', 'leg': 'corners:sideways:9.5'}),
+    ('/builder', {'date_from': '2025-09-01', 'search': '1', 'top': '0'}),
+    ('/builder', {'date_from': '2025-09-01', 'search': '1', 'top': '100000'}),
+    ('/builder', {'date_from': '2025-09-01', 'search': '1', 'max_legs': '5'}),
+    ('/builder', {'date_from': '2025-09-01', 'search': '1', 'min_legs': '3', 'max_legs': '2'}),
+    ('/totals', {'date_from': 'bogus'}),
+    ('/totals', {'date_from': '2025-09-01', 'date_to': 'soon'}),
+    ('/team', {}),
+    ('/team', {'team': '1', 'before': 'x'}),
+    ('/team', {'team': 'No Such Team FC'}),
+    ('/teams', {}),
+    ('/league', {'league': '999999'}),
+]
+
+
+@pytest.fixture(scope='module')
+def service(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return QueryService(store_dir)
+
+
+async def get(service, path, params):
+    """(status, body) of one GET through the service's HTTP handler"""
+    server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        query = urllib.parse.urlencode(params)
+        writer.write(f'GET {path}?{query} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize('path,params', BAD_QUERIES)
+def test_bad_input_is_400(service, path, params):
+    status, body = asyncio.run(get(service, path, params))
+    assert status == 400, body
+    assert body['error']
+
+
+def test_good_queries(service):
+    state = asyncio.run(service.current_state())
+    day = str(state.store['date'][state.store.upcoming_mask()][0])
+    team = int(state.store['home_id'][0])
+    for path, params in [('/find-bets', {'date_from': day, 'min_success_rate': '0'}),
+                         ('/builder', {'date_from': day, 'leg': 'goals:over:1.5'}),
+                         ('/totals', {'date_from': day}),
+                         ('/team', {'team': str(team), 'before': day}),
+                         ('/status', {})]:
+        status, body = asyncio.run(get(service, path, params))
+        assert status == 200, (path, body)
+
+
+def test_lazy_parts_are_built_once_across_threads(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    state = StoreState(store_dir)
+    with ThreadPoolExecutor(8) as pool:
+        engines = list(pool.map(lambda _: state.engine, range(16)))
+        referees = list(pool.map(lambda _: state.referees, range(16)))
+        restricted = list(pool.map(lambda _: state.index.for_leagues([1, 2]), range(16)))
+    assert all(engine is engines[0] for engine in engines)
+    assert all(index is referees[0] for index in referees)
+    assert all(index is restricted[0] for index in restricted)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from conftest import js_hits, js_rate, last_before, match_record, quietly, write_league
+from match_store import CATEGORIES, load_store, update_store
+from secondary_index import SecondaryIndex, fixture_codes, key_codes
+
+
+@pytest.fixture(scope='module')
+def store(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return load_store(store_dir)
+
+
+def key_rows(store, key, label):
+    """Rows whose key value is a label, found from the raw columns"""
+    if key == 'country':
+        partitions = [i for i, meta in enumerate(store.partitions.values()) if meta['country_name'] == label]
+        return np.isin(store['partition'], partitions)
+    return np.asarray(store.strings, dtype=object)[store[key]] == label
+
+
+@pytest.mark.parametrize('key', ['referee', 'stadium', 'round', 'country'])
+def test_hit_rate_matches_a_scan_of_the_keys_matches(store, key):
+    index = SecondaryIndex(store, key)
+    rng = np.random.default_rng(len(key))
+    for _ in range(150):
+        row = int(rng.integers(len(store)))
+        label = index.labels[index.codes[row]]
+        before = str(store['date'][row] + np.timedelta64(int(rng.integers(-3, 4)), 'D'))
+        n = int(rng.choice([1, 3, 5, 10, 40]))
+        category = str(rng.choice(list(CATEGORIES)))
+        threshold = float(rng.choice([0.5, 1, 2, 2.5, 4, 4.5, 10.5]))
+        over_under = str(rng.choice(['over', 'under']))
+
+        expected = last_before(store, key_rows(store, key, label), before, n)
+        assert index.last_n(label, n, before).tolist() == expected.tolist()
+        hits = js_hits(store.totals(category)[expected], threshold, over_under)
+        assert index.hit_rate(label.upper(), n, before, category, threshold, over_under) == \
+            (hits, len(expected), js_rate(hits, len(expected)))
+
+
+def test_summary_matches_a_scan(store):
+    index = SecondaryIndex(store, 'referee')
+    before = str(store['date'][len(store) // 2])
+    table = index.summary('cards', 2.5, before_date=before, min_matches=3).set_index('referee')
+    totals = store.totals('cards')
+    expected = {}
+    for label in set(index.labels[code] for code in index.key_ids.tolist()):
+        positions = last_before(store, key_rows(store, 'referee', label), before)
+        if len(positions) >= 3:
+            over = js_hits(totals[positions], 2.5, 'over')
+            average = np.round(totals[positions].sum() / len(positions), 2)
+            expected[label] = (len(positions), average, over, js_rate(over, len(positions)))
+    assert {label: (row.matches, row.avg_cards, row.over, row.over_rate) for label, row in table.iterrows()} == expected
+    assert expected
+    assert table['avg_cards'].is_monotonic_decreasing
+
+
+def test_unknown_values_and_missing_stats(tmp_path):
+    leagues_dir, store_dir = str(tmp_path / 'leagues'), str(tmp_path / 'store')
+    stats = {'Yellow Cards': (2, 1)}
+    write_league(leagues_dir, 7, 2025, [
+        match_record(1, 7, '2025-08-01', 1, 2, (1, 0), stats, referee='A. Ref'),
+        match_record(2, 7, '2025-08-08', 2, 1, (0, 0), referee='A. Ref'),
+        match_record(3, 7, '2025-08-15', 1, 2, (2, 2), stats),
+        match_record(4, 7, '2025-08-22', 2, 1, referee='A. Ref'),
+    ])
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    store = load_store(store_dir)
+
+    every = SecondaryIndex(store, 'referee')
+    with_stats = SecondaryIndex(store, 'referee', require_stats=True)
+    assert every.hit_rate('a. ref', None, '2025-08-22', 'cards', 0.5) == (1, 2, 50)
+    # The match without statistics would count as 0 cards
+    assert with_stats.hit_rate('A. Ref', None, '2025-08-22', 'cards', 0.5) == (1, 1, 100)
+    assert key_codes(store, 'referee')[0].tolist()[2] == -1
+    with pytest.raises(KeyError):
+        every.code('Nobody')
+
+    fixture = np.flatnonzero(store.upcoming_mask())
+    assert fixture_codes(every, store, fixture).tolist() == [every.code('A. Ref')]
+    assert fixture_codes(every, store, fixture, {store['match_id'][fixture[0]]: 'Nobody'}).tolist() == [-1]
@@ -0,0 +1,54 @@
+import os
+import json
+
+import numpy as np
+
+from conftest import quietly
+from match_store import load_store
+from slate_shards import SLATES_INDEX, write_slates
+
+
+def read_index(slates_dir):
+    with open(os.path.join(slates_dir, SLATES_INDEX), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_window_rebuild_keeps_other_dates(synthetic_dirs, tmp_path):
+    _, store_dir = synthetic_dirs
+    slates_dir = str(tmp_path / 'slates')
+    store = load_store(store_dir)
+    quietly(write_slates, store, slates_dir, store_dir)
+    everything = read_index(slates_dir)['dates']
+
+    days = sorted(everything)
+    date_from, date_to = days[10], days[40]
+    # A day inside the window that no longer has fixtures
+    calendar = np.arange(np.datetime64(date_from), np.datetime64(date_to)).astype(str)
+    empty_day = next(day for day in calendar if day not in everything)
+    stale = os.path.join(slates_dir, f'slate_{empty_day}.json')
+    open(stale, 'w').close()
+    quietly(write_slates, store, slates_dir, store_dir, date_from=date_from, date_to=date_to, force=True)
+
+    assert read_index(slates_dir)['dates'] == everything
+    assert sorted(f[6:-5] for f in os.listdir(slates_dir) if f.startswith('slate_')) == days
+    assert not os.path.exists(stale)
+
+
+def test_slate_history_is_last_n_before_the_day(synthetic_dirs, tmp_path):
+    _, store_dir = synthetic_dirs
+    store = load_store(store_dir)
+    slates = quietly(write_slates, store, str(tmp_path / 'slates'), store_dir, last_matches=5)
+    finished = store.finished_mask()
+    for date in sorted(slates)[::25]:
+        slate = slates[date]
+        columns = slate['match_columns']
+        home, away, day = columns.index('homeTeamId'), columns.index('awayTeamId'), columns.index('dateString')
+        for team_id, rows in slate['history'].items():
+            team = int(team_id)
+            played = finished & ((store['home_id'] == team) | (store['away_id'] == team)) & \
+                (store['date'] < np.datetime64(date, 'D'))
+            expected = np.flatnonzero(played)[-5:]
+            matches = [slate['matches'][i] for i in rows]
+            assert [m[day] for m in matches] == store['date'][expected].astype(str).tolist()
+            assert all(team in (m[home], m[away]) for m in matches)
+            assert slate['teams'][team_id]
@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import numpy as np
+
+from conftest import js_rate, js_round, match_record, quietly, write_league
+from match_store import load_store, read_manifest, update_store
+from query_service import StoreState, league_summary
+from stat_cubes import CUBES_DIR, LEAGUE_TEAM, WINDOWS, build_cubes, league_shard, read_shard, write_cubes
+from builder_engine import THRESHOLDS
+
+
+def test_written_shards_match_the_in_memory_cubes(synthetic_dirs, tmp_path):
+    _, store_dir = synthetic_dirs
+    cubes_dir = str(tmp_path / 'cubes')
+    store = load_store(store_dir)
+    version = read_manifest(store_dir)['data_version']
+    cubes = quietly(write_cubes, store, cubes_dir, store_dir)
+    for key in list(store.partitions)[::7]:
+        expected = league_shard(store, key, cubes[cubes['league_key'] == key], THRESHOLDS, version)
+        assert read_shard(key, version, cubes_dir) == expected
+    key = next(iter(store.partitions))
+    assert read_shard(key, version + 1, cubes_dir) is None
+    assert read_shard(key, version, cubes_dir, thresholds={'goals': [2.5]}) is None
+    assert read_shard('no_such_league', version, cubes_dir) is None
+
+
+def test_league_endpoint_serves_the_written_shard(synthetic_dirs, tmp_path):
+    _, store_dir = synthetic_dirs
+    copy = str(tmp_path / 'store')
+    shutil.copytree(store_dir, copy)
+    state = StoreState(copy)
+    key = max(state.store.partitions)
+    league = str(state.store.partitions[key]['league_id'])
+    computed = league_summary(state, {'league': [league]})
+    assert state._cubes is not None
+
+    quietly(write_cubes, state.store, os.path.join(copy, os.path.basename(CUBES_DIR)), copy)
+    state = StoreState(copy)
+    assert league_summary(state, {'league': [league]}) == computed
+    # Answered from disk, so the cubes were never built in memory
+    assert state._cubes is None
+
+
+def test_cells_match_a_scan_of_the_league(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    store = load_store(store_dir)
+    cubes = build_cubes(store, THRESHOLDS)
+    keys = list(store.partitions)
+    finished = store.finished_mask()
+    sample = cubes.sample(400, random_state=0)
+    for cell in sample.itertuples():
+        rows = finished & (store['partition'] == keys.index(cell.league_key))
+        if cell.team_id != LEAGUE_TEAM:
+            home, away = store['home_id'] == cell.team_id, store['away_id'] == cell.team_id
+            rows &= {'home': home, 'away': away, 'all': home | away}[cell.venue]
+        positions = np.flatnonzero(rows)[-WINDOWS[cell.window]:] if WINDOWS[cell.window] else np.flatnonzero(rows)
+        over = int((store.totals(cell.category)[positions] > cell.threshold).sum())
+        # calculateStatistics takes the under percentage as 100 - over
+        assert (cell.matches, cell.over, cell.over_rate, cell.under_rate) == \
+            (len(positions), over, js_rate(over, len(positions)), js_round(100 - over / len(positions) * 100))
+    assert (sample['team_id'] == LEAGUE_TEAM).any()
+
+
+def test_rates_round_like_calculate_statistics(tmp_path):
+    leagues_dir, store_dir = str(tmp_path / 'leagues'), str(tmp_path / 'store')
+    dates = np.arange(np.datetime64('2025-01-01'), np.datetime64('2025-02-10')).astype(str)
+    write_league(leagues_dir, 5, 2025, [match_record(i, 5, day, 1, 2, (3, 0) if i < 17 else (1, 0))
+                                        for i, day in enumerate(dates)])
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    cubes = build_cubes(load_store(store_dir), {'goals': [2.5]})
+    league = cubes[(cubes['team_id'] == LEAGUE_TEAM) & (cubes['window'] == 'season')].iloc[0]
+    # 17/40 is 42.5% over and 57.5% under; 100 - 42.5 rounds up where 23/40 (57.49999...) would not
+    assert (league['matches'], league['over'], league['over_rate'], league['under_rate']) == (40, 17, 43, 58)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from conftest import js_hits, js_rate, last_before
+from match_store import CATEGORIES, load_store
+from team_index import TeamIndex, success_rate
+
+THRESHOLDS = [0.5, 1, 1.5, 2, 2.5, 3, 4.5, 10, 10.5, 21.5]
+
+
+@pytest.fixture(scope='module')
+def index(synthetic_dirs):
+    _, store_dir = synthetic_dirs
+    return TeamIndex(load_store(store_dir))
+
+
+def samples(store, count, seed=0):
+    """Random (team, before_date, n, category, threshold, over_under, leagues) queries"""
+    rng = np.random.default_rng(seed)
+    league_ids = np.unique(store['league_id'])
+    rows = rng.integers(len(store), size=count)
+    for row in rows.tolist():
+        team = int(store['home_id' if rng.random() < 0.5 else 'away_id'][row])
+        before = store['date'][row] + np.timedelta64(int(rng.integers(-3, 4)), 'D')
+        leagues = None if rng.random() < 0.5 else rng.choice(league_ids, size=4, replace=False).tolist()
+        yield (team, str(before), int(rng.choice([1, 3, 5, 10, 20])), str(rng.choice(list(CATEGORIES))),
+               float(rng.choice(THRESHOLDS)), str(rng.choice(['over', 'under'])), leagues)
+
+
+def test_success_rate_rounds_like_math_round():
+    assert [success_rate(h, t) for h, t in [(23, 40), (1, 8), (5, 8), (1, 3), (2, 3), (0, 0), (7, 7)]] == \
+        [57, 13, 63, 33, 67, 0, 100]
+    hits, total = np.meshgrid(np.arange(201), np.arange(201))
+    hits, total = hits[hits <= total], total[hits <= total]
+    assert success_rate(hits, total).tolist() == [js_rate(h, t) for h, t in zip(hits.tolist(), total.tolist())]
+
+
+def test_hit_rate_matches_a_scan_of_the_teams_matches(index):
+    store = index.store
+    for team, before, n, category, threshold, over_under, leagues in samples(store, 400):
+        rows = (store['home_id'] == team) | (store['away_id'] == team)
+        if leagues is not None:
+            rows &= store.league_mask(leagues)
+        expected = last_before(store, rows, before, n)
+        assert index.last_n(team, n, before, leagues=leagues).tolist() == expected.tolist()
+
+        hits = js_hits(store.totals(category)[expected], threshold, over_under)
+        assert index.hit_rate(team, n, before, category, threshold, over_under, leagues=leagues) == \
+            (hits, len(expected), js_rate(hits, len(expected)))
+
+
+def test_windows_match_key_window(index):
+    store = index.store
+    queries = list(samples(store, 300, seed=1))
+    teams = np.array([q[0] for q in queries] + [0, 123456789])
+    dates = np.array([q[1] for q in queries] + ['2025-01-01', '2025-01-01'], dtype='datetime64[D]')
+    for n in (None, 1, 5):
+        starts, ends = index.windows(teams, n, dates)
+        expected = [index.key_window(team, n, date) for team, date in zip(teams.tolist(), dates.astype(str))]
+        assert list(zip(starts.tolist(), ends.tolist())) == expected
+    assert index.key_window(123456789, 5, '2025-01-01') == (0, 0)
@@ -0,0 +1,67 @@
+import difflib
+
+import numpy as np
+
+from conftest import quietly
+from synthetic_data import VARIANTS, league_team_names
+from team_matcher import TeamMatcher, normalize_team_name
+from team_name_analyzer import generate_mapping_suggestions
+from team_registry import TeamRegistry
+
+COUNTRIES = {'Arsenal': 'England', 'Arsenal Tula': 'Russia', 'Dynamo Moscow': 'Russia', 'Dinamo Zagreb': 'Croatia'}
+
+
+def confidence(query, name):
+    """get_close_matches' score, by brute force: the better of the raw and normalized ratios"""
+    score = difflib.SequenceMatcher(None, query.lower(), name.lower()).ratio()
+    if normalize_team_name(query) and normalize_team_name(name):
+        score = max(score, difflib.SequenceMatcher(None, normalize_team_name(query), normalize_team_name(name)).ratio())
+    return score
+
+
+def test_grouped_queries_match_within_their_group():
+    matcher = TeamMatcher(list(COUNTRIES) + ['Arsenal Kyiv'], COUNTRIES)
+    assert matcher.best_match('Arsenal FC', group='England')[0] == 'Arsenal'
+    assert matcher.best_match('FC Arsenal Tula', group='Russia')[0] == 'Arsenal Tula'
+    assert matcher.best_match('Dinamo Moskva', group='Russia')[0] == 'Dynamo Moscow'
+    # Names without a group stay candidates of every group
+    assert matcher.best_match('Arsenal Kiev', group='Russia')[0] == 'Arsenal Kyiv'
+    assert matcher.best_match('Arsenal FC')[0] == 'Arsenal'
+
+
+def test_no_match_across_groups():
+    matcher = TeamMatcher(COUNTRIES, COUNTRIES)
+    assert matcher.best_match('Dinamo Moskva', group='Croatia') == ('Dinamo Zagreb', confidence('Dinamo Moskva',
+                                                                                                'Dinamo Zagreb'))
+    assert matcher.best_match('Dynamo Moscow', group='England', cutoff=0.3) == (None, 0.0)
+    assert not len(matcher.candidates('Arsenal Tula', group='Croatia'))
+
+    registry = TeamRegistry({
+        1: {'name': 'Arsenal', 'aliases': {}, 'leagues': [], 'country': 'England'},
+        2: {'name': 'Arsenal Tula', 'aliases': {'Arsenal T.': 'csv'}, 'leagues': [], 'country': 'Russia'},
+    })
+    # Unmapped, 'Arsenal T.' would fall to the closer 'Arsenal'; its country keeps it off the English team
+    assert quietly(generate_mapping_suggestions, {'Arsenal T.'}, {'Arsenal'}, registry) == []
+    assert quietly(generate_mapping_suggestions, {'Arsenal T.'}, {'Arsenal'}) == [
+        ('Arsenal T.', 'Arsenal', confidence('Arsenal T.', 'Arsenal'))]
+
+
+def test_blocking_keeps_the_best_candidate(synthetic_dirs):
+    leagues_dir, _ = synthetic_dirs
+    names = league_team_names(leagues_dir)
+    matcher = TeamMatcher(names)
+    rng = np.random.default_rng(3)
+    queries = []
+    for name in rng.choice(names, min(len(names), 150), replace=False).tolist():
+        query = VARIANTS[int(rng.integers(len(VARIANTS)))](name).strip() or name
+        # Plus a typo: one letter dropped
+        cut = int(rng.integers(len(query)))
+        queries.append((name, query[:cut] + query[cut + 1:]))
+
+    found = 0
+    for name, query in queries:
+        # Blocking only narrows the candidates: the best one it keeps is the best of every name
+        best, score = matcher.best_match(query, cutoff=0)
+        assert score == max(confidence(query, other) for other in names)
+        found += best == name
+    assert found >= 0.95 * len(queries)
@@ -0,0 +1,87 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import match_record, quietly, write_league
+from match_store import load_store, update_store
+from team_ratings import HISTORY_COLUMNS, TeamRatings, main, update_ratings
+from team_registry import REGISTRY_FILE, build_registry, save_registry
+
+
+def elo_change(home_rating, away_rating, result, goal_weight=1.0):
+    expected = 1 / (1 + 10 ** ((away_rating - home_rating - 65) / 400))
+    return 20 * goal_weight * (result - expected)
+
+
+def compile_league(tmp_path, records, full=True):
+    leagues_dir, store_dir = str(tmp_path / 'leagues'), str(tmp_path / 'store')
+    write_league(leagues_dir, 5, 2025, records)
+    quietly(update_store, leagues_dir, store_dir, full=full)
+    return store_dir
+
+
+def test_ratings_follow_the_elo_update(tmp_path):
+    store_dir = compile_league(tmp_path, [
+        match_record(1, 5, '2025-01-01', 1, 2, (3, 0)),
+        match_record(2, 5, '2025-01-08', 3, 1, (1, 1)),
+        match_record(3, 5, '2025-01-15', 2, 3, (0, 2)),
+        match_record(4, 5, '2025-01-22', 1, 2),
+    ])
+    ratings = TeamRatings()
+    assert ratings.update(load_store(store_dir)) == (3, 0)
+
+    # A three-goal win weighs (11 + 3) / 8; team 3 joins at its league's average, still 1500 then
+    first = elo_change(1500, 1500, 1.0, 14 / 8)
+    second = elo_change(1500, 1500 + first, 0.5)
+    team1, team2, team3 = 1500 + first - second, 1500 - first, 1500 + second
+    third = elo_change(team2, team3, 0.0, 1.5)
+    expected = {1: team1, 2: team2 + third, 3: team3 - third}
+    assert ratings.current == pytest.approx(expected)
+    assert ratings.rating(1, '2025-01-08') == pytest.approx(1500 + first)
+    assert np.isnan(ratings.rating(3, '2025-01-08'))
+    assert ratings.table()['team_id'].tolist() == sorted(expected, key=expected.get, reverse=True)
+
+
+def test_late_and_corrected_results_replay_to_a_full_rating(tmp_path):
+    records = [match_record(i, 5, f'2025-01-{i + 10:02d}', 1 + i % 3, 1 + (i + 1) % 3, (i % 4, i % 3))
+               for i in range(1, 10)]
+    store_dir = compile_league(tmp_path, records)
+    ratings = TeamRatings()
+    ratings.update(load_store(store_dir))
+
+    # A match on match 4's day arrives, ordered after it by id, and a rated score is corrected
+    records.append(match_record(20, 5, '2025-01-14', 2, 1, (4, 0)))
+    records[6] = match_record(7, 5, '2025-01-17', 2, 3, (0, 0))
+    store_dir = compile_league(tmp_path, records, full=False)
+    store = load_store(store_dir)
+    # Match 20 and the corrected match 7 are rated; 5, 6, 8 and 9 come after match 20 and are replayed
+    assert ratings.update(store) == (2, 4)
+
+    rebuilt = TeamRatings()
+    rebuilt.update(store)
+    assert ratings.history['match_id'].tolist() == [1, 2, 3, 4, 20, 5, 6, 7, 8, 9] == \
+        rebuilt.history['match_id'].tolist()
+    for name in HISTORY_COLUMNS:
+        np.testing.assert_allclose(ratings.history[name], rebuilt.history[name])
+    assert ratings.update(store) == (0, 0)
+
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['team_ratings.py', *args])
+    quietly(main)
+
+
+def test_team_names_resolve_through_the_store_registry(tmp_path, monkeypatch, capsys):
+    store_dir = compile_league(tmp_path, [match_record(1, 5, '2025-01-01', 1, 2, (2, 1))])
+    quietly(update_ratings, store_dir, os.path.join(store_dir, 'team_ratings.json'))
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, '--store-dir', store_dir, '--team', 'Team 2')
+    assert 'No team registry' in capsys.readouterr().err
+
+    save_registry(build_registry(load_store(store_dir)), os.path.join(store_dir, os.path.basename(REGISTRY_FILE)))
+    run_cli(monkeypatch, '--store-dir', store_dir, '--team', 'Team 2')
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, '--store-dir', store_dir, '--team', 'Team 9')
+    assert "Unknown team 'Team 9'" in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import match_record, quietly, write_league
+from match_store import load_store, update_store
+from team_registry import TeamRegistry
+from team_search import TeamSearchIndex, build_search_index, query_forms
+
+TEAMS = {
+    1: ('Atlético Madrid', ['Atleti', 'Club Atlético de Madrid']),
+    2: ('Athletic Club', ['Athletic Bilbao']),
+    3: ('Arsenal', ['Arsenal FC', 'The Gunners']),
+    4: ('Real Madrid', []),
+    5: ('Deportivo Alavés', ['Alaves']),
+    6: ('FC Bayern München', ['Bayern Munich']),
+}
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    """The teams above ranked by matches played (Arsenal, Real Madrid), then by their last match"""
+    root = tmp_path_factory.mktemp('search')
+    leagues_dir, store_dir = str(root / 'leagues'), str(root / 'store')
+    pairs = [(3, 4), (4, 3), (3, 1), (2, 5), (6, 3)]
+    write_league(leagues_dir, 9, 2025, [match_record(i, 9, f'2025-03-0{i + 1}', home, away, (1, 0))
+                                        for i, (home, away) in enumerate(pairs)])
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    registry = TeamRegistry({team_id: {'name': name, 'aliases': {alias: 'mapping' for alias in aliases},
+                                       'leagues': [9], 'country': 'Testland'}
+                             for team_id, (name, aliases) in TEAMS.items()})
+    return build_search_index(load_store(store_dir), registry)
+
+
+def ids(index, query, limit=None):
+    return [team['id'] for team in index.search(query, limit)]
+
+
+def brute_force(index, query):
+    """Every team with a name containing a query form: names starting with it, then words, then anywhere"""
+    found = []
+    for form in query_forms(query):
+        for test in (lambda key: key.startswith(form), lambda key: f' {form}' in f' {key}', lambda key: form in key):
+            found += [team['id'] for team in index.teams if team['id'] not in found and any(map(test, team['keys']))]
+    return found
+
+
+def test_prefix_queries_rank_name_starts_first(index):
+    assert [team['id'] for team in index.teams] == [3, 4, 6, 2, 5, 1]
+    # Most active first within a tier, but a name starting with the query beats a word starting with it
+    assert ids(index, 'at') == [2, 1]
+    assert ids(index, 'cl') == [1, 2]
+    assert ids(index, 'ma') == [4, 1]
+    assert ids(index, 'mad', 1) == [4]
+    assert ids(index, 'a') == []
+
+
+def test_aliases_find_their_team(index):
+    assert ids(index, 'gunn') == [3]
+    assert ids(index, 'bilbao') == [2]
+    assert ids(index, 'munich') == [6]
+    # Filler tokens are ignored: 'FC Arsenal' is searched as 'arsenal' too
+    assert ids(index, 'FC Arsenal') == [3]
+
+
+def test_accents_fold_both_ways(index):
+    assert ids(index, 'atletico') == ids(index, 'Atlético') == [1]
+    assert ids(index, 'alavés') == ids(index, 'ALAVES') == [5]
+    assert ids(index, 'bayern munchen') == ids(index, 'MÜNCHEN') == [6]
+
+
+@pytest.mark.parametrize('query', ['at', 'ma', 'mad', 'real', 'rid', 'tico', 'club', 'a madrid', 'fc', 'sen',
+                                   'Atlético de', 'ath', 'athletic bil'])
+def test_search_matches_a_scan_and_survives_export(index, query):
+    assert ids(index, query) == brute_force(index, query)
+    exported = TeamSearchIndex.from_json(index.to_json())
+    assert ids(exported, query) == ids(index, query)
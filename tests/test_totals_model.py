@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import match_record, quietly, write_league
+from match_store import load_store, update_store
+from totals_model import fit_dispersion, fit_model, fit_rates, over_probabilities, recorded_mask
+
+
+def pmf(k, mean, dispersion):
+    if not dispersion:
+        return math.exp(k * math.log(mean) - mean - math.lgamma(k + 1))
+    size = 1 / dispersion
+    return math.exp(math.lgamma(k + size) - math.lgamma(size) - math.lgamma(k + 1)
+                    + size * math.log(size / (size + mean)) + k * math.log(mean / (size + mean)))
+
+
+@pytest.mark.parametrize('dispersion', [0.0, 0.3])
+def test_over_probabilities_sum_the_pmf(dispersion):
+    means, lines = [0.4, 2.7, 11.2], [0.5, 2.5, 9.5, 14.5]
+    expected = [[1 - sum(pmf(k, mean, dispersion) for k in range(int(line) + 1)) for line in lines]
+                for mean in means]
+    np.testing.assert_allclose(over_probabilities(means, dispersion, lines), expected, atol=1e-12)
+
+
+def test_dispersion_is_measured_from_the_excess_variance():
+    rng = np.random.default_rng(0)
+    means = rng.uniform(6, 14, 40000)
+    size = 1 / 0.25
+    weights = np.ones(len(means))
+    assert fit_dispersion(rng.negative_binomial(size, size / (size + means)), means, weights) == \
+        pytest.approx(0.25, abs=0.02)
+    assert fit_dispersion(rng.poisson(means), means, weights) < 0.005
+    # Under-dispersed totals are fitted as Poisson
+    assert fit_dispersion(np.round(means), means, weights) == 0.0
+
+
+def test_fitted_rates_reproduce_each_teams_weighted_counts():
+    rng = np.random.default_rng(1)
+    n_teams, n = 8, 600
+    home = rng.integers(n_teams, size=n)
+    away = (home + rng.integers(1, n_teams, size=n)) % n_teams
+    strength = rng.uniform(0.6, 1.6, n_teams)
+    home_counts = rng.poisson(1.5 * strength[home] / strength[away]).astype(np.float64)
+    away_counts = rng.poisson(1.1 * strength[away] / strength[home]).astype(np.float64)
+    weights = rng.uniform(0.2, 1, n)
+    attack, defence, home_rate, away_rate, _ = fit_rates(home, away, home_counts, away_counts, weights, n_teams,
+                                                         prior=0)
+
+    # Without a prior the fit is the maximum likelihood one: expected counts match the observed ones per team
+    home_means = home_rate * attack[home] * defence[away]
+    away_means = away_rate * attack[away] * defence[home]
+    for values, observed in ((home_means, home_counts), (away_means, away_counts)):
+        assert weights @ values == pytest.approx(weights @ observed)
+    scored = np.bincount(home, weights * home_counts, n_teams) + np.bincount(away, weights * away_counts, n_teams)
+    expected = np.bincount(home, weights * home_means, n_teams) + np.bincount(away, weights * away_means, n_teams)
+    np.testing.assert_allclose(expected, scored, rtol=1e-4)
+    assert np.corrcoef(attack, strength)[0, 1] > 0.8
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    """League 1 reports every stat; league 2 lists no shots and fills in uncounted cards as 0 - 0"""
+    rng = np.random.default_rng(2)
+    root = tmp_path_factory.mktemp('totals')
+    leagues_dir, store_dir = str(root / 'leagues'), str(root / 'store')
+    dates = np.arange(np.datetime64('2025-01-01'), np.datetime64('2025-06-01'), 3).astype(str)
+    for league_id, first in ((1, 1), (2, 11)):
+        records = []
+        for i, day in enumerate(dates):
+            home, away = first + i % 6, first + (i + 1 + i // 6) % 6
+            if home == away:
+                away = first + (away - first + 1) % 6
+            stats = {'Corners': tuple(rng.poisson(5, 2)), 'Yellow Cards': tuple(rng.poisson(2, 2))}
+            if league_id == 1:
+                stats['Shots Total'] = tuple(rng.poisson(12, 2))
+            else:
+                stats['Yellow Cards'] = (0, 0)
+            records.append(match_record(league_id * 1000 + i, league_id, day, home, away,
+                                        tuple(rng.poisson(1.4, 2)), stats))
+        records.append(match_record(league_id * 1000 + 999, league_id, '2025-06-10', first, first + 1))
+        write_league(leagues_dir, league_id, 2025, records)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    return load_store(store_dir)
+
+
+def test_categories_a_league_does_not_report_are_left_out(store):
+    league_1 = store.finished_mask() & (store['league_id'] == 1)
+    finished = store.finished_mask()
+    assert (recorded_mask(store, 'goals') & finished).sum() == finished.sum()
+    assert (recorded_mask(store, 'corners') & finished).sum() == finished.sum()
+    # League 2's 0 - 0 cards are listed, so only its coverage rule drops them; its missing shots never count
+    assert (store.stats_mask('cards') & finished).sum() == finished.sum()
+    for category in ('cards', 'shots'):
+        assert ((recorded_mask(store, category) & finished) == league_1).all()
+
+    model = fit_model(store, '2025-06-05', ['goals', 'corners', 'cards', 'shots'])
+    assert {category: params['matches'] for category, params in model.categories.items()} == {
+        'goals': finished.sum(), 'corners': finished.sum(), 'cards': league_1.sum(), 'shots': league_1.sum()}
+    # League 2 teams never played a recorded cards match, so they all keep the prior's average rates
+    cards = model.categories['cards']
+    slots, known = model.slots(range(11, 17))
+    assert known.all()
+    for rates in (cards['attack'][slots], cards['defence'][slots]):
+        assert np.ptp(rates) == 0 and rates[0] == pytest.approx(1, abs=1e-3)
+
+
+def test_fixture_probabilities_follow_the_fitted_rates(store):
+    model = fit_model(store, '2025-06-05', ['goals', 'corners'])
+    lines = [1.5, 2.5, 7.5, 9.5]
+    for category in ('goals', 'corners'):
+        params = model.categories[category]
+        (home_slot, away_slot), _ = model.slots([1, 2])
+        home, away, over = model.probabilities(category, [1, 99], [2, 2], lines)
+        assert home[0] == pytest.approx(params['home_rate'] * params['attack'][home_slot]
+                                        * params['defence'][away_slot])
+        assert away[0] == pytest.approx(params['away_rate'] * params['attack'][away_slot]
+                                        * params['defence'][home_slot])
+        # An unknown home team rates as average
+        assert home[1] == pytest.approx(params['home_rate'] * params['defence'][away_slot])
+        np.testing.assert_allclose(over, over_probabilities(home + away, params['dispersion'], lines))
+        assert (np.diff(over, axis=1) <= 0).all()
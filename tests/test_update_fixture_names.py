@@ -0,0 +1,50 @@
+import argparse
+
+import pandas as pd
+
+import update_fixture_names
+from conftest import quietly
+from team_registry import TeamRegistry
+from update_fixture_names import load_team_mappings
+
+
+def test_registry_aliases_stop_at_csv_names(tmp_path):
+    registry = TeamRegistry({
+        1: {'name': 'Manchester United', 'aliases': {'Man Utd': 'api', 'Man United': 'csv', 'Manchester Utd': 'csv'},
+            'leagues': [], 'country': 'England'},
+        2: {'name': 'Chelsea', 'aliases': {'Chelsea FC': 'api'}, 'leagues': [], 'country': 'England'},
+    })
+    mapping_file = str(tmp_path / 'recommended_mappings.csv')
+    pd.DataFrame({'Fixture Team': ['Manchester Utd'], 'League Team': ['Man United'],
+                  'Confidence': [0.9]}).to_csv(mapping_file, index=False)
+
+    mappings = quietly(load_team_mappings, mapping_file, registry)
+    assert mappings == {'Manchester Utd': 'Man United', 'Man Utd': 'Man United', 'Manchester United': 'Man United'}
+
+
+def test_corrupt_files_are_reported_and_fail_the_run(tmp_path, monkeypatch):
+    fixtures = tmp_path / 'fixtures'
+    fixtures.mkdir()
+    pd.DataFrame({'Home Team': ['Man Utd', 'Chelsea'], 'Away Team': ['Chelsea', 'Man Utd']}).to_csv(
+        fixtures / 'a.csv', index=False)
+    (fixtures / 'b.csv').write_bytes(b'Home Team,Away Team\n\xff\xfe\x00"Chel')
+    mapping_file = tmp_path / 'mappings.csv'
+    pd.DataFrame({'Fixture Team': ['Man Utd'], 'League Team': ['Manchester United']}).to_csv(mapping_file,
+                                                                                           index=False)
+    manifest = tmp_path / 'changes.csv'
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(update_fixture_names, 'load_registry', lambda: None)
+    args = argparse.Namespace(fixtures=str(fixtures), mappings=str(mapping_file), dry_run=False, no_backup=True,
+                              workers=1, manifest=str(manifest))
+
+    assert quietly(update_fixture_names.run_bulk, args) == 1
+    records = pd.read_csv(manifest, dtype=str, keep_default_na=False)
+    assert records[['file', 'row', 'new_name']].values.tolist() == [
+        ['a.csv', '2', 'Manchester United'], ['a.csv', '3', 'Manchester United'], ['b.csv', '', '']]
+    assert records['error'].tolist()[:2] == ['', ''] and 'UnicodeDecodeError' in records['error'].iloc[2]
+    # The readable file was still rewritten, the corrupt one left as it was
+    assert pd.read_csv(fixtures / 'a.csv')['Away Team'].tolist() == ['Chelsea', 'Manchester United']
+    assert (fixtures / 'b.csv').read_bytes().endswith(b'"Chel')
+
+    (fixtures / 'b.csv').unlink()
+    assert quietly(update_fixture_names.run_bulk, args) == 0
@@ -0,0 +1,93 @@
+import os
+import json
+
+import numpy as np
+
+from conftest import match_record, quietly, write_league
+from match_store import STRING_COLUMNS, load_store, read_manifest, update_store
+from synthetic_data import generate_dataset
+
+
+def read_league(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_league(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+
+
+def decoded(store):
+    """Store columns with string indexes replaced by their text, which depends on the string table's history"""
+    strings = np.asarray(store.strings, dtype=object)
+    return {name: strings[values] if name in STRING_COLUMNS else values for name, values in store.columns.items()}
+
+
+def assert_same_store(incremental_dir, full_dir):
+    a, b = read_manifest(incremental_dir), read_manifest(full_dir)
+    for field in ('partitions', 'team_partitions', 'seasons'):
+        assert a[field] == b[field], field
+    store_a, store_b = load_store(incremental_dir), load_store(full_dir)
+    assert {team: store_a.team_name(team) for team in store_a.teams} == \
+        {team: store_b.team_name(team) for team in store_b.teams}
+    store_a, store_b = decoded(store_a), decoded(store_b)
+    assert store_a.keys() == store_b.keys()
+    for name in store_a:
+        np.testing.assert_array_equal(store_a[name], store_b[name], err_msg=name)
+
+
+def test_incremental_update_equals_full_compile(tmp_path):
+    leagues_dir = str(tmp_path / 'leagues')
+    store_dir = str(tmp_path / 'incremental')
+    quietly(generate_dataset, leagues_dir, leagues=9, seasons=2, seed=3)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+    files = sorted(os.listdir(leagues_dir))
+    before = read_manifest(store_dir)
+    removed_key = files[0][len('league_'):-len('.json')]
+
+    # A result comes in, a match is corrected (renamed home side), one is dropped and one is added
+    path = os.path.join(leagues_dir, files[-1])
+    records = read_league(path)
+    upcoming = next(i for i, r in enumerate(records) if r['match_status'] != 'Finished')
+    records[upcoming].update(match_status='Finished', match_hometeam_score='2', match_awayteam_score='1')
+    finished = next(i for i, r in enumerate(records) if r['match_status'] == 'Finished')
+    records[finished]['match_hometeam_name'] += ' Renamed'
+    records[finished]['match_awayteam_score'] = str(int(records[finished]['match_awayteam_score'] or 0) + 1)
+    dropped = records.pop(-1)
+    added = dict(records[-1], match_id='99999999', match_date='2026-12-30')
+    records.append(added)
+    save_league(path, records)
+    # One league file disappears and a new one turns up
+    os.remove(os.path.join(leagues_dir, files[0]))
+    write_league(leagues_dir, 424242, 2026, [match_record(1, 424242, '2026-10-01', 900001, 900002, (1, 0))])
+
+    _, changes = quietly(update_store, leagues_dir, store_dir)
+    full_dir = str(tmp_path / 'full')
+    quietly(update_store, leagues_dir, full_dir, full=True)
+    assert_same_store(store_dir, full_dir)
+
+    rows = [records[upcoming], records[finished], dropped, added]
+    changed_teams = {int(r[f'match_{side}team_id']) for r in rows for side in ('home', 'away')}
+    removed_teams = {int(team) for team, keys in before['team_partitions'].items() if removed_key in keys}
+    assert changes['teams'] == sorted(changed_teams | removed_teams | {900001, 900002})
+    assert changes['partitions'][removed_key]['removed']
+
+
+def test_status_flip_only_affects_its_two_teams(tmp_path):
+    leagues_dir = str(tmp_path / 'leagues')
+    store_dir = str(tmp_path / 'store')
+    quietly(generate_dataset, leagues_dir, leagues=3, seasons=1, seed=5)
+    quietly(update_store, leagues_dir, store_dir, full=True)
+
+    path = os.path.join(leagues_dir, sorted(os.listdir(leagues_dir))[1])
+    records = read_league(path)
+    record = next(r for r in records if r['match_status'] != 'Finished')
+    record.update(match_status='Finished', match_hometeam_score='0', match_awayteam_score='0')
+    save_league(path, records)
+
+    _, changes = quietly(update_store, leagues_dir, store_dir)
+    assert changes['teams'] == sorted({int(record['match_hometeam_id']), int(record['match_awayteam_id'])})
+    full_dir = str(tmp_path / 'full')
+    quietly(update_store, leagues_dir, full_dir, full=True)
+    assert_same_store(store_dir, full_dir)
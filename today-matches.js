@@ -19,18 +19,10 @@ async function loadAllMatches() {
     const leagueMap = {};
 
     try {
-        for (const [leagueId, leagueInfo] of Object.entries(JSON_FILES)) {
+        for (const [leagueId, leagueInfo, leagueMatches] of await fetchLeagueData(Object.entries(JSON_FILES))) {
+            leagueMap[leagueId] = leagueInfo.name;
+            if (!leagueMatches) continue;
             try {
-                leagueMap[leagueId] = leagueInfo.name;
-                const response = await fetch(leagueInfo.file);
-
-                if (!response.ok) {
-                    console.warn(`Could not load ${leagueInfo.file}: ${response.status}`);
-                    continue;
-                }
-
-                const leagueMatches = await response.json();
-
                 leagueMatches.forEach(match => {
                     const stats = match.statistics || [];
                     const matchData = {
@@ -100,6 +92,13 @@ function filterMatchesByDate(allMatches, date) {
   return allMatches.filter(m => m.dateString === date);
 }
 
+// The day's matches from its slate, in the leagues loadAllMatches() would have read
+function slateMatches(slate) {
+    return slate.fixtures
+        .filter(m => JSON_FILES[m.leagueId])
+        .map(m => ({ ...m, slateHistory: slate.history }));
+}
+
 
 function groupMatchesByLeague(matches) {
     const leagueGroups = {};
@@ -174,8 +173,18 @@ async function loadTeamAnalysis(match) {
 
     await wait(300);
 
-    const homeLast = window.getTeamLastMatches(match.homeTeam, 5);
-    const awayLast = window.getTeamLastMatches(match.awayTeam, 5);
+    let homeLast, awayLast;
+    if (match.slateHistory) {
+        // Slate history already stops before the match date
+        const lastMatches = teamId => (match.slateHistory[teamId] || []).slice(-5)
+            .map(m => window.teamMatchView(m, m.homeTeamId === teamId));
+        homeLast = lastMatches(match.homeTeamId);
+        awayLast = lastMatches(match.awayTeamId);
+    } else {
+        await window.ensureMatchData();
+        homeLast = window.getTeamLastMatches(match.homeTeam, 5);
+        awayLast = window.getTeamLastMatches(match.awayTeam, 5);
+    }
     const combinedStats = window.calculateStatistics([...homeLast, ...awayLast]);
 
     return {
@@ -468,8 +477,11 @@ async function renderMatchesForDate(dateStr) {
         // Update the displayed date
         currentDate.textContent = formatDate(dateStr);
 
-        const allMatches = await loadAllMatches();
-        const selectedDateMatches = filterMatchesByDate(allMatches, dateStr);
+        // One small slate file when the date has one, every league file otherwise
+        const slate = await loadSlate(dateStr);
+        const selectedDateMatches = slate
+            ? slateMatches(slate)
+            : filterMatchesByDate(await loadAllMatches(), dateStr);
         const groupedLeagues = groupMatchesByLeague(selectedDateMatches);
 
         loadingScreen.style.display = 'none';
@@ -0,0 +1,441 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from match_store import STORE_DIR, load_store, read_manifest, write_json
+from fixture_scanner import HALF_THRESHOLDS, THRESHOLDS, pick_thresholds, scan_fixtures, select_fixtures
+from team_ratings import RATING_COLUMNS, fixture_ratings, update_ratings
+
+MODEL_FILE = os.path.join(STORE_DIR, 'totals_model.json')
+MODEL_VERSION = 1
+
+# A match's weight halves every HALF_LIFE_DAYS before the fit date
+HALF_LIFE_DAYS = 180
+# Every team starts from this many league-average matches, so a handful of games cannot give extreme rates
+PRIOR_MATCHES = 3.0
+MAX_ITERATIONS = 200
+TOLERANCE = 1e-6
+# Excess variance below this is fitted as a plain Poisson total
+MIN_DISPERSION = 1e-3
+# Dispersion is measured out of sample on this many most recent days (in sample with fewer matches)
+DISPERSION_DAYS = 42
+MIN_DISPERSION_MATCHES = 200
+# Statistics blocks leave out types a league does not track, which the store reads as 0; a category counts
+# as recorded in a league only when at least this share of its statistics blocks have a non-zero total
+MIN_COVERAGE = 0.5
+
+MODEL_COLUMNS = ['date', 'league_id', 'league', 'match_id', 'home_team', 'away_team', 'category', 'threshold',
+                 'expected_home', 'expected_away', 'expected_total', 'p_over', 'p_under', 'over_odds', 'under_odds']
+
+
+def decay_weights(dates, as_of, half_life=HALF_LIFE_DAYS):
+    """Exponential time-decay weights of matches played on some dates, 1 on the fit date"""
+    age = (np.datetime64(as_of, 'D') - dates).astype(np.float64)
+    return np.exp2(-age / half_life)
+
+
+def recorded_mask(store, category):
+    """Rows whose category total was actually reported: goals always, stats only in leagues that track them"""
+    mask = store.stats_mask(category).copy()
+    if category.startswith('goals'):
+        return mask
+    leagues, codes = np.unique(store['league_id'], return_inverse=True)
+    blocks = np.bincount(codes, mask, len(leagues))
+    reported = np.bincount(codes, mask & (store.totals(category) > 0), len(leagues))
+    covered = reported >= MIN_COVERAGE * np.maximum(blocks, 1)
+    return mask & covered[codes]
+
+
+def fit_rates(home, away, home_counts, away_counts, weights, n_teams, prior=PRIOR_MATCHES, attack=None,
+              defence=None):
+    """Weighted attack/defence multipliers per team slot and the home/away base rates, by iterative scaling
+
+    A side's expected count is base rate * its attack * the opponent's defence. Given attack/defence from
+    an earlier fit the iteration starts from there and usually converges in a few rounds.
+    """
+    attack = np.ones(n_teams) if attack is None else attack.copy()
+    defence = np.ones(n_teams) if defence is None else defence.copy()
+    played = np.bincount(home, weights, n_teams) + np.bincount(away, weights, n_teams)
+    scored = np.bincount(home, weights * home_counts, n_teams) + np.bincount(away, weights * away_counts, n_teams)
+    conceded = np.bincount(home, weights * away_counts, n_teams) + np.bincount(away, weights * home_counts, n_teams)
+    home_total = weights @ home_counts
+    away_total = weights @ away_counts
+
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        home_rate = home_total / (weights @ (attack[home] * defence[away]))
+        away_rate = away_total / (weights @ (attack[away] * defence[home]))
+        pseudo = prior * (home_rate + away_rate) / 2
+        expected_for = (np.bincount(home, weights * home_rate * defence[away], n_teams)
+                        + np.bincount(away, weights * away_rate * defence[home], n_teams))
+        new_attack = (scored + pseudo) / (expected_for + pseudo)
+        expected_against = (np.bincount(home, weights * away_rate * new_attack[away], n_teams)
+                            + np.bincount(away, weights * home_rate * new_attack[home], n_teams))
+        new_defence = (conceded + pseudo) / (expected_against + pseudo)
+        # The base rates carry the overall level; teams average 1
+        new_attack /= np.average(new_attack, weights=played)
+        new_defence /= np.average(new_defence, weights=played)
+        change = max(np.abs(new_attack - attack).max(), np.abs(new_defence - defence).max())
+        attack, defence = new_attack, new_defence
+        if change < TOLERANCE:
+            break
+
+    home_rate = home_total / (weights @ (attack[home] * defence[away]))
+    away_rate = away_total / (weights @ (attack[away] * defence[home]))
+    return attack, defence, float(home_rate), float(away_rate), iteration
+
+
+def fit_dispersion(totals, means, weights):
+    """Negative binomial dispersion phi (variance = mean + phi * mean^2) by weighted moments, 0 for Poisson"""
+    dispersion = (weights @ ((totals - means) ** 2 - means)) / (weights @ means ** 2)
+    return float(dispersion) if dispersion > MIN_DISPERSION else 0.0
+
+
+def over_probabilities(means, dispersion, lines):
+    """(fixtures x lines) P(total > line) for Poisson (dispersion 0) or negative binomial totals"""
+    means = np.asarray(means, dtype=np.float64)[:, None]
+    counts = np.floor(np.asarray(lines, dtype=np.float64)).astype(np.int64)
+    k = np.arange(1, counts.max() + 1)
+    # pmf(k) = pmf(k - 1) * ratio(k), so the whole pmf up to the highest line is one cumulative product
+    if dispersion > 0:
+        size = 1 / dispersion
+        p0 = (size / (size + means)) ** size
+        ratios = (k - 1 + size) / k * (means / (size + means))
+    else:
+        p0 = np.exp(-means)
+        ratios = means / k
+    pmf = np.hstack([p0, p0 * np.cumprod(ratios, axis=1)])
+    return np.clip(1 - np.cumsum(pmf, axis=1)[:, counts], 0, 1)
+
+
+class TotalsModel:
+    """Per-team attack and defence rates for each category, and the over/under probabilities they imply"""
+
+    def __init__(self, teams, categories, as_of, settings, data_version=None):
+        self.teams = np.asarray(teams, dtype=np.int64)
+        # category -> attack, defence (aligned with teams), home_rate, away_rate, dispersion, matches
+        self.categories = categories
+        self.as_of = str(as_of)
+        self.settings = settings
+        self.data_version = data_version
+        # Iterations each category's fit took (0 when loaded from the cache unchanged)
+        self.iterations = {category: 0 for category in categories}
+
+    def slots(self, team_ids):
+        """(team slots, known mask) of some team ids; unknown teams get slot 0 and should be rated 1"""
+        team_ids = np.asarray(team_ids, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(self.teams, team_ids), max(len(self.teams) - 1, 0))
+        known = self.teams[slots] == team_ids if len(self.teams) else np.zeros(len(team_ids), dtype=bool)
+        return slots, known
+
+    def expected(self, category, home_ids, away_ids):
+        """(home means, away means) of a category's side counts; teams without history rate as average"""
+        params = self.categories[category]
+        home_slots, home_known = self.slots(home_ids)
+        away_slots, away_known = self.slots(away_ids)
+        rating = lambda values, slots, known: np.where(known, values[slots], 1.0)
+        home = params['home_rate'] * (rating(params['attack'], home_slots, home_known)
+                                      * rating(params['defence'], away_slots, away_known))
+        away = params['away_rate'] * (rating(params['attack'], away_slots, away_known)
+                                      * rating(params['defence'], home_slots, home_known))
+        return home, away
+
+    def probabilities(self, category, home_ids, away_ids, lines):
+        """(home means, away means, fixtures x lines P(total > line))"""
+        home, away = self.expected(category, home_ids, away_ids)
+        return home, away, over_probabilities(home + away, self.categories[category]['dispersion'], lines)
+
+    def to_json(self):
+        return {
+            'version': MODEL_VERSION,
+            'data_version': self.data_version,
+            'as_of': self.as_of,
+            'settings': self.settings,
+            'teams': self.teams.tolist(),
+            'categories': {category: dict(params, attack=np.round(params['attack'], 6).tolist(),
+                                          defence=np.round(params['defence'], 6).tolist())
+                           for category, params in self.categories.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        categories = {category: dict(params, attack=np.asarray(params['attack']),
+                                     defence=np.asarray(params['defence']))
+                      for category, params in data['categories'].items()}
+        return cls(data['teams'], categories, data['as_of'], data['settings'], data['data_version'])
+
+
+def model_settings(categories, half_life, prior):
+    return {'categories': sorted(categories), 'half_life_days': half_life, 'prior_matches': prior}
+
+
+def fit_model(store, as_of, categories=None, half_life=HALF_LIFE_DAYS, prior=PRIOR_MATCHES, previous=None,
+              data_version=None):
+    """Fit every category on the finished matches before as_of, starting from a previous model's rates"""
+    categories = sorted(categories or THRESHOLDS)
+    before = store.finished_mask() & (store['date'] < np.datetime64(as_of, 'D'))
+    teams = np.unique(np.concatenate([store['home_id'][before], store['away_id'][before]])).astype(np.int64)
+
+    fitted = {}
+    iterations = {}
+    for category in categories:
+        positions = np.flatnonzero(before & recorded_mask(store, category))
+        if not len(positions):
+            continue
+        home_ids = store['home_id'][positions]
+        away_ids = store['away_id'][positions]
+        home = np.searchsorted(teams, home_ids)
+        away = np.searchsorted(teams, away_ids)
+        home_counts = store.totals(category, 'home')[positions].astype(np.float64)
+        away_counts = store.totals(category, 'away')[positions].astype(np.float64)
+        weights = decay_weights(store['date'][positions], as_of, half_life)
+
+        attack = defence = None
+        if previous is not None and category in previous.categories:
+            # Warm start: teams the previous fit knew keep their rates, new ones start at 1
+            slots, known = previous.slots(teams)
+            attack = np.where(known, previous.categories[category]['attack'][slots], 1.0)
+            defence = np.where(known, previous.categories[category]['defence'][slots], 1.0)
+
+        # The spread around fitted means understates the spread around forecasts, so the dispersion is
+        # measured on the last DISPERSION_DAYS as predicted by rates fitted on the matches before them
+        holdout = store['date'][positions] >= np.datetime64(as_of, 'D') - np.timedelta64(DISPERSION_DAYS, 'D')
+        fit_iterations = 0
+        if MIN_DISPERSION_MATCHES <= holdout.sum() < len(positions) - MIN_DISPERSION_MATCHES:
+            early = ~holdout
+            attack, defence, home_rate, away_rate, fit_iterations = fit_rates(
+                home[early], away[early], home_counts[early], away_counts[early], weights[early], len(teams),
+                prior, attack, defence)
+            home_means = home_rate * attack[home[holdout]] * defence[away[holdout]]
+            away_means = away_rate * attack[away[holdout]] * defence[home[holdout]]
+            dispersion = fit_dispersion(home_counts[holdout] + away_counts[holdout], home_means + away_means,
+                                        weights[holdout])
+        attack, defence, home_rate, away_rate, iterations[category] = fit_rates(
+            home, away, home_counts, away_counts, weights, len(teams), prior, attack, defence)
+        iterations[category] += fit_iterations
+        if not fit_iterations:
+            means = home_rate * attack[home] * defence[away] + away_rate * attack[away] * defence[home]
+            dispersion = fit_dispersion(home_counts + away_counts, means, weights)
+        fitted[category] = {'attack': attack, 'defence': defence, 'home_rate': home_rate, 'away_rate': away_rate,
+                            'dispersion': dispersion, 'matches': int(len(positions))}
+
+    model = TotalsModel(teams, fitted, as_of, model_settings(categories, half_life, prior), data_version)
+    model.iterations = iterations
+    return model
+
+
+def load_model(store, as_of, store_dir=STORE_DIR, model_file=MODEL_FILE, categories=None,
+               half_life=HALF_LIFE_DAYS, prior=PRIOR_MATCHES, force=False):
+    """The cached model if it was fitted on this data version as of this date, otherwise a refit that starts
+    from the cached rates and replaces it
+
+    New results only nudge the rates, so the warm-started refit takes a few iterations instead of a full
+    fit; moving as_of forward rescales every weight by the same factor and changes nothing else.
+    """
+    categories = sorted(categories or THRESHOLDS)
+    settings = model_settings(categories, half_life, prior)
+    manifest = read_manifest(store_dir)
+    data_version = manifest.get('data_version') if manifest else None
+    previous = None
+    if not force and os.path.exists(model_file):
+        with open(model_file, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == MODEL_VERSION:
+            previous = TotalsModel.from_json(data)
+            if (previous.data_version == data_version and previous.as_of == str(as_of)
+                    and previous.settings == settings):
+                return previous
+
+    model = fit_model(store, as_of, categories, half_life, prior, previous, data_version)
+    os.makedirs(os.path.dirname(model_file) or '.', exist_ok=True)
+    write_json(model_file, model.to_json())
+    return model
+
+
+def price_fixtures(store, model, date_from, date_to=None, leagues=None, thresholds=None, include_finished=False,
+                   ratings=None):
+    """P(over/under) and fair odds for every fixture in a date range and every line, one pass per category
+    (with TeamRatings, next to both teams' ratings going into the fixture)"""
+    thresholds = thresholds or THRESHOLDS
+    fixtures = select_fixtures(store, date_from, date_to, leagues, include_finished)
+    frames = []
+    for category, lines in thresholds.items():
+        if category not in model.categories:
+            continue
+        home, away, over = model.probabilities(category, store['home_id'][fixtures], store['away_id'][fixtures],
+                                               lines)
+        frames.append(pd.DataFrame({
+            'position': np.tile(fixtures, len(lines)),
+            'category': category,
+            'threshold': np.repeat(lines, len(fixtures)),
+            'expected_home': np.tile(home, len(lines)),
+            'expected_away': np.tile(away, len(lines)),
+            'p_over': over.T.ravel(),
+        }))
+    if not frames or not len(fixtures):
+        return pd.DataFrame(columns=MODEL_COLUMNS + (RATING_COLUMNS if ratings is not None else []))
+
+    table = pd.concat(frames, ignore_index=True)
+    table['expected_total'] = table['expected_home'] + table['expected_away']
+    table['p_under'] = 1 - table['p_over']
+    with np.errstate(divide='ignore'):
+        table['over_odds'] = np.round(1 / table['p_over'], 2)
+        table['under_odds'] = np.round(1 / table['p_under'], 2)
+    for column in ('expected_home', 'expected_away', 'expected_total'):
+        table[column] = table[column].round(2)
+    for column in ('p_over', 'p_under'):
+        table[column] = table[column].round(4)
+
+    positions = table.pop('position').to_numpy()
+    league_names = {meta['league_id']: meta['league_name'] for meta in store.partitions.values()}
+    strings = np.asarray(store.strings, dtype=object)
+    table['date'] = store['date'][positions]
+    table['league_id'] = store['league_id'][positions]
+    table['league'] = table['league_id'].map(league_names)
+    table['match_id'] = store['match_id'][positions]
+    table['home_team'] = strings[store['home_name'][positions]]
+    table['away_team'] = strings[store['away_name'][positions]]
+    columns = MODEL_COLUMNS
+    if ratings is not None:
+        home_rating, away_rating = fixture_ratings(ratings, store, positions)
+        table['home_rating'] = home_rating.round(1)
+        table['away_rating'] = away_rating.round(1)
+        table['rating_gap'] = (home_rating - away_rating).round(1)
+        columns = MODEL_COLUMNS + RATING_COLUMNS
+    table = table[columns]
+    return table.sort_values(['date', 'match_id', 'category', 'threshold'], kind='stable').reset_index(drop=True)
+
+
+def walk_forward(store, date_from, date_to, thresholds=None, half_life=HALF_LIFE_DAYS, prior=PRIOR_MATCHES,
+                 step_days=7):
+    """Out-of-sample over probabilities for the finished matches in a date range, refitting every step_days
+    on the matches before each step; (match_id, category, threshold, p_over, over) rows"""
+    thresholds = thresholds or THRESHOLDS
+    start = np.datetime64(date_from, 'D')
+    end = np.datetime64(date_to, 'D')
+    model = None
+    rows = []
+    while start <= end:
+        step_end = min(start + np.timedelta64(step_days - 1, 'D'), end)
+        model = fit_model(store, start, list(thresholds), half_life, prior, previous=model)
+        table = price_fixtures(store, model, str(start), str(step_end), thresholds=thresholds,
+                               include_finished=True)
+        rows.append(table[['match_id', 'category', 'threshold', 'p_over']])
+        start = step_end + np.timedelta64(1, 'D')
+    table = pd.concat(rows, ignore_index=True)
+
+    # Outcomes, for finished matches whose category was recorded
+    finished = np.flatnonzero(store.finished_mask())
+    position = pd.Series(finished, index=store['match_id'][finished])
+    position = position[~position.index.duplicated()]
+    table = table[table['match_id'].isin(position.index)]
+    positions = position.loc[table['match_id']].to_numpy()
+    recorded = np.ones(len(table), dtype=bool)
+    over = np.zeros(len(table), dtype=bool)
+    for category in thresholds:
+        rows = (table['category'] == category).to_numpy()
+        recorded[rows] = recorded_mask(store, category)[positions[rows]]
+        over[rows] = store.totals(category)[positions[rows]] > table['threshold'].to_numpy()[rows]
+    table = table.assign(over=over)[recorded]
+    return table.reset_index(drop=True)
+
+
+def reliability(probabilities, outcomes, bins=10):
+    """Predicted vs observed over rate per probability bin"""
+    frame = pd.DataFrame({'p': probabilities, 'over': outcomes.astype(np.float64)})
+    frame['bin'] = np.minimum((frame['p'] * bins).astype(int), bins - 1)
+    return (frame.groupby('bin').agg(predicted=('p', 'mean'), observed=('over', 'mean'), bets=('p', 'size'))
+            .round(3).reset_index(drop=True))
+
+
+def calibration_report(store, date_from, date_to, thresholds=None, last_matches=5, half_life=HALF_LIFE_DAYS,
+                       prior=PRIOR_MATCHES):
+    """(Brier score per category for the model and the last-N hit rate, model reliability table)"""
+    thresholds = thresholds or THRESHOLDS
+    model = walk_forward(store, date_from, date_to, thresholds, half_life, prior)
+    hits = scan_fixtures(store, date_from, date_to, last_matches, thresholds=thresholds, include_finished=True)
+    hits = hits[hits['direction'] == 'over'][['match_id', 'category', 'threshold', 'combined_rate']]
+    # Both are scored on the fixtures each can price
+    scored = model.merge(hits, on=['match_id', 'category', 'threshold'])
+    scored['model'] = (scored['p_over'] - scored['over']) ** 2
+    scored['hit_rate'] = (scored['combined_rate'] / 100 - scored['over']) ** 2
+    brier = scored.groupby('category').agg(bets=('over', 'size'), model=('model', 'mean'),
+                                           hit_rate=('hit_rate', 'mean')).round(4)
+    return brier, reliability(model['p_over'].to_numpy(), model['over'].to_numpy())
+
+
+def main():
+    """Price a fixture date range with the totals model, or check its calibration on finished matches"""
+    parser = argparse.ArgumentParser(
+        description='Poisson/negative binomial over-under probabilities from time-decayed team attack/defence '
+                    'rates')
+    parser.add_argument('date_from', help='first fixture date (YYYY-MM-DD)')
+    parser.add_argument('date_to', nargs='?', help='last fixture date (defaults to date_from)')
+    parser.add_argument('--leagues', help='comma separated league ids (default: all)')
+    parser.add_argument('--categories', help='comma separated categories, e.g. corners,goals_ht '
+                                             '(default: the find_bets.js ones)')
+    parser.add_argument('--half-life', type=float, default=HALF_LIFE_DAYS, help='days for a match\'s weight to halve')
+    parser.add_argument('--prior', type=float, default=PRIOR_MATCHES, help='league-average matches every team '
+                                                                           'starts from')
+    parser.add_argument('--min-probability', type=float, default=0,
+                        help='only list lines with an over or under probability of at least this (0-1)')
+    parser.add_argument('--calibrate', action='store_true',
+                        help='fit walk-forward over the (finished) date range and compare with the last-5 hit rate')
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--force', action='store_true', help='refit from scratch instead of from the cached model')
+    parser.add_argument('--ratings', action='store_true', help='add the teams\' Elo ratings')
+    parser.add_argument('--output', help='write the table to this CSV file')
+    args = parser.parse_args()
+    if args.half_life <= 0 or args.prior <= 0:
+        parser.error('--half-life and --prior must be positive')
+
+    leagues = args.leagues.split(',') if args.leagues else None
+    try:
+        thresholds = pick_thresholds(args.categories.split(','), THRESHOLDS, HALF_THRESHOLDS) \
+            if args.categories else THRESHOLDS
+    except KeyError as e:
+        parser.error(e.args[0])
+    # Time decay keeps old seasons in play, so the whole store is read
+    store = load_store(args.store_dir)
+
+    if args.calibrate:
+        print(f"📐 TOTALS MODEL CALIBRATION {args.date_from} - {args.date_to or args.date_from}")
+        print("="*40)
+        brier, bins = calibration_report(store, args.date_from, args.date_to or args.date_from, thresholds,
+                                         half_life=args.half_life, prior=args.prior)
+        print("Brier score (lower is better), model vs last-5 hit rate:")
+        print(brier.to_string())
+        print("\nModel reliability:")
+        print(bins.to_string(index=False))
+        return
+
+    print("🎲 TOTALS MODEL")
+    print("="*40)
+    started = time.perf_counter()
+    model = load_model(store, args.date_from, args.store_dir, os.path.join(args.store_dir, 'totals_model.json'),
+                       list(thresholds), args.half_life, args.prior, args.force)
+    fitted = time.perf_counter()
+    ratings = update_ratings(args.store_dir, os.path.join(args.store_dir, 'team_ratings.json'))[0] \
+        if args.ratings else None
+    table = price_fixtures(store, model, args.date_from, args.date_to, leagues, thresholds, ratings=ratings)
+    priced = time.perf_counter()
+    if args.min_probability:
+        table = table[np.maximum(table['p_over'], table['p_under']) >= args.min_probability]
+
+    for category, params in model.categories.items():
+        print(f"  {category}: {params['matches']} matches, home {params['home_rate']:.2f} / away "
+              f"{params['away_rate']:.2f} per side, dispersion {params['dispersion']:.3f}, "
+              f"{model.iterations.get(category, 0)} iterations")
+    print(f"⏱️  fit {(fitted - started) * 1000:.0f} ms, priced {table['match_id'].nunique()} fixtures x "
+          f"{sum(len(lines) for lines in thresholds.values())} lines in {(priced - fitted) * 1000:.0f} ms")
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"💾 Saved to {args.output}")
+    else:
+        print(table.head(30).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,26 @@
 import os
+import sys
+import json
+import argparse
+import tempfile
 import pandas as pd
 import csv
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from team_registry import load_registry
+import instrumentation
+from instrumentation import count, span
 
-def load_team_mappings(mapping_file='recommended_mappings.csv'):
-    """Load team name mappings from the CSV file"""
+CHANGE_FIELDS = ['file', 'row', 'side', 'column', 'old_name', 'new_name']
+# Files that could not be read or rewritten are listed in the manifest as {'file', 'error'} records
+FAILURE_FIELDS = ['file', 'error']
+
+def load_team_mappings(mapping_file='recommended_mappings.csv', registry=None):
+    """Load team name mappings from the CSV file, plus the team registry's aliases of the CSV's league names
+
+    Registry aliases only ever map to a name the CSV maps to, never to the API's canonical name.
+    """
     mappings = {}
     
     if not os.path.exists(mapping_file):
@@ -23,16 +38,18 @@ def load_team_mappings(mapping_file='recommended_mappings.csv'):
             print(f"Found columns: {list(df.columns)}")
             return {}
         
-        for _, row in df.iterrows():
-            fixture_team = str(row['Fixture Team']).strip()
-            league_team = str(row['League Team']).strip()
-            confidence = float(row.get('Confidence', 1.0))
-            
-            # Only use mappings with reasonable confidence
-            if confidence >= 0.6:
-                mappings[fixture_team] = league_team
+        # Only use mappings with reasonable confidence
+        confidence = df['Confidence'].astype(float) if 'Confidence' in df.columns else pd.Series(1.0, index=df.index)
+        df = df[confidence >= 0.6]
+        mappings.update(zip(df['Fixture Team'].astype(str).str.strip(), df['League Team'].astype(str).str.strip()))
         
         print(f"✅ Loaded {len(mappings)} team name mappings")
+        if registry is not None:
+            aliases = registry.alias_mappings(targets=set(mappings.values()))
+            added = sum(1 for alias in aliases if alias not in mappings)
+            for alias, league_team in aliases.items():
+                mappings.setdefault(alias, league_team)
+            print(f"✅ Added {added} aliases from the team registry")
         return mappings
         
     except Exception as e:
@@ -56,92 +73,127 @@ def create_backup_folder(fixtures_folder):
         print(f"❌ Error creating backup: {e}")
         return None
 
+def find_team_columns(df):
+    """Return the (home, away) team column names of a fixture file, or None for missing ones"""
+    home_col = None
+    away_col = None
+    
+    for col in df.columns:
+        col_lower = col.strip().lower()
+        if 'home' in col_lower and 'team' in col_lower:
+            home_col = col
+        elif 'away' in col_lower and 'team' in col_lower:
+            away_col = col
+    
+    return home_col, away_col
+
+def write_csv_atomically(df, filepath):
+    """Write a CSV to a temp file in the same folder, then rename it over the original"""
+    folder = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.csv', dir=folder)
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False)
+        shutil.copymode(filepath, tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def update_fixture_file(filepath, team_mappings, dry_run=False):
-    """Update team names in a single fixture file"""
+    """Update team names in a single fixture file; returns (changes made, change records, error or None)"""
     try:
-        # Read the CSV file
-        df = pd.read_csv(filepath)
+        # Read every cell as text so untouched columns are written back exactly as they were
+        with span('read_csv', file=os.path.basename(filepath)):
+            df = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+        count('rows_read', len(df))
         
         # Find the team columns
-        home_col = None
-        away_col = None
-        
-        for col in df.columns:
-            col_lower = col.strip().lower()
-            if 'home' in col_lower and 'team' in col_lower:
-                home_col = col
-            elif 'away' in col_lower and 'team' in col_lower:
-                away_col = col
+        home_col, away_col = find_team_columns(df)
         
         if not home_col or not away_col:
             print(f"  ⚠️  Could not find team columns in {os.path.basename(filepath)}")
-            return 0, []
-        
-        changes_made = 0
-        detailed_changes = []
+            return 0, [], None
         
-        # Update home team names
-        for idx, team in enumerate(df[home_col]):
-            if str(team) in team_mappings:
-                old_name = str(team)
-                new_name = team_mappings[old_name]
-                if old_name != new_name:
-                    detailed_changes.append(f"    Row {idx+2}: '{old_name}' → '{new_name}' (Home)")
-                    if not dry_run:
-                        df.at[idx, home_col] = new_name
-                    changes_made += 1
+        changes = []
         
-        # Update away team names
-        for idx, team in enumerate(df[away_col]):
-            if str(team) in team_mappings:
-                old_name = str(team)
-                new_name = team_mappings[old_name]
-                if old_name != new_name:
-                    detailed_changes.append(f"    Row {idx+2}: '{old_name}' → '{new_name}' (Away)")
-                    if not dry_run:
-                        df.at[idx, away_col] = new_name
-                    changes_made += 1
+        # Update home and away team names with one vectorized lookup per column
+        for side, col in (('Home', home_col), ('Away', away_col)):
+            old_names = df[col]
+            with span('map_names', file=os.path.basename(filepath), column=col):
+                new_names = old_names.map(team_mappings)
+            hits = new_names.notna() & (new_names != old_names)
+            if not hits.any():
+                continue
+            rows = hits.to_numpy().nonzero()[0]
+            changes.extend({
+                'file': os.path.basename(filepath),
+                'row': int(row) + 2,
+                'side': side,
+                'column': col,
+                'old_name': old_name,
+                'new_name': new_name,
+            } for row, old_name, new_name in zip(rows, old_names[hits], new_names[hits]))
+            if not dry_run:
+                df.loc[hits, col] = new_names[hits]
+                count('cells_rewritten', len(rows))
         
         # Save the updated file (if not dry run)
-        if changes_made > 0 and not dry_run:
-            df.to_csv(filepath, index=False)
+        if changes and not dry_run:
+            with span('write_csv', file=os.path.basename(filepath)):
+                write_csv_atomically(df, filepath)
         
-        return changes_made, detailed_changes
+        return len(changes), changes, None
         
     except Exception as e:
         print(f"  ❌ Error processing {os.path.basename(filepath)}: {e}")
-        return 0, []
+        return 0, [], f"{type(e).__name__}: {e}"
+
+def traced_update_fixture_file(filepath, team_mappings, dry_run=False):
+    with span('update_fixture_file', file=os.path.basename(filepath)):
+        return update_fixture_file(filepath, team_mappings, dry_run)
+
+def format_change(change):
+    return f"    Row {change['row']}: '{change['old_name']}' → '{change['new_name']}' ({change['side']})"
+
+def list_fixture_files(fixtures_folder):
+    return sorted(f for f in os.listdir(fixtures_folder) if f.endswith('.csv'))
 
 def update_all_fixture_files(fixtures_folder, team_mappings, dry_run=False):
-    """Update team names in all fixture files"""
+    """Update team names in all fixture files; returns (changes made, files updated, failed files)"""
     print(f"\n{'🔍 DRY RUN - ' if dry_run else '✏️  '}Updating fixture files...")
     
     if not os.path.exists(fixtures_folder):
         print(f"❌ Fixtures folder '{fixtures_folder}' not found!")
-        return
+        return 0, 0, {}
     
     total_changes = 0
     files_updated = 0
     all_changes = {}
+    failures = {}
+    csv_files = list_fixture_files(fixtures_folder)
     
     # Process each CSV file in the fixtures folder
-    for filename in os.listdir(fixtures_folder):
-        if filename.endswith('.csv'):
-            filepath = os.path.join(fixtures_folder, filename)
-            changes_made, detailed_changes = update_fixture_file(filepath, team_mappings, dry_run)
-            
-            if changes_made > 0:
-                files_updated += 1
-                total_changes += changes_made
-                all_changes[filename] = detailed_changes
-                print(f"  ✅ {filename}: {changes_made} team names updated")
-            else:
-                print(f"  ➖ {filename}: No changes needed")
+    for filename in csv_files:
+        filepath = os.path.join(fixtures_folder, filename)
+        changes_made, detailed_changes, error = traced_update_fixture_file(filepath, team_mappings, dry_run)
+        
+        if error:
+            failures[filename] = error
+        elif changes_made > 0:
+            files_updated += 1
+            total_changes += changes_made
+            all_changes[filename] = detailed_changes
+            print(f"  ✅ {filename}: {changes_made} team names updated")
+        else:
+            print(f"  ➖ {filename}: No changes needed")
     
     print(f"\n📊 SUMMARY:")
-    print(f"  • Files processed: {len([f for f in os.listdir(fixtures_folder) if f.endswith('.csv')])}")
+    print(f"  • Files processed: {len(csv_files)}")
     print(f"  • Files updated: {files_updated}")
     print(f"  • Total changes: {total_changes}")
+    print_failures(failures)
     
     # Show detailed changes if requested
     if all_changes and input(f"\nShow detailed changes? (y/N): ").lower().startswith('y'):
@@ -149,9 +201,63 @@ def update_all_fixture_files(fixtures_folder, team_mappings, dry_run=False):
         for filename, changes in all_changes.items():
             print(f"\n  {filename}:")
             for change in changes:
-                print(change)
+                print(format_change(change))
+    
+    return total_changes, files_updated, failures
+
+def print_failures(failures):
+    if failures:
+        print(f"\n❌ {len(failures)} files failed and were left as they were:")
+        for filename, error in sorted(failures.items()):
+            print(f"  • {filename}: {error}")
+
+_worker_mappings = {}
+
+def _init_worker(team_mappings):
+    global _worker_mappings
+    _worker_mappings = team_mappings
+
+def _update_file_worker(task):
+    filepath, dry_run, traced = task
+    return instrumentation.worker_call(traced, traced_update_fixture_file, filepath, _worker_mappings, dry_run)
+
+def write_change_manifest(changes, manifest_path, failures=None):
+    """Write change records, then a record per failed file, to a .json or .csv manifest"""
+    records = changes + [{'file': filename, 'error': error} for filename, error in sorted((failures or {}).items())]
+    if manifest_path.endswith('.json'):
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=1)
+    else:
+        with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CHANGE_FIELDS + FAILURE_FIELDS[1:])
+            writer.writeheader()
+            writer.writerows(records)
+
+def bulk_update_fixture_files(fixtures_folder, team_mappings, dry_run=False, workers=None, manifest_path=None):
+    """Update every fixture file in parallel without prompts; returns (change records, files updated, failed files)"""
+    if not os.path.exists(fixtures_folder):
+        print(f"❌ Fixtures folder '{fixtures_folder}' not found!")
+        return [], 0, {}
+    
+    csv_files = list_fixture_files(fixtures_folder)
+    tasks = [(os.path.join(fixtures_folder, filename), dry_run, instrumentation.TRACER.enabled) for filename in csv_files]
+    print(f"{'🔍 DRY RUN - ' if dry_run else '✏️  '}Updating {len(tasks)} fixture files with {workers or os.cpu_count()} workers...")
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(team_mappings,)) as pool:
+        results = [instrumentation.worker_result(output)
+                   for output in pool.map(_update_file_worker, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1))))]
     
-    return total_changes, files_updated
+    changes = [change for _, file_changes, _ in results for change in file_changes]
+    files_updated = sum(1 for changes_made, _, _ in results if changes_made)
+    failures = {filename: error for filename, (_, _, error) in zip(csv_files, results) if error}
+    
+    print(f"📊 Files processed: {len(tasks)}, files updated: {files_updated}, total changes: {len(changes)}")
+    print_failures(failures)
+    if manifest_path:
+        write_change_manifest(changes, manifest_path, failures)
+        print(f"📝 Change manifest saved: {manifest_path}")
+    
+    return changes, files_updated, failures
 
 def validate_mappings(team_mappings):
     """Validate and show the mappings that will be applied"""
@@ -190,17 +296,56 @@ def create_update_log(changes_made, files_updated, team_mappings):
     
     print(f"📝 Update log saved: {log_filename}")
 
+def run_bulk(args):
+    """Unattended mode: no prompts, parallel rewrite, structured change manifest"""
+    team_mappings = load_team_mappings(args.mappings, load_registry())
+    if not team_mappings:
+        return 1
+    
+    if not args.dry_run and not args.no_backup:
+        if not create_backup_folder(args.fixtures):
+            print("❌ Could not create backup. Operation cancelled for safety.")
+            return 1
+    
+    manifest_path = args.manifest or f"fixture_changes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    changes, files_updated, failures = bulk_update_fixture_files(args.fixtures, team_mappings, args.dry_run,
+                                                                 args.workers, manifest_path)
+    if changes and not args.dry_run:
+        create_update_log(len(changes), files_updated, team_mappings)
+    return 1 if failures else 0
+
 def main():
     """Main function to update fixture team names"""
+    parser = argparse.ArgumentParser(description='Rename fixture team names to league team names')
+    parser.add_argument('--bulk', action='store_true', help='run unattended: parallel, no prompts, change manifest')
+    parser.add_argument('--fixtures', default='fixtures', help='fixtures folder')
+    parser.add_argument('--mappings', default='recommended_mappings.csv', help='mapping CSV from the team name analyzer')
+    parser.add_argument('--dry-run', action='store_true', help='(bulk) only report what would change')
+    parser.add_argument('--workers', type=int, help='(bulk) number of worker processes')
+    parser.add_argument('--manifest', help='(bulk) change manifest path, .csv or .json')
+    parser.add_argument('--no-backup', action='store_true', help='(bulk) skip the fixtures folder backup')
+    instrumentation.add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.bulk:
+        with instrumentation.profiling(args, 'update_fixture_names'):
+            status = run_bulk(args)
+        sys.exit(status)
+    
+    with instrumentation.profiling(args, 'update_fixture_names'):
+        update_interactively(args)
+
+def update_interactively(args):
+    """Prompted mode: show the mappings, offer a dry run, back up, then rewrite"""
     print("🔄 FIXTURE TEAM NAME UPDATER")
     print("="*40)
     
     # Configuration
-    fixtures_folder = "fixtures"
-    mapping_file = "recommended_mappings.csv"
+    fixtures_folder = args.fixtures
+    mapping_file = args.mappings
     
     # Load team mappings
-    team_mappings = load_team_mappings(mapping_file)
+    team_mappings = load_team_mappings(mapping_file, load_registry())
     if not team_mappings:
         return
     
@@ -234,13 +379,15 @@ def main():
         return
     
     # Update files
-    changes_made, files_updated = update_all_fixture_files(fixtures_folder, team_mappings, dry_run=False)
+    changes_made, files_updated, failures = update_all_fixture_files(fixtures_folder, team_mappings, dry_run=False)
     
     # Create log
     if changes_made > 0:
         create_update_log(changes_made, files_updated, team_mappings)
-        print(f"\n✅ Update completed successfully!")
+        print(f"\n{'⚠️  Update completed with failed files' if failures else '✅ Update completed successfully'}!")
         print(f"🔐 Original files backed up to: {backup_folder}")
+    elif failures:
+        print(f"\n⚠️  No changes were made, and {len(failures)} files failed.")
     else:
         print(f"\n➖ No changes were needed.")
 